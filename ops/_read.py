@@ -15,8 +15,67 @@
 import ops.constants
 import ops.utils
 
-
-def get_row_data(row, table_name, schema, idl, index=None):
+# Table schema -> columns read from its rows, see _get_read_columns()
+_read_columns = {}
+
+# Key of the data of a row in the row cache, see get_row_data()
+ROW_DATA_KEY = 'ops.dc.row_data'
+
+
+def _get_read_columns(table_schema):
+    """
+    Returns the config columns, the index columns that are not config
+    columns and the (name, referenced table) of the config references
+    of table_schema, computed once per table.
+    """
+    columns = _read_columns.get(table_schema)
+    if columns is not None:
+        return columns
+
+    config = tuple(table_schema.config)
+    indexes = tuple(key for key in table_schema.indexes
+                    if key != 'uuid' and key not in table_schema.config)
+    references = tuple(
+        (refname, refobj.ref_table)
+        for refname, refobj in table_schema.references.iteritems()
+        if refobj.relation == ops.constants.OVSDB_SCHEMA_REFERENCE and
+        refobj.category == ops.constants.OVSDB_SCHEMA_CONFIG)
+
+    columns = (config, indexes, references)
+    _read_columns[table_schema] = columns
+    return columns
+
+
+def get_row_data(row, table_name, schema, idl, index=None, row_cache=None):
+    """
+    Returns the configuration of row and its children as {index: data}.
+
+    If row_cache (ops.rowcache.RowCache) is given, the data of the row
+    and of each of its children is kept in it until one of the rows it
+    was read from changes, and only the modified subtrees are read again.
+    The cached data is shared, callers must not modify it.
+    """
+    if row_cache is None:
+        return _get_row_data(row, table_name, schema, idl, index)
+
+    key = (ROW_DATA_KEY, table_name, row.uuid, index)
+    data = row_cache.get(key)
+    if data is not None:
+        return data
+
+    row_cache.begin()
+    try:
+        row_cache.track(table_name, row.uuid)
+        data = _get_row_data(row, table_name, schema, idl, index, row_cache)
+    except:
+        row_cache.abort()
+        raise
+
+    row_cache.end(key, data)
+    return data
+
+
+def _get_row_data(row, table_name, schema, idl, index=None, row_cache=None):
 
     if index is None:
         index = ops.utils.row_to_index(row, table_name, schema, idl)
@@ -27,9 +86,12 @@ def get_row_data(row, table_name, schema, idl, index=None):
     if table_name == 'Route' and row.__getattr__('from') != 'static':
         return
 
-    # Iterate over all columns in the row
     table_schema = schema.ovs_tables[table_name]
-    for column_name in table_schema.config.keys():
+    (config_columns, index_columns,
+     reference_columns) = _get_read_columns(table_schema)
+
+    # Iterate over all columns in the row
+    for column_name in config_columns:
         column_data = row.__getattr__(column_name)
 
         # Do not include empty columns
@@ -39,13 +101,8 @@ def get_row_data(row, table_name, schema, idl, index=None):
         row_data[column_name] = column_data
 
     # get all non-config index columns
-    for key in table_schema.indexes:
-
-        if key is 'uuid':
-            continue
-
-        if key not in table_schema.config.keys():
-            row_data[key] = row.__getattr__(key)
+    for key in index_columns:
+        row_data[key] = row.__getattr__(key)
 
     # Iterate over all children (forward and backward references) in the row
     for child_name in table_schema.children:
@@ -75,14 +132,15 @@ def get_row_data(row, table_name, schema, idl, index=None):
                     kv_index = keys[count]
                     data = get_row_data(
                         item, child_table_name, schema,
-                        idl, kv_index)
+                        idl, kv_index, row_cache)
                     if data is None:
                         continue
 
                     children_data.update({str(keys[count]): data.values()[0]})
                     count = count + 1
                 else:
-                    data = get_row_data(item, child_table_name, schema, idl)
+                    data = get_row_data(item, child_table_name, schema, idl,
+                                        row_cache=row_cache)
                     if data is None:
                         continue
 
@@ -105,41 +163,38 @@ def get_row_data(row, table_name, schema, idl, index=None):
                     column_name = name
                     break
 
-            # Iterate through entire child table to find those rows belonging
-            # to the same parent
-            for item in idl.tables[child_name].rows.itervalues():
-                # Get the parent row reference
-                ref = item.__getattr__(column_name)
-                # Parent reference is same as 'row' (row was passed to
-                #this function) this is now the child of 'row'
-                if ref.uuid == row.uuid:
-                    data = get_row_data(item, child_name, schema, idl)
-                    if data is not None:
-                        children_data.update(data)
+            # Get the rows belonging to the same parent from the
+            # parent index of the child table, which changes with the
+            # set of rows of the child table
+            if row_cache is not None:
+                row_cache.track(child_name, None)
+            for item in idl.parent_to_rows(child_name, column_name,
+                                           row.uuid):
+                data = get_row_data(item, child_name, schema, idl,
+                                    row_cache=row_cache)
+                if data is not None:
+                    children_data.update(data)
 
         if children_data:
             row_data[child_name] = children_data
 
-    # Iterate through 'references' from table
-    for refname, refobj in table_schema.references.iteritems():
+    # Iterate through config 'references' from table
+    for refname, ref_table_name in reference_columns:
 
-        refdata = []
-        if (
-            refobj.relation == ops.constants.OVSDB_SCHEMA_REFERENCE
-            and refobj.category == ops.constants.OVSDB_SCHEMA_CONFIG
-        ):
-            reflist = row.__getattr__(refname)
+        reflist = row.__getattr__(refname)
 
-            if len(reflist) == 0:
-                continue
+        if len(reflist) == 0:
+            continue
 
-            ref_table_name = table_schema.references[refname].ref_table
-            for item in reflist:
-                key_index = ops.utils.row_to_index(
-                    item, ref_table_name, schema, idl)
-                refdata.append(key_index)
+        refdata = []
+        for item in reflist:
+            if row_cache is not None:
+                row_cache.track(ref_table_name, item.uuid)
+            key_index = ops.utils.row_to_index(
+                item, ref_table_name, schema, idl)
+            refdata.append(key_index)
 
-            row_data[refname] = refdata
+        row_data[refname] = refdata
 
     if not row_data:
         return None
@@ -147,10 +202,12 @@ def get_row_data(row, table_name, schema, idl, index=None):
     return {index: row_data}
 
 
-def get_table_data(table_name, schema, idl):
+def get_table_data(table_name, schema, idl, row_cache=None):
 
     # get the table from the DB
     table = idl.tables[table_name]
+    if row_cache is not None:
+        row_cache.track(table_name, None)
 
     # Iterate over all rows
     table_data = {table_name: {}}
@@ -160,7 +217,8 @@ def get_table_data(table_name, schema, idl):
         return None
 
     for row in table.rows.itervalues():
-        row_data = get_row_data(row, table_name, schema, idl)
+        row_data = get_row_data(row, table_name, schema, idl,
+                                row_cache=row_cache)
         if row_data is None:
             continue
         table_data[table_name].update(row_data)
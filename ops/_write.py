@@ -19,8 +19,6 @@ import ops.constants
 import urllib
 
 
-global_ref_list = {}
-
 # FIXME: ideally this info should come from extschema
 def is_immutable_table(table, extschema):
     default_tables = ['Bridge', 'VRF']
@@ -37,56 +35,70 @@ def _delete(row, table, extschema, idl, txn):
             if isinstance(child_ref_list, types.DictType):
                 child_ref_list = child_ref_list.values()
             if child_ref_list:
-                child_uuid_list = []
+                child_rows = idl.tables[child_table_name].rows
                 for item in child_ref_list:
-                    child_uuid_list.append(item.uuid)
-                while child_uuid_list:
-                    child = idl.tables[child_table_name].rows[child_uuid_list[0]]
-                    _delete(child, child_table_name, extschema, idl, txn)
-                    child_uuid_list.pop(0)
+                    _delete(child_rows[item.uuid], child_table_name,
+                            extschema, idl, txn)
     row.delete()
 
 
-def setup_table(table_name, data, extschema, idl, txn):
+def _index_to_row(index, table_schema, idl, new_rows):
+    """
+    Returns the row of index, looked up in the IDL index maps, or in
+    new_rows for the rows inserted by this write.
+    """
+    row = ops.utils.index_to_row(index, table_schema, idl)
+
+    if row is None and table_schema.name in new_rows:
+        row = new_rows[table_schema.name].get(index)
+        if row is None:
+            raise Exception('reference not found')
+
+    return row
+
+
+def setup_table(table_name, data, extschema, idl, txn, new_rows):
+    """
+    new_rows maps the table name and the index of the rows inserted by
+    the write to the new row, it is shared by all the tables and passed
+    to setup_references() once they are set up.
+    """
 
     # table is missing from config json
     if table_name not in data:
         if not is_immutable_table(table_name, extschema):
-            # if mutable, empty table
-            table_rows = idl.tables[table_name].rows.values()
-            while table_rows:
-                _delete(table_rows[0], table_name, extschema, idl, txn)
-                table_rows = idl.tables[table_name].rows.values()
+            # if mutable, empty table. Rows are deleted from table.rows,
+            # with their children, skip the ones already deleted
+            table_rows = idl.tables[table_name].rows
+            for row in table_rows.values():
+                if row.uuid in table_rows:
+                    _delete(row, table_name, extschema, idl, txn)
         return
     else:
         # update table
         tabledata = data[table_name]
         for rowindex, rowdata in tabledata.iteritems():
-            setup_row({rowindex:rowdata}, table_name, extschema, idl, txn)
+            setup_row({rowindex:rowdata}, table_name, extschema, idl, txn,
+                      new_rows)
 
 
-def setup_references(table, data, extschema, idl):
+def setup_references(table, data, extschema, idl, new_rows):
     if table not in data:
         return
 
     tabledata = data[table]
 
     for rowindex, rowdata in tabledata.iteritems():
-        setup_row_references({rowindex:rowdata}, table, extschema, idl)
+        setup_row_references({rowindex:rowdata}, table, extschema, idl,
+                             new_rows)
 
 
-def setup_row_references(rowdata, table, extschema, idl):
+def setup_row_references(rowdata, table, extschema, idl, new_rows):
     row_index = rowdata.keys()[0]
     row_data = rowdata.values()[0]
     table_schema = extschema.ovs_tables[table]
 
-    row = ops.utils.index_to_row(row_index, table_schema, idl)
-
-    if row is None and table in global_ref_list:
-        if row_index in global_ref_list[table]:
-            row = global_ref_list[table][row_index]
-        else:
-            raise Exception('reference not found')
+    row = _index_to_row(row_index, table_schema, idl, new_rows)
 
     # set references for this row
     for name, column in table_schema.references.iteritems():
@@ -101,17 +113,10 @@ def setup_row_references(rowdata, table, extschema, idl):
             row.__setattr__(name, [])
         else:
             reflist = []
-            reftable = column.ref_table
-            refidl = idl.tables[reftable]
-            refschema = extschema.ovs_tables[reftable]
+            refschema = extschema.ovs_tables[column.ref_table]
             for refindex in row_data[name]:
-                refrow = ops.utils.index_to_row(refindex, refschema, idl)
-                if refrow is None and reftable in global_ref_list:
-                    if refindex in global_ref_list[reftable]:
-                        refrow = global_ref_list[reftable][refindex]
-                    else:
-                        raise Exception('reference not found')
-                reflist.append(refrow)
+                reflist.append(_index_to_row(refindex, refschema, idl,
+                                             new_rows))
 
             row.__setattr__(name, reflist)
 
@@ -133,10 +138,11 @@ def setup_row_references(rowdata, table, extschema, idl):
             if child_table in extschema.ovs_tables[table].children and\
                     child_table not in extschema.ovs_tables[table].references:
                         index = str(row.uuid) + '/' + index
-            setup_row_references({index:data}, child_table, extschema, idl)
+            setup_row_references({index:data}, child_table, extschema, idl,
+                                 new_rows)
 
 
-def setup_row(rowdata, table_name, extschema, idl, txn):
+def setup_row(rowdata, table_name, extschema, idl, txn, new_rows):
     """
     set up rows recursively
     """
@@ -155,11 +161,9 @@ def setup_row(rowdata, table_name, extschema, idl, txn):
         row = txn.insert(idl.tables[table_name])
         _new = True
 
-        if table_name not in global_ref_list:
-            global_ref_list[table_name] = {}
-        global_ref_list[table_name][row_index] = row
+        new_rows.setdefault(table_name, {})[row_index] = row
     # NOTE: populate configuration data
-    config_keys = table_schema.config.keys()
+    config_keys = table_schema.config
     for key in config_keys:
 
         # TODO: return error if trying to set an immutable column
@@ -185,7 +189,7 @@ def setup_row(rowdata, table_name, extschema, idl, txn):
             if key is 'uuid':
                 continue
 
-            if key not in table_schema.config.keys() and key in row_data:
+            if key not in config_keys and key in row_data:
                 row.__setattr__(key, row_data[key])
 
     # NOTE: set up child references
@@ -226,14 +230,13 @@ def setup_row(rowdata, table_name, extschema, idl, txn):
                                 delete_list.append(item)
 
                         if not is_immutable_table(child_table_name, extschema):
-                            while delete_list:
-                                _delete(delete_list[0], child_table_name, extschema, idl, txn)
-                                delete_list.pop(0)
+                            for item in delete_list:
+                                _delete(item, child_table_name, extschema, idl, txn)
 
                 # setup children
                 children = {}
                 for index, child_data in new_data.iteritems():
-                    (_child, is_new) = setup_row({index:child_data}, child_table_name, extschema, idl, txn)
+                    (_child, is_new) = setup_row({index:child_data}, child_table_name, extschema, idl, txn, new_rows)
                     # NOTE: None is returned when attempting to add a new row in an immutable table
                     if _child is None:
                         continue
@@ -271,11 +274,7 @@ def setup_row(rowdata, table_name, extschema, idl, txn):
 
             # get list of all rows with same parent
             if not _new:
-                current_list = []
-                for item in idl.tables[key].rows.itervalues():
-                    parent = item.__getattr__(column_name)
-                    if parent.uuid == row.uuid:
-                        current_list.append(item)
+                current_list = idl.parent_to_rows(key, column_name, row.uuid)
 
                 new_data = None
                 if key in row_data:
@@ -293,9 +292,8 @@ def setup_row(rowdata, table_name, extschema, idl, txn):
 
                     # NOTE: delete only from immutable table
                     if not is_immutable_table(key, extschema):
-                        while delete_list:
-                            _delete(delete_list[0], key, extschema, idl, txn)
-                            delete_list.pop(0)
+                        for item in delete_list:
+                            _delete(item, key, extschema, idl, txn)
 
                 # set up children rows
                 if new_data is not None:
@@ -307,7 +305,7 @@ def setup_row(rowdata, table_name, extschema, idl, txn):
                         for _x in split_x:
                             tmp.append(urllib.quote(str(_x), safe=''))
                         x = '/'.join(tmp)
-                        (child, is_new) = setup_row({x:y}, key, extschema, idl, txn)
+                        (child, is_new) = setup_row({x:y}, key, extschema, idl, txn, new_rows)
 
                         # fill the parent reference column
                         if child is not None and is_new:
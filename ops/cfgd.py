@@ -39,7 +39,16 @@ def connect():
     return idl
 
 
-def read():
+def _get_startup_row(idl):
+    for ovs_rec in idl.tables["config"].rows.itervalues():
+        row_type = ovs_rec.__getattr__('type')
+        if row_type and row_type == 'startup':
+            return ovs_rec
+
+    return None
+
+
+def read(idl=None):
     '''
     Walk through the rows in the config table (if any)
     looking for a row with type == startup.
@@ -47,47 +56,60 @@ def read():
     If found, return content of the "config" field in that row.
 
     'config' is stored in DB as a JSON string
+
+    If idl (an IDL of the config DB) is not provided, a new
+    connection is opened, blocking until the replica is ready.
     '''
 
-    idl = connect()
-    for ovs_rec in idl.tables["config"].rows.itervalues():
-        row_type = ovs_rec.__getattr__('type')
-        if row_type and row_type == 'startup':
-                config = ovs_rec.__getattr__('config')
-                if config:
-                    data = base64.b64decode(config)
-                    return json.loads(data)
+    if idl is None:
+        idl = connect()
+
+    row = _get_startup_row(idl)
+    if row is not None:
+        config = row.__getattr__('config')
+        if config:
+            data = base64.b64decode(config)
+            return json.loads(data)
 
     return None
 
 
-def write(data):
+def write(data, idl=None, txn=None, block=False):
     '''
     Walk through the rows in the config table (if any)
     looking for a row with type == startup.
 
     If found, update content of the "config" field in that row.
     If not found, create new row and set "config" field
+
+    If idl is not provided, a new connection is opened. If txn is not
+    provided, a new transaction is created and commit_block() is used,
+    otherwise the transaction is committed with commit() and may be
+    incomplete, the caller has to wait for its completion.
+
+    Returns a (result, error) tuple
     '''
-    idl = connect()
-    row = None
-    for ovs_rec in idl.tables['config'].rows.itervalues():
-        row_type = ovs_rec.__getattr__('type')
-        if row_type and row_type == 'startup':
-            row = ovs_rec
-            break
+    if idl is None:
+        idl = connect()
 
-    txn = Transaction(idl)
+    if txn is None:
+        txn = Transaction(idl)
+        block = True
 
+    row = _get_startup_row(idl)
     if row is None:
         row = txn.insert(idl.tables['config'])
         row.__setattr__('type', 'startup')
-        is_new = True
 
     base64data = base64.b64encode(json.dumps(data))
     row.__setattr__('config', base64data)
 
-    result = txn.commit_block()
+    if not block:
+        # txn maybe be incomplete
+        result = txn.commit()
+    else:
+        # txn is completed but will block until it is done
+        result = txn.commit_block()
     error = txn.get_error()
 
     return (result, error)
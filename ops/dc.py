@@ -53,11 +53,15 @@ def register(extschema, ovsschema, ovsremote):
 
         schema_helper.register_columns(str(tablename), register_columns)
 
-    idl = ops.opsidl.OpsIdl(ovsremote, schema_helper)
+    idl = ops.opsidl.OpsIdl(ovsremote, schema_helper, extschema)
     return idl
 
 
-def read(extschema, idl):
+# Key of the configuration in the row cache, see read()
+READ_KEY = 'ops.dc.read'
+
+
+def read(extschema, idl, cached=False):
     """Read the OpenSwitch OVSDB database
 
     Args:
@@ -65,6 +69,12 @@ def read(extschema, idl):
             parsed extended-schema (vswitch.extschema) object.
         idl (ovs.db.idl.Idl): This is the IDL object that
             represents the OVSDB IDL.
+        cached (boolean): if cached is True and idl is an
+            ops.opsidl.OpsIdl, the configuration is kept in its
+            row cache and maintained from the IDL change
+            notifications, only the subtrees of the modified rows
+            are read again. The returned configuration is shared
+            and must not be modified (e.g. given to write()).
 
     Returns:
         dict: Returns a Python dictionary object containing
@@ -73,6 +83,28 @@ def read(extschema, idl):
             described in vswitch.extschema
     """
 
+    row_cache = getattr(idl, 'row_cache', None)
+    # Rows being modified by a transaction are not cached
+    if not cached or row_cache is None or idl.txn is not None:
+        return _read_config(extschema, idl)
+
+    config = row_cache.get(READ_KEY)
+    if config is not None:
+        return config
+
+    row_cache.begin()
+    try:
+        config = _read_config(extschema, idl, row_cache)
+    except:
+        row_cache.abort()
+        raise
+
+    row_cache.end(READ_KEY, config)
+    return config
+
+
+def _read_config(extschema, idl, row_cache=None):
+
     config = {}
     for table_name in extschema.ovs_tables.keys():
 
@@ -81,7 +113,8 @@ def read(extschema, idl):
             continue
 
     # Get table data for root or top level table
-        table_data = _read.get_table_data(table_name, extschema, idl)
+        table_data = _read.get_table_data(table_name, extschema, idl,
+                                          row_cache)
 
         if table_data is not None:
             config.update(table_data)
@@ -90,7 +123,7 @@ def read(extschema, idl):
     config[ops.constants.OVSDB_SCHEMA_SYSTEM_TABLE] = config[ops.constants.OVSDB_SCHEMA_SYSTEM_TABLE].values()[0]
     return config
 
-def write(data, extschema, idl, txn=None, block=False):
+def write(data, extschema, idl, txn=None, block=False, commit=True):
     """Write a new configuration to OpenSwitch OVSDB database
 
     Args:
@@ -102,6 +135,8 @@ def write(data, extschema, idl, txn=None, block=False):
             represents the OVSDB IDL.
         txn (ovs.db.idl.Transaction): OVSDB transaction object.
         block (boolean): if block is True, commit_block() is used
+        commit (boolean): if commit is False, txn is left uncommitted
+            and None is returned
 
     Returns:
         result : The result of transaction commit
@@ -121,6 +156,9 @@ def write(data, extschema, idl, txn=None, block=False):
     system_uuid = idl.tables[ops.constants.OVSDB_SCHEMA_SYSTEM_TABLE].rows.keys()[0]
     data[ops.constants.OVSDB_SCHEMA_SYSTEM_TABLE] = {system_uuid:data[ops.constants.OVSDB_SCHEMA_SYSTEM_TABLE]}
 
+    # rows inserted by this write, by table and index
+    new_rows = {}
+
     # iterate over all top-level tables i.e. root
     for table_name, tableschema in extschema.ovs_tables.iteritems():
 
@@ -129,7 +167,7 @@ def write(data, extschema, idl, txn=None, block=False):
             continue
 
         # set up the non-child table
-        _write.setup_table(table_name, data, extschema, idl, txn)
+        _write.setup_table(table_name, data, extschema, idl, txn, new_rows)
 
     # iterate over all tables to fill in references
     for table_name, tableschema in extschema.ovs_tables.iteritems():
@@ -137,7 +175,10 @@ def write(data, extschema, idl, txn=None, block=False):
         if extschema.ovs_tables[table_name].parent is not None:
             continue
 
-        _write.setup_references(table_name, data, extschema, idl)
+        _write.setup_references(table_name, data, extschema, idl, new_rows)
+
+    if not commit:
+        return None
 
     if not block:
         # txn maybe be incomplete
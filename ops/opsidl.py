@@ -13,8 +13,25 @@
 #   under the License.
 
 
-from ovs.db.idl import Idl, Row
+from ovs.db.idl import Idl
 import ovs
+import ovs.jsonrpc
+
+from ops.rowcache import RowCache
+from ops.constants import OVSDB_SCHEMA_PARENT, OVSDB_SCHEMA_CHILD, \
+    OVSDB_SCHEMA_REFERENCE
+
+
+def _uuid_to_uuid(atom, base):
+    # Used with Datum.to_python() to keep references as plain UUIDs,
+    # the referenced row may not be in the replica yet
+    return atom
+
+
+def _index_value_to_str(value):
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return str(value)
 
 
 class OpsIdl(Idl):
@@ -23,56 +40,246 @@ class OpsIdl(Idl):
     is used in order to improve dc write time by doing the lookup from
     the index_map.
 
+    If the REST schema is provided, rows are also indexed by the REST
+    'indexes' of their table (the values used in resource URIs) in
+    table.rest_index_map, so that URI resolution is a dictionary lookup.
+    Tables indexed by 'uuid' only are looked up directly in table.rows
+    and have no rest_index_map.
+
+    Children of a parent row (back-references) are tracked in
+    table.parent_map, for each 'parent' column of the table a map of
+    parent uuid to the set of child uuids.
+
+    Forward references ('child' and 'reference' columns) are tracked in
+    reverse in the referenced table, table.reverse_ref_map maps a row
+    uuid to the set of (parent table, parent uuid, column, kv key) that
+    reference it.
+
+    Columns of the REST schema may not be registered in the IDL, the
+    tables missing some of them are listed in partial_tables.
+
+    Values computed from rows (e.g. their JSON representation) can be
+    kept in row_cache, they are invalidated here when a row changes.
+    The columns rendered for each table are kept in render_plans (see
+    opsrest.get.RenderPlan).
+
+    If txn_completed is set, it is called with every committed
+    transaction as soon as its reply is processed, or when it's aborted
+    because the connection to the database is lost. Other requests can
+    be sent on the IDL session with send_request().
+
+    Statistics columns which are not replicated can be fetched on demand
+    through statistics (see opsrest.statistics), if set.
+
     """
-    def __init__(self, remote, schema):
+    def __init__(self, remote, schema, restschema=None):
         Idl.__init__(self, remote, schema)
+        self.restschema = restschema
+        self.row_cache = RowCache()
+        # (table name, selector) -> opsrest.get.RenderPlan
+        self.render_plans = {}
+        self.txn_completed = None
+        self.statistics = None
+        # JSON-RPC id -> callback of the requests sent with send_request()
+        self._outstanding_requests = {}
+
+        # REST index columns of each table, and the set of columns that
+        # need re-indexing when modified
+        self._rest_indexes = {}
+        self._parent_columns = {}
+        self._reference_columns = {}
+        self._index_columns = {}
+        # Tables with columns of the REST schema that are not replicated
+        self.partial_tables = set()
+        for table_name, table in self.tables.iteritems():
+            columns = set()
+            if table.indexes:
+                columns.update([v.name for v in table.indexes[0]])
+
+            if restschema is not None and \
+                    table_name in restschema.ovs_tables:
+                indexes = restschema.ovs_tables[table_name].indexes
+                if indexes and indexes != ['uuid']:
+                    self._rest_indexes[table_name] = indexes
+                    columns.update(indexes)
+
+                references = restschema.ovs_tables[table_name].references
+                parent_columns = [name for name, ref in references.iteritems()
+                                  if ref.relation == OVSDB_SCHEMA_PARENT and
+                                  name in table.columns]
+                if parent_columns:
+                    self._parent_columns[table_name] = parent_columns
+                    columns.update(parent_columns)
+
+                reference_columns = []
+                for name, ref in references.iteritems():
+                    if ref.relation in (OVSDB_SCHEMA_CHILD,
+                                        OVSDB_SCHEMA_REFERENCE) and \
+                            name in table.columns and \
+                            ref.ref_table in self.tables:
+                        reference_columns.append((name, ref.ref_table))
+                if reference_columns:
+                    self._reference_columns[table_name] = reference_columns
+                    columns.update([name for name, _ in reference_columns])
+
+                table_schema = restschema.ovs_tables[table_name]
+                for column_name in table_schema.columns:
+                    if column_name not in table.columns:
+                        self.partial_tables.add(table_name)
+                        break
+
+            self._index_columns[table_name] = columns
+
         self._clear_all_index_maps()
 
     def _Idl__clear(self):
         self._clear_all_index_maps()
+        self.row_cache.reset()
         Idl._Idl__clear(self)
 
     def _clear_all_index_maps(self):
-        for table in self.tables.itervalues():
+        for table_name, table in self.tables.iteritems():
             table.index_map = {}
+            if table_name in self._rest_indexes:
+                table.rest_index_map = {}
+            else:
+                table.rest_index_map = None
+
+            table.reverse_ref_map = {}
+            table.parent_map = {}
+            for column_name in self._parent_columns.get(table_name, []):
+                table.parent_map[column_name] = {}
 
     # Overriding parent process_update
     def _Idl__process_update(self, table, uuid, old, new):
         """Returns True if a column changed, False otherwise."""
         row = table.rows.get(uuid)
+
+        # Drop the current index entries if an index column is modified,
+        # they are added back once the row is updated
+        reindex = False
+        if row and old and new and self._is_index_modified(table, old):
+            self._update_index_map(row, table, ovs.db.idl.ROW_DELETE)
+            reindex = True
+
         changed = Idl._Idl__process_update(self, table, uuid, old, new)
 
         if not new:
             if row:
                 # Delete row.
                 self._update_index_map(row, table, ovs.db.idl.ROW_DELETE)
-        elif not old or not row:
+        elif not old or not row or reindex:
             # Create row.
             row = table.rows.get(uuid)
-            self._update_index_map(row, table, ovs.db.idl.ROW_CREATE, new)
+            self._update_index_map(row, table, ovs.db.idl.ROW_CREATE)
+
+        if changed:
+            self.row_cache.invalidate(table.name, uuid)
+            if not new or not old or reindex:
+                # The set of rows of the table, or their indexes or
+                # parents, changed
+                self.row_cache.invalidate(table.name, None)
 
         return changed
 
-    def _update_index_map(self, row, table, operation, new=None):
+    def send_request(self, method, params, callback):
+        """
+        Sends a JSON-RPC request to the database, callback is called with
+        the reply message, or with None if the connection is lost before.
+        Returns False if the request couldn't be sent.
+        """
+        msg = ovs.jsonrpc.Message.create_request(method, params)
+        if self._session.send(msg):
+            return False
+
+        self._outstanding_requests[msg.id] = callback
+        return True
+
+    # Overriding parent txn_process_reply
+    def _Idl__txn_process_reply(self, msg):
+        callback = self._outstanding_requests.pop(msg.id, None)
+        if callback is not None:
+            callback(msg)
+            return True
+
+        txn = self._outstanding_txns.get(msg.id)
+        Idl._Idl__txn_process_reply(self, msg)
+        if txn is None:
+            return False
+
+        if self.txn_completed is not None:
+            self.txn_completed(txn)
+        return True
+
+    # Overriding parent txn_abort_all
+    def _Idl__txn_abort_all(self):
+        callbacks = self._outstanding_requests.values()
+        self._outstanding_requests = {}
+        for callback in callbacks:
+            callback(None)
+
+        txns = self._outstanding_txns.values()
+        Idl._Idl__txn_abort_all(self)
+        if self.txn_completed is not None:
+            for txn in txns:
+                self.txn_completed(txn)
+
+    def _is_index_modified(self, table, old):
+        # 'old' only contains the columns that were modified
+        for column_name in old:
+            if column_name in self._index_columns[table.name]:
+                return True
+        return False
+
+    def _update_index_map(self, row, table, operation):
+
+        index = self._row_to_index_lookup(row, table)
+        rest_index = self._row_to_rest_index(row, table)
 
         if operation == ovs.db.idl.ROW_DELETE:
-            index = self._row_to_index_lookup(row, table)
-            if index in table.index_map:
+            if index is not None and table.index_map.get(index) is row:
                 del table.index_map[index]
 
+            if rest_index is not None:
+                rows = table.rest_index_map.get(rest_index)
+                if rows is not None:
+                    rows.pop(row.uuid, None)
+                    if not rows:
+                        del table.rest_index_map[rest_index]
+
+            for column_name, parent_uuid in self._row_to_parents(row, table):
+                children = table.parent_map[column_name].get(parent_uuid)
+                if children is not None:
+                    children.discard(row.uuid)
+                    if not children:
+                        del table.parent_map[column_name][parent_uuid]
+
+            references = self._row_to_references(row, table)
+            for ref_table, ref_uuid, ref in references:
+                refs = self.tables[ref_table].reverse_ref_map.get(ref_uuid)
+                if refs is not None:
+                    refs.discard(ref)
+                    if not refs:
+                        del self.tables[ref_table].reverse_ref_map[ref_uuid]
+
         elif operation == ovs.db.idl.ROW_CREATE:
-            if table.indexes:
-                index_values = []
-                for v in table.indexes[0]:
-                    if v.name in row._data:
-                        column = table.columns.get(v.name)
-                        if column.type.key.type == ovs.db.types.UuidType:
-                            val = new[v.name][1]
-                        else:
-                            val = row.__getattr__(v.name)
-                        val = str(val)
-                        index_values.append(val)
-                table.index_map[tuple(index_values)] = row
+            if index is not None:
+                table.index_map[index] = row
+
+            if rest_index is not None:
+                rows = table.rest_index_map.setdefault(rest_index, {})
+                rows[row.uuid] = row
+
+            for column_name, parent_uuid in self._row_to_parents(row, table):
+                children = table.parent_map[column_name].setdefault(
+                    parent_uuid, set())
+                children.add(row.uuid)
+
+            references = self._row_to_references(row, table)
+            for ref_table, ref_uuid, ref in references:
+                refs = self.tables[ref_table].reverse_ref_map.setdefault(
+                    ref_uuid, set())
+                refs.add(ref)
 
     def index_to_row_lookup(self, index, table_name):
         """
@@ -87,15 +294,126 @@ class OpsIdl(Idl):
 
         return None
 
+    def parent_to_rows(self, table_name, parent_column, parent_uuid):
+        """
+        This subroutine returns the rows of table_name that reference
+        the parent row parent_uuid in their parent_column, i.e. the
+        back-referenced children of that parent. Rows deleted in the
+        current transaction are not returned.
+        """
+        table = self.tables[table_name]
+        children = table.parent_map.get(parent_column)
+        if children is None:
+            # Not a tracked parent column, look for the children
+            rows = []
+            for row in table.rows.itervalues():
+                parent = row.__getattr__(parent_column)
+                if parent is not None and parent.uuid == parent_uuid:
+                    rows.append(row)
+            return rows
+
+        rows = []
+        for uuid in children.get(parent_uuid, ()):
+            row = table.rows.get(uuid)
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def reference_to_rows(self, table_name, row_uuid, parent_table_name,
+                          column):
+        """
+        This subroutine returns the rows of parent_table_name that
+        reference the row row_uuid of table_name in their column, as a
+        list of (parent row, key) tuples. key is the key of the
+        reference for key/value type columns and None otherwise.
+        """
+        parent_table = self.tables[parent_table_name]
+        result = []
+        if (column, table_name) not in \
+                self._reference_columns.get(parent_table_name, []):
+            # Not a tracked reference column, look for the references
+            for parent_row in parent_table.rows.itervalues():
+                column_data = parent_row.__getattr__(column)
+                if isinstance(column_data, dict):
+                    for key, value in column_data.iteritems():
+                        if value is not None and value.uuid == row_uuid:
+                            result.append((parent_row, key))
+                elif isinstance(column_data, list):
+                    for value in column_data:
+                        if value is not None and value.uuid == row_uuid:
+                            result.append((parent_row, None))
+                elif column_data is not None and \
+                        column_data.uuid == row_uuid:
+                    result.append((parent_row, None))
+            return result
+
+        refs = self.tables[table_name].reverse_ref_map.get(row_uuid, ())
+        for ref_table, parent_uuid, ref_column, key in refs:
+            if ref_table != parent_table_name or ref_column != column:
+                continue
+            parent_row = parent_table.rows.get(parent_uuid)
+            if parent_row is not None:
+                result.append((parent_row, key))
+        return result
+
+    def _row_to_references(self, row, table):
+        # Given the row return the (referenced table, referenced uuid,
+        # reverse reference) tuples of its tracked reference columns
+        references = []
+        for column_name, ref_table in \
+                self._reference_columns.get(table.name, []):
+            datum = row._data.get(column_name)
+            if datum is None:
+                continue
+            is_map = datum.type.is_map()
+            for key, value in datum.values.iteritems():
+                if is_map:
+                    ref_key = key.value
+                    ref_uuid = value.value
+                else:
+                    ref_key = None
+                    ref_uuid = key.value
+                references.append((ref_table, ref_uuid,
+                                   (table.name, row.uuid, column_name,
+                                    ref_key)))
+        return references
+
+    def _row_to_parents(self, row, table):
+        # Given the row return the (parent column, parent uuid) pairs
+        parents = []
+        for column_name in self._parent_columns.get(table.name, []):
+            datum = row._data.get(column_name)
+            if datum is None:
+                continue
+            for atom in datum.values:
+                parents.append((column_name, atom.value))
+        return parents
+
     def _row_to_index_lookup(self, row, table):
         # Given the row return the index
-        index_values = []
         if not table.indexes:
             return None
+
+        index_values = []
         for v in table.indexes[0]:
-            val = row.__getattr__(v.name)
-            if isinstance(val, Row):
-                val = val.uuid
-            val = str(val)
-            index_values.append(val)
+            if v.name in row._data:
+                val = row._data[v.name].to_python(_uuid_to_uuid)
+                index_values.append(_index_value_to_str(val))
+        return tuple(index_values)
+
+    def _row_to_rest_index(self, row, table):
+        # Given the row return the REST index, None if not tracked
+        indexes = self._rest_indexes.get(table.name)
+        if indexes is None:
+            return None
+
+        index_values = []
+        for name in indexes:
+            if name == 'uuid':
+                val = row.uuid
+            elif name in row._data:
+                val = row._data[name].to_python(_uuid_to_uuid)
+            else:
+                return None
+            index_values.append(_index_value_to_str(val))
         return tuple(index_values)
@@ -0,0 +1,121 @@
+#  Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may
+#   not use this file except in compliance with the License. You may obtain
+#   a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+ROW_CACHE_MAX_ENTRIES = 100000
+
+
+class RowCache(object):
+    """
+    Cache of values computed from IDL rows. While a value is computed
+    (between begin() and end()) every row it reads is recorded with
+    track(), and the value is dropped as soon as any of those rows is
+    modified or deleted (invalidate()).
+
+    Values computed within the computation of another value (e.g. a
+    referenced row rendered with depth) add their rows to the outer
+    value too, also when they are served from the cache.
+
+    A dependency is a (table name, row uuid) pair, or (table name, None)
+    for the set of rows of a table, which changes when a row is inserted
+    or deleted.
+
+    A value can be cached with its ETag, which must only depend on the
+    value (e.g. a hash of a response body), so that processes with
+    their own replica of the database give the same ETags.
+
+    Cached values are shared, callers must not modify them.
+    """
+    def __init__(self, max_entries=ROW_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # key -> value
+        self._entries = {}
+        # key -> set of (table name, row uuid) the value was computed from
+        self._dependencies = {}
+        # (table name, row uuid) -> set of keys computed from the row
+        self._dependents = {}
+        # key -> ETag of the value, if any
+        self._etags = {}
+        # stack of dependency sets of the values being computed
+        self._tracking = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is not None and self._tracking:
+            self._tracking[-1].update(self._dependencies[key])
+        return value
+
+    def get_etag(self, key):
+        return self._etags.get(key)
+
+    def begin(self):
+        self._tracking.append(set())
+
+    def track(self, table_name, uuid):
+        if self._tracking:
+            self._tracking[-1].add((table_name, uuid))
+
+    def end(self, key, value, etag=None):
+        dependencies = self._tracking.pop()
+        if self._tracking:
+            self._tracking[-1].update(dependencies)
+
+        if value is None:
+            return
+
+        if len(self._entries) >= self.max_entries:
+            self.clear()
+
+        self._remove(key)
+        self._entries[key] = value
+        self._dependencies[key] = dependencies
+        for dependency in dependencies:
+            self._dependents.setdefault(dependency, set()).add(key)
+
+        if etag is not None:
+            self._etags[key] = etag
+
+    def abort(self):
+        dependencies = self._tracking.pop()
+        if self._tracking:
+            self._tracking[-1].update(dependencies)
+
+    def invalidate(self, table_name, uuid):
+        for key in self._dependents.pop((table_name, uuid), ()):
+            self._remove(key)
+
+    def clear(self):
+        self._entries = {}
+        self._dependencies = {}
+        self._dependents = {}
+        self._etags = {}
+
+    def reset(self):
+        # The data is reloaded, nothing computed before is valid
+        self.clear()
+
+    def _remove(self, key):
+        if key not in self._entries:
+            return
+
+        del self._entries[key]
+        self._etags.pop(key, None)
+        for dependency in self._dependencies.pop(key):
+            dependents = self._dependents.get(dependency)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[dependency]
@@ -82,7 +82,17 @@ def row_to_index(row, table, restschema, idl, parent_row=None):
 
             # check in parent if a child 'column' exists
             column_name = schema.plural_name
-            if column_name in parent_schema.references:
+            if column_name in parent_schema.references and \
+                    parent_row is None and hasattr(idl, 'reference_to_rows'):
+                # look up the parents referencing the row in the reverse
+                # reference index, children in a key/value column are
+                # indexed by their key
+                for item, key in idl.reference_to_rows(table, row.uuid,
+                                                       parent, column_name):
+                    if key is not None:
+                        return key
+
+            elif column_name in parent_schema.references:
                 # look in all resources
                 parent_rows = None
                 if parent_row is not None:
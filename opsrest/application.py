@@ -12,11 +12,15 @@
 #  License for the specific language governing permissions and limitations
 #  under the License.
 
+from functools import partial
+
 from tornado.web import Application, StaticFileHandler
 
 from opsrest.manager import OvsdbConnectionManager
 from opslib import restparser
 from opsrest import constants
+from opsrest.utils import jsonutils
+from opsrest.compression import GZipResponseEncoding
 from opsvalidator import validator
 import cookiesecret
 
@@ -25,19 +29,51 @@ class OvsdbApiApplication(Application):
     def __init__(self, settings):
         self.settings = settings
         self.settings['cookie_secret'] = cookiesecret.generate_cookie_secret()
-        self.manager = OvsdbConnectionManager(self.settings.get('ovs_remote'),
-                                              self.settings.get('ovs_schema'))
+        jsonutils.set_encoder(self.settings.get('json_encoder',
+                                                constants.JSON_ENCODER_JSON))
         schema = self.settings.get('ext_schema')
         self.restschema = restparser.parseSchema(schema)
+        self.manager = OvsdbConnectionManager(
+            self.settings.get('ovs_remote'), self.settings.get('ovs_schema'),
+            self.restschema,
+            group_commit=self.settings.get('group_commit', False),
+            register_profile=self.settings.get('idl_register_profile',
+                                               constants.IDL_REGISTER_ALL),
+            register_columns=self.settings.get('idl_register_columns'),
+            statistics_on_demand=self.settings.get('statistics_on_demand',
+                                                   False),
+            statistics_ttl=self.settings.get(
+                'statistics_ttl', constants.OVSDB_DEFAULT_STATISTICS_TTL))
+        # Connection to the config DB, used for the startup configuration
+        self.cfg_manager = \
+            OvsdbConnectionManager(self.settings.get('ovs_remote'),
+                                   self.settings.get('cfg_db_schema'))
         self._url_patterns = self._get_url_patterns()
-        Application.__init__(self, self._url_patterns, **self.settings)
+        Application.__init__(self, self._url_patterns,
+                             transforms=self._get_transforms(),
+                             **self.settings)
 
         # We must block the application start until idl connection
         # and replica is ready
         self.manager.start()
+        self.cfg_manager.start()
 
         # Load all custom validators
         validator.init_plugins(constants.OPSPLUGIN_DIR)
+        validator.configure(
+            time_budget=self.settings.get('validator_time_budget'),
+            workers=self.settings.get('validator_workers', 1),
+            parallel_min_jobs=self.settings.get(
+                'validator_parallel_min_jobs', 500))
+
+    def _get_transforms(self):
+        if not self.settings.get('compress_response', False):
+            return []
+
+        return [partial(GZipResponseEncoding,
+                        min_length=self.settings.get('compress_min_length',
+                                                     1024),
+                        level=self.settings.get('compress_level', 6))]
 
     # adds 'self' to url_patterns
     def _get_url_patterns(self):
@@ -0,0 +1,174 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+from opsrest.constants import *
+from opsrest.parse import parse_url_path
+from opsrest import post, put, patch, delete
+from opsrest.transaction import OvsdbTransactionResult
+from opsrest.exceptions import DataValidationFailed, NotFound, \
+    BulkOperationFailed
+
+import re
+import httplib
+
+from tornado.log import app_log
+
+
+def bulk_resources(data, schema, txn, idl, commit=True, results=None):
+    """
+    Applies an ordered list of operations in a single transaction, each
+    one a dictionary with the 'method' (POST, PUT, PATCH or DELETE), the
+    'path' and the 'body' of a request to the resource:
+
+    [{"method": "POST", "path": "/rest/v1/system/bridges/bridge_normal/vlans",
+      "body": {"configuration": {"name": "VLAN10", "id": 10}}},
+     {"method": "DELETE",
+      "path": "/rest/v1/system/bridges/bridge_normal/vlans/VLAN20"}]
+
+    The path of each operation is resolved right before it is applied,
+    so it refers to the resources as left by the previous operations,
+    e.g. to a resource they created. The first failed operation aborts
+    the request, BulkOperationFailed reports its index.
+
+    If given, results is filled with the (method, path, status) of each
+    operation, status being UNCHANGED if it changed nothing in the
+    transaction and SUCCESS otherwise.
+    """
+    operations = parse_operations(data)
+    if results is not None:
+        del results[:]
+
+    for index, (method, path, body) in enumerate(operations):
+        app_log.debug("Bulk operation %d: %s %s" % (index, method, path))
+        try:
+            resource = parse_url_path(path, schema, idl, method)
+            if resource is None:
+                raise NotFound("Resource '%s' not found" % path)
+
+            snapshot = _get_txn_changes(txn)
+            if method == REQUEST_TYPE_CREATE:
+                post.post_resource(body, resource, schema, txn, idl,
+                                   commit=False)
+            elif method == REQUEST_TYPE_UPDATE:
+                put.put_resource(body, resource, schema, txn, idl,
+                                 commit=False)
+            elif method == REQUEST_TYPE_PATCH:
+                patch.patch_resource(body, resource, schema, txn, idl,
+                                     path, commit=False)
+            elif method == REQUEST_TYPE_DELETE:
+                delete.delete_resource(resource, schema, txn, idl,
+                                       commit=False)
+        except Exception as e:
+            app_log.debug("Bulk operation %d failed: %s" % (index, e))
+            raise BulkOperationFailed(index, e)
+
+        if results is not None:
+            if _is_txn_changed(txn, snapshot):
+                results.append((method, path, SUCCESS))
+            else:
+                results.append((method, path, UNCHANGED))
+
+    if not commit:
+        return None
+
+    result = txn.commit()
+    return OvsdbTransactionResult(result)
+
+
+def parse_operations(data):
+    """
+    Verifies the operations of a bulk request, returns a list of
+    (method, path, body).
+    """
+    if not isinstance(data, list) or not data:
+        raise DataValidationFailed("A list of operations is expected")
+
+    operations = []
+    for index, operation in enumerate(data):
+        try:
+            if not isinstance(operation, dict):
+                raise DataValidationFailed("Operation is not an object")
+
+            method = operation.get(BULK_KEY_METHOD)
+            if method not in BULK_METHODS:
+                raise DataValidationFailed("Method '%s' is not allowed, "
+                                           "expected one of %s" %
+                                           (method, BULK_METHODS))
+
+            path = operation.get(BULK_KEY_PATH)
+            if not isinstance(path, basestring):
+                raise DataValidationFailed("Missing '%s'" % BULK_KEY_PATH)
+            path = re.sub("/{2,}", "/", path).rstrip('/')
+
+            body = operation.get(BULK_KEY_BODY)
+            if body is None and method != REQUEST_TYPE_DELETE:
+                raise DataValidationFailed("Missing '%s'" % BULK_KEY_BODY)
+
+        except Exception as e:
+            raise BulkOperationFailed(index, e)
+
+        operations.append((method, path, body))
+
+    return operations
+
+
+def _get_txn_changes(txn):
+    # Maps the uuid of each row of the transaction to a copy of its
+    # changes, None for a deleted row
+    return dict((row_uuid, row._changes and dict(row._changes))
+                for row_uuid, row in txn.txn._txn_rows.iteritems())
+
+
+def _is_txn_changed(txn, snapshot):
+    # Whether the rows of the transaction differ from the snapshot of
+    # their changes, values written again being no change
+    txn_rows = txn.txn._txn_rows
+    if any(row_uuid not in txn_rows for row_uuid in snapshot):
+        return True
+
+    for row_uuid, row in txn_rows.iteritems():
+        if row_uuid not in snapshot:
+            if row._changes is None or row._data is None:
+                return True
+            previous = {}
+        else:
+            previous = snapshot[row_uuid]
+            if previous is None or row._changes is None:
+                if previous is not row._changes:
+                    return True
+                continue
+
+        for column_name, datum in row._changes.iteritems():
+            old_datum = previous.get(column_name)
+            if old_datum is None and row._data is not None:
+                old_datum = row._data.get(column_name)
+            if old_datum is None or datum != old_datum:
+                return True
+
+    return False
+
+
+def get_operation_status(method, status):
+    """
+    Returns the HTTP status code of an operation of a bulk request,
+    as if it was requested alone, given the status of the operation.
+    """
+    if method == REQUEST_TYPE_CREATE:
+        return httplib.CREATED
+    elif method == REQUEST_TYPE_UPDATE:
+        return httplib.OK
+    elif status == UNCHANGED and method == REQUEST_TYPE_DELETE:
+        return httplib.OK
+    else:
+        return httplib.NO_CONTENT
@@ -0,0 +1,57 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+from tornado.web import GZipContentEncoding
+
+from opsrest.constants import HTTP_HEADER_ETAG, ETAG_GZIP_SUFFIX
+
+
+class GZipResponseEncoding(GZipContentEncoding):
+    """
+    Compresses the responses of at least min_length bytes with gzip when
+    the client accepts it, responses written in multiple chunks (e.g.
+    streamed collections) are always compressed.
+
+    The compressed and uncompressed responses are different
+    representations of a resource, the ETag of a compressed response
+    gets ETAG_GZIP_SUFFIX (see strip_etag_suffix()).
+    """
+    def __init__(self, request, min_length=GZipContentEncoding.MIN_LENGTH,
+                 level=GZipContentEncoding.GZIP_LEVEL):
+        super(GZipResponseEncoding, self).__init__(request)
+        self.MIN_LENGTH = min_length
+        self.GZIP_LEVEL = level
+
+    def transform_first_chunk(self, status_code, headers, chunk, finishing):
+        status_code, headers, chunk = \
+            super(GZipResponseEncoding, self).transform_first_chunk(
+                status_code, headers, chunk, finishing)
+
+        etag = headers.get(HTTP_HEADER_ETAG)
+        if self._gzipping and etag is not None and etag.endswith('"'):
+            headers[HTTP_HEADER_ETAG] = etag[:-1] + ETAG_GZIP_SUFFIX + '"'
+
+        return status_code, headers, chunk
+
+
+def strip_etag_suffix(etag):
+    """
+    Returns etag, a quoted entity tag, without the suffix of the ETag of
+    a compressed response.
+    """
+    suffix = ETAG_GZIP_SUFFIX + '"'
+    if etag.endswith(suffix):
+        return etag[:-len(suffix)] + '"'
+
+    return etag
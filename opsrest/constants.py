@@ -19,6 +19,27 @@ from ovs.db.idl import Transaction
 OVSDB_STATUS_DISCONNECTED = 1
 OVSDB_STATUS_CONNECTED = 2
 OVSDB_DEFAULT_CONNECTION_TIMEOUT = 1.0
+# Seconds a committed transaction waits for its reply before it's aborted
+OVSDB_DEFAULT_TRANSACTION_TIMEOUT = 30.0
+# Seconds the changes of concurrent requests are gathered to be committed
+# in a single transaction, and maximum number of requests per transaction
+OVSDB_DEFAULT_GROUP_COMMIT_WINDOW = 0.005
+OVSDB_DEFAULT_GROUP_COMMIT_MAX_OPERATIONS = 256
+
+# Seconds the statistics fetched on demand are kept
+OVSDB_DEFAULT_STATISTICS_TTL = 2.0
+
+# IDL column registration profiles: all the columns, all but the
+# statistics, or only the configuration, reference and index columns
+IDL_REGISTER_ALL = 'all'
+IDL_REGISTER_NO_STATISTICS = 'no-statistics'
+IDL_REGISTER_CONFIG = 'config'
+
+# Encoders of the JSON responses, 'auto' selects the fastest importable
+JSON_ENCODER_AUTO = 'auto'
+JSON_ENCODER_JSON = 'json'
+JSON_ENCODER_SIMPLEJSON = 'simplejson'
+JSON_ENCODER_UJSON = 'ujson'
 
 # All IDL Transaction states
 UNCOMMITTED = Transaction.UNCOMMITTED
@@ -68,7 +89,10 @@ HTTP_HEADER_CONTENT_LENGTH = 'Content-Length'
 HTTP_HEADER_ALLOW = 'Allow'
 
 HTTP_HEADER_CONDITIONAL_IF_MATCH = 'If-Match'
+HTTP_HEADER_CONDITIONAL_IF_NONE_MATCH = 'If-None-Match'
 HTTP_HEADER_ETAG = 'Etag'
+# Suffix of the ETag of responses compressed with gzip
+ETAG_GZIP_SUFFIX = '-gzip'
 
 # HTTP Content Types
 HTTP_CONTENT_TYPE_JSON = 'application/json; charset=UTF-8'
@@ -122,6 +146,15 @@ PASSWD_ERR_INVALID_PARAM = 9
 PASSWD_ERR_PASSWD_UPD_FAIL = 10
 PASSWD_ERR_SEND_FAILED = 11
 
+# Bulk operations, applied in a single transaction
+REST_BULK_PATH = OVSDB_BASE_URI + 'bulk'
+BULK_KEY_METHOD = 'method'
+BULK_KEY_PATH = 'path'
+BULK_KEY_BODY = 'body'
+BULK_KEY_STATUS = 'status'
+BULK_METHODS = [REQUEST_TYPE_CREATE, REQUEST_TYPE_UPDATE,
+                REQUEST_TYPE_PATCH, REQUEST_TYPE_DELETE]
+
 # Audit Log for Configuration changes only
 AUDIT_LOG_ACCEPTED_REQUESTS = {REQUEST_TYPE_CREATE, REQUEST_TYPE_UPDATE,
                                REQUEST_TYPE_DELETE, REQUEST_TYPE_PATCH}
@@ -132,6 +165,18 @@ OPSPLUGIN_DIR = '/usr/share/opsplugins'
 CONFIG_TYPE_RUNNING = "running"
 CONFIG_TYPE_STARTUP = "startup"
 
+# Dry run of a full configuration write, see opsrest.dryrun
+REST_QUERY_PARAM_DRY_RUN = 'dry-run'
+DRY_RUN_KEY_TABLES = 'tables'
+DRY_RUN_KEY_INSERT = 'insert'
+DRY_RUN_KEY_UPDATE = 'update'
+DRY_RUN_KEY_DELETE = 'delete'
+DRY_RUN_KEY_ERRORS = 'errors'
+DRY_RUN_KEY_TIME = 'time'
+DRY_RUN_KEY_WRITE_TIME = 'write'
+DRY_RUN_KEY_VALIDATION_TIME = 'validation'
+DRY_RUN_KEY_TOTAL_TIME = 'total'
+
 # PATCH operation's keys according to RFC 6902
 PATCH_KEY_OP = 'op'
 PATCH_KEY_PATH = 'path'
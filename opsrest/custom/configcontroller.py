@@ -18,12 +18,14 @@ from tornado import gen
 # Local imports
 import ops.dc
 import ops.cfgd
+from opsrest import dryrun
 from opsrest.exceptions import DataValidationFailed,\
     NotModified, InternalError, NotFound, APIException
 from opsrest.transaction import OvsdbTransactionResult
 from opsrest.custom.basecontroller import BaseController
 from opsrest.constants import CONFIG_TYPE_RUNNING,\
-    CONFIG_TYPE_STARTUP, SUCCESS, UNCHANGED, INCOMPLETE
+    CONFIG_TYPE_STARTUP, SUCCESS, UNCHANGED, INCOMPLETE,\
+    REST_QUERY_PARAM_DRY_RUN
 
 
 class ConfigController(BaseController):
@@ -35,6 +37,9 @@ class ConfigController(BaseController):
 
     @gen.coroutine
     def update(self, item_id, data, current_user, query_args):
+        if self.get_dry_run(query_args):
+            raise gen.Return(self.dry_run(data, query_args))
+
         try:
             request_type = self.get_request_type(query_args)
             self.check_config_type(request_type)
@@ -52,15 +57,21 @@ class ConfigController(BaseController):
                     yield self.txn.event.wait()
                     status = self.txn.status
             else:
-                # FIXME: This is a blocking call.
-                (status, error) = ops.cfgd.write(data)
+                cfg_manager = self.get_cfg_manager()
+                self.txn = cfg_manager.get_new_transaction()
+                (status, error) = ops.cfgd.write(data, cfg_manager.idl,
+                                                 self.txn.txn)
+                app_log.debug('Transaction result: %s', status)
+                if status == INCOMPLETE:
+                    cfg_manager.monitor_transaction(self.txn)
+                    yield self.txn.event.wait()
+                    status = self.txn.status
             if status != SUCCESS:
                 if status == UNCHANGED:
                     raise NotModified
                 else:
-                    if request_type == CONFIG_TYPE_RUNNING:
-                        error = self.txn.get_error()
-                        self.txn.abort()
+                    error = self.txn.get_error()
+                    self.txn.abort()
                     raise APIException("Error: %s" % error)
         except Exception as e:
             if self.txn:
@@ -73,10 +84,11 @@ class ConfigController(BaseController):
         self.check_config_type(request_type)
         result = None
         if request_type == CONFIG_TYPE_RUNNING:
-            result = ops.dc.read(self.schema, self.idl)
+            # The running configuration is maintained in the IDL row
+            # cache, only the modified subtrees are read again
+            result = ops.dc.read(self.schema, self.idl, cached=True)
         else:
-            # FIXME: This is a blocking call
-            result = ops.cfgd.read()
+            result = ops.cfgd.read(self.get_cfg_manager().idl)
         if result is None:
             if request_type == CONFIG_TYPE_RUNNING:
                 raise InternalError
@@ -84,6 +96,39 @@ class ConfigController(BaseController):
                 raise NotFound
         return result
 
+    def dry_run(self, data, query_args):
+        """
+        Returns what writing the running configuration data would do,
+        without committing it, see dryrun.dry_run_config.
+        """
+        request_type = self.get_request_type(query_args)
+        self.check_config_type(request_type)
+        if request_type != CONFIG_TYPE_RUNNING:
+            raise DataValidationFailed("%s is only supported for the %s "
+                                       "configuration" %
+                                       (REST_QUERY_PARAM_DRY_RUN,
+                                        CONFIG_TYPE_RUNNING))
+
+        txn = self.context.manager.get_new_transaction()
+        return dryrun.dry_run_config(data, self.schema, self.idl, txn.txn)
+
+    def get_dry_run(self, query_args):
+        if not query_args or REST_QUERY_PARAM_DRY_RUN not in query_args:
+            return False
+
+        value = query_args[REST_QUERY_PARAM_DRY_RUN][0]
+        if value not in ('true', 'false'):
+            error = "Invalid %s value: %s, expected true or false" %\
+                    (REST_QUERY_PARAM_DRY_RUN, value)
+            raise DataValidationFailed(error)
+        return value == 'true'
+
+    def get_cfg_manager(self):
+        cfg_manager = self.context.cfg_manager
+        if not cfg_manager.connected:
+            raise InternalError("Config DB is not available")
+        return cfg_manager
+
     def get_request_type(self, query_args):
         app_log.debug('Query args: %s', query_args)
         if not query_args:
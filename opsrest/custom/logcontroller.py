@@ -16,7 +16,8 @@
 # Third party imports
 from tornado.log import app_log
 from tornado import gen
-import subprocess
+from tornado import iostream
+from tornado import process
 import json
 import re
 import time
@@ -25,7 +26,7 @@ import time
 from opsrest.custom.basecontroller import BaseController
 from opsrest.exceptions import DataValidationFailed
 from opsrest.constants import *
-from opsrest.utils import getutils, jsonutils
+from opsrest.utils import getutils, jsonutils, utils
 
 # Constants
 LOGS_OPTIONS = "options"
@@ -44,6 +45,7 @@ REST_LOGS_PARAM_GID = "_GID"
 REST_LOGS_PARAM_SYSLOG_IDENTIFIER = "SYSLOG_IDENTIFIER"
 JOURNALCTL_CMD = "journalctl"
 OUTPUT_FORMAT = "--output=json"
+LINES_OPTION = "--lines="
 REVERSE_RECENT_ENTRIES = "-r"
 NEWEST_ENTRY = 0
 TRUNCATE_ENTRIES = 1000
@@ -168,7 +170,7 @@ class LogController(BaseController):
     # This function is used to aggregate the different options from the uri
     # and form a journalctl command to be executed to get the logs
     # desired by the user
-    def get_log_cmd_options(self, query_args):
+    def get_log_cmd_options(self, query_args, lines=None):
         log_cmd_options = [JOURNALCTL_CMD]
         log_cmd_options.append(REVERSE_RECENT_ENTRIES)
         if query_args:
@@ -179,10 +181,55 @@ class LogController(BaseController):
                     else:
                         log_cmd_options.append("--" + str(k) + "=" + str(v[0]))
 
+        # Let journalctl stop after the entries needed for the
+        # requested page
+        if lines is not None:
+            log_cmd_options.append(LINES_OPTION + str(lines))
+
         log_cmd_options.append(OUTPUT_FORMAT)
 
         return log_cmd_options
 
+    # This function runs journalctl without blocking the IOLoop and decodes
+    # the entries as they are read. The first 'offset' entries are only
+    # counted, and the reading stops after 'offset + limit' entries.
+    # Returns the decoded entries and the number of entries read
+    @gen.coroutine
+    def read_log_entries(self, log_cmd_options, offset, limit):
+        proc = process.Subprocess(log_cmd_options,
+                                  stdout=process.Subprocess.STREAM)
+        entries = []
+        count = 0
+        try:
+            while count < offset + limit:
+                line = yield proc.stdout.read_until('\n')
+                if not line.strip():
+                    continue
+
+                if count >= offset:
+                    entries.extend(jsonutils.convert_string_to_json(line))
+                count += 1
+        except iostream.StreamClosedError:
+            pass
+
+        complete = count >= offset + limit
+        if complete:
+            # All the entries needed have been read, the process is
+            # reaped by the exit callback, do not poll() it here
+            try:
+                proc.proc.kill()
+            except OSError:
+                pass
+        proc.stdout.close()
+
+        ret = yield proc.wait_for_exit(raise_error=False)
+        if ret != 0 and not complete:
+            app_log.error("Empty log: journalctl returned %s" % ret)
+            entries = []
+            count = 0
+
+        raise gen.Return((entries, count))
+
     # This function is to handle the after-cursor filter. Since the data for
     # after cursor consists of ';' which is a delimiter for the web queries,
     # this function is required to merge the query arguments for this filter
@@ -206,34 +253,30 @@ class LogController(BaseController):
 
         self.validate_keywords(query_args)
         self.validate_args_data(query_args)
-        log_cmd_options = self.get_log_cmd_options(query_args)
-        response = {}
-        app_log.debug("Calling journalctl")
-        try:
-            response = subprocess.check_output(log_cmd_options)
-        except subprocess.CalledProcessError as c:
-            app_log.error("Empty log: %s" % c.output)
-            response = {}
-
-        if response:
-            response = jsonutils.convert_string_to_json(response)
-            if REST_QUERY_PARAM_OFFSET in query_args:
-                offset = int(getutils.get_query_arg(REST_QUERY_PARAM_OFFSET,
-                             query_args))
-            else:
-                offset = NEWEST_ENTRY
-            if REST_QUERY_PARAM_LIMIT in query_args:
-                limit = int(getutils.get_query_arg(REST_QUERY_PARAM_LIMIT,
-                            query_args))
-            else:
-                limit = TRUNCATE_ENTRIES
 
-            if offset is not None or limit is not None:
-                response = getutils.paginate_get_results(response,
-                                                         offset,
-                                                         limit)
+        if REST_QUERY_PARAM_OFFSET in query_args:
+            offset = int(getutils.get_query_arg(REST_QUERY_PARAM_OFFSET,
+                         query_args))
         else:
+            offset = NEWEST_ENTRY
+        if REST_QUERY_PARAM_LIMIT in query_args:
+            limit = int(getutils.get_query_arg(REST_QUERY_PARAM_LIMIT,
+                        query_args))
+        else:
+            limit = TRUNCATE_ENTRIES
+
+        log_cmd_options = self.get_log_cmd_options(query_args,
+                                                   offset + limit)
+        app_log.debug("Calling journalctl")
+        (response, count) = yield self.read_log_entries(log_cmd_options,
+                                                        offset, limit)
+
+        if not count:
             response = {"Empty logs": "No logs present for the combination" +
                         " of arguments selected"}
+        elif offset > count:
+            error_json = utils.to_json_error("Pagination index out of range",
+                                             None, REST_QUERY_PARAM_OFFSET)
+            response = {ERROR: error_json}
 
-        return (response)
+        raise gen.Return(response)
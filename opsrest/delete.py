@@ -24,10 +24,10 @@ import httplib
 from tornado.log import app_log
 
 
-def delete_resource(resource, schema, txn, idl):
+def delete_resource(resource, schema, txn, idl, commit=True):
 
     if resource.next is None:
-        return None
+        raise MethodNotAllowed
 
     # get the last resource pair
     while True:
@@ -63,5 +63,8 @@ def delete_resource(resource, schema, txn, idl):
     elif resource.relation == OVSDB_SCHEMA_TOP_LEVEL:
         utils.delete_all_references(resource.next, schema, idl)
 
+    if not commit:
+        return None
+
     result = txn.commit()
     return OvsdbTransactionResult(result)
@@ -0,0 +1,184 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+import time
+
+from tornado.log import app_log
+
+import ops.dc
+from opsrest.constants import *
+from runconfig.validatoradapter import ValidatorAdapter
+
+
+def dry_run_config(data, schema, idl, txn):
+    """
+    Prepares the write of the full running configuration data in txn
+    (an ovs.db.idl.Transaction) as ops.dc.write does, and aborts it.
+    Returns the rows that would be inserted, updated and deleted per
+    table, the errors of the write and of the custom validators, and
+    the time spent in milliseconds:
+
+    {"tables": {"VLAN": {"insert": 2, "update": 1, "delete": 0}},
+     "errors": [],
+     "time": {"write": 12.5, "validation": 3.2, "total": 15.7}}
+
+    Only the inserted and updated rows are validated, deleted rows are
+    not available in the transaction anymore.
+    """
+    errors = []
+    start = time.time()
+    try:
+        try:
+            ops.dc.write(data, schema, idl, txn, commit=False)
+        except Exception as e:
+            app_log.debug("Dry run write failed: %s" % e)
+            errors.append(str(e))
+        write_time = time.time()
+
+        tables = get_transaction_counts(txn)
+        errors.extend(validate_transaction(txn, schema, idl))
+        validation_time = time.time()
+    finally:
+        txn.abort()
+
+    return {DRY_RUN_KEY_TABLES: tables,
+            DRY_RUN_KEY_ERRORS: errors,
+            DRY_RUN_KEY_TIME: {
+                DRY_RUN_KEY_WRITE_TIME: _elapsed_ms(start, write_time),
+                DRY_RUN_KEY_VALIDATION_TIME: _elapsed_ms(write_time,
+                                                         validation_time),
+                DRY_RUN_KEY_TOTAL_TIME: _elapsed_ms(start,
+                                                    validation_time)}}
+
+
+def _elapsed_ms(start, end):
+    return round((end - start) * 1000, 3)
+
+
+def _get_row_op(row):
+    # The operation txn.commit() would send for row, if any
+    if row._changes is None:
+        return DRY_RUN_KEY_DELETE
+    elif row._data is None:
+        return DRY_RUN_KEY_INSERT
+    for column_name, datum in row._changes.iteritems():
+        if row._data.get(column_name) != datum:
+            return DRY_RUN_KEY_UPDATE
+    return None
+
+
+def get_transaction_counts(txn):
+    """
+    Returns the number of rows inserted, updated and deleted by txn per
+    table, rows set to their current values are not counted.
+    """
+    tables = {}
+    for row in txn._txn_rows.itervalues():
+        op = _get_row_op(row)
+        if op is None:
+            continue
+
+        counts = tables.get(row._table.name)
+        if counts is None:
+            counts = {DRY_RUN_KEY_INSERT: 0,
+                      DRY_RUN_KEY_UPDATE: 0,
+                      DRY_RUN_KEY_DELETE: 0}
+            tables[row._table.name] = counts
+        counts[op] += 1
+
+    return tables
+
+
+def _get_txn_parents(txn, schema):
+    # Maps the uuid of the forward children referenced by the rows of
+    # txn to their parent row, these references are not part of the
+    # reverse reference map until they're committed
+    parents = {}
+    for row in txn._txn_rows.itervalues():
+        table_name = row._table.name
+        if row._changes is None or table_name not in schema.ovs_tables:
+            continue
+
+        references = schema.ovs_tables[table_name].references
+        for column_name, reference in references.iteritems():
+            if reference.relation != OVSDB_SCHEMA_CHILD or \
+                    column_name not in row._table.columns:
+                continue
+
+            children = row.__getattr__(column_name)
+            if isinstance(children, dict):
+                children = children.values()
+            for child in children:
+                if child is not None:
+                    parents[child.uuid] = row
+
+    return parents
+
+
+def _get_parent_row(row, table_name, schema, idl, txn_parents):
+    # Returns the parent row of a child row modified in the transaction
+    table_schema = schema.ovs_tables[table_name]
+    for column_name, reference in table_schema.references.iteritems():
+        if reference.relation == OVSDB_SCHEMA_PARENT:
+            return row.__getattr__(column_name)
+
+    parent_row = txn_parents.get(row.uuid)
+    if parent_row is not None or row._data is None:
+        return parent_row
+
+    # Forward child of a parent not modified by the transaction
+    parent_schema = schema.ovs_tables[table_schema.parent]
+    for column_name, reference in parent_schema.references.iteritems():
+        if reference.relation != OVSDB_SCHEMA_CHILD or \
+                reference.ref_table != table_name:
+            continue
+
+        parents = idl.reference_to_rows(table_name, row.uuid,
+                                        table_schema.parent, column_name)
+        if parents:
+            return parents[0][0]
+
+    return None
+
+
+def validate_transaction(txn, schema, idl):
+    """
+    Runs the custom validators of the rows inserted and updated by txn,
+    returns the validation errors.
+    """
+    validator_adapter = ValidatorAdapter(idl, schema)
+    txn_parents = _get_txn_parents(txn, schema)
+    for row in txn._txn_rows.values():
+        op = _get_row_op(row)
+        table_name = row._table.name
+        if op not in (DRY_RUN_KEY_INSERT, DRY_RUN_KEY_UPDATE) or \
+                table_name not in schema.ovs_tables:
+            continue
+
+        method = REQUEST_TYPE_CREATE if op == DRY_RUN_KEY_INSERT else \
+            REQUEST_TYPE_UPDATE
+
+        parent_table = schema.ovs_tables[table_name].parent
+        parent_row = None
+        if parent_table is not None:
+            parent_row = _get_parent_row(row, table_name, schema, idl,
+                                         txn_parents)
+            if parent_row is None:
+                parent_table = None
+
+        validator_adapter.add_resource_op(method, row, table_name,
+                                          parent_row, parent_table)
+
+    validator_adapter.exec_validators_with_ops()
+    return validator_adapter.errors
@@ -13,7 +13,8 @@
 #  under the License.
 
 import httplib
-import json
+
+from opsrest.utils import jsonutils
 
 
 class APIException(Exception):
@@ -29,7 +30,7 @@ class APIException(Exception):
     def __str__(self):
         error_json = {}
         error_json['message'] = self.detail
-        return json.dumps(error_json)
+        return jsonutils.dumps(error_json)
 
 
 class DataValidationFailed(APIException):
@@ -106,3 +107,28 @@ class PasswordChangeError(APIException):
         self.detail = detail
         self.status_code = status_code
         self.status = httplib.responses[status_code]
+
+
+class BulkOperationFailed(APIException):
+    """
+    Reports the failure of an operation of a bulk request, with the
+    status code of the original error.
+    """
+    def __init__(self, index, error):
+        self.index = index
+        if isinstance(error, APIException):
+            self.status_code = error.status_code
+            self.detail = error.detail
+        elif isinstance(error, ValueError):
+            self.status_code = httplib.BAD_REQUEST
+            self.detail = str(error)
+        else:
+            self.status_code = httplib.INTERNAL_SERVER_ERROR
+            self.detail = str(error)
+        self.status = httplib.responses[self.status_code]
+
+    def __str__(self):
+        error_json = {}
+        error_json['message'] = self.detail
+        error_json['operation'] = self.index
+        return jsonutils.dumps(error_json)
@@ -15,9 +15,11 @@
 from opsrest.constants import *
 from opsrest.utils import utils
 from opsrest.utils import getutils
+from opsrest.utils import jsonutils
 from opsrest import verify
 from opsrest.exceptions import NotFound
 
+import hashlib
 import httplib
 import types
 
@@ -25,7 +27,13 @@ from tornado.log import app_log
 
 
 def get_resource(idl, resource, schema, uri=None,
-                 selector=None, query_arguments=None):
+                 selector=None, query_arguments=None, stream_min_rows=None):
+    '''
+    Returns the JSON data of a GET on resource. If stream_min_rows is
+    set and the resource is a collection with depth of at least
+    stream_min_rows elements, a generator rendering the elements one at
+    a time is returned instead of a list.
+    '''
 
     depth = getutils.get_depth_param(query_arguments)
 
@@ -60,13 +68,101 @@ def get_resource(idl, resource, schema, uri=None,
         raise Exception({'status': httplib.METHOD_NOT_ALLOWED})
 
     return get_resource_from_db(resource, schema, idl, uri,
-                                selector, query_arguments, depth)
+                                selector, query_arguments, depth,
+                                stream_min_rows)
+
+
+def get_resource_body(idl, resource, schema, uri=None,
+                      selector=None, query_arguments=None,
+                      stream_min_rows=None):
+    '''
+    Same as get_resource() but returns a (result, body, etag) tuple.
+
+    On success body is the JSON document of the resource and etag a
+    strong ETag, the hash of body, result may be None. Both are cached
+    in the IDL row cache until one of the rows body was rendered from
+    changes. On failure body and etag are None and
+    result is what get_resource() returned.
+
+    Responses streamed (see get_resource()) are not cached, result is
+    the generator of the elements and body and etag are None.
+    '''
+    if idl.txn is not None:
+        result = get_resource(idl, resource, schema, uri, selector,
+                              query_arguments)
+        if result is None or (isinstance(result, dict) and ERROR in result):
+            return (result, None, None)
+        body = jsonutils.dumps(result)
+        return (result, body, _compute_etag(body))
+
+    row_cache = idl.row_cache
+    key = _get_response_key(resource, uri, query_arguments)
+    body = row_cache.get(key)
+    if body is not None:
+        return (None, body, row_cache.get_etag(key))
+
+    row_cache.begin()
+    try:
+        result = get_resource(idl, resource, schema, uri, selector,
+                              query_arguments, stream_min_rows)
+    except:
+        row_cache.abort()
+        raise
+
+    if isinstance(result, types.GeneratorType):
+        row_cache.abort()
+        return (result, None, None)
+
+    if result is None or (isinstance(result, dict) and ERROR in result):
+        row_cache.end(key, None)
+        return (result, None, None)
+
+    body = jsonutils.dumps(result)
+    etag = _compute_etag(body)
+    row_cache.end(key, body, etag)
+    return (result, body, etag)
+
+
+def get_cached_etag(idl, resource, uri=None, query_arguments=None):
+    '''
+    Returns the ETag of the cached response of a GET on resource, or
+    None if the response is not cached (or not valid anymore).
+    '''
+    if idl.txn is not None:
+        return None
+
+    key = _get_response_key(resource, uri, query_arguments)
+    return idl.row_cache.get_etag(key)
+
+
+def _get_response_key(resource, uri, query_arguments):
+
+    # The rows the path resolved to are part of the key, a path can
+    # refer to a different row once a resource is deleted and re-created
+    rows = []
+    while resource is not None:
+        row = resource.row
+        if isinstance(row, list):
+            row = None
+        rows.append((resource.table, row))
+        resource = resource.next
+
+    args = []
+    if query_arguments:
+        for name in sorted(query_arguments):
+            args.append((name, tuple(query_arguments[name])))
+
+    return ('response', uri, tuple(rows), tuple(args))
+
+
+def _compute_etag(body):
+    return '"%s"' % hashlib.sha1(body).hexdigest()
 
 
 # get resource from db using resource->next_resource pair
 def get_resource_from_db(resource, schema, idl, uri=None,
                          selector=None, query_arguments=None,
-                         depth=0):
+                         depth=0, stream_min_rows=None):
 
     resource_result = None
     uri = _get_uri(resource, schema, uri)
@@ -106,27 +202,142 @@ def get_resource_from_db(resource, schema, idl, uri=None,
     app_log.debug("Keys % s" % keys_args)
 
     # Get the resource result according to result type
-    if is_collection:
+    if is_collection and depth:
+        # Apply filters, sorting, and pagination
+        rows = get_collection_window(resource, schema, idl, uri, selector,
+                                     depth, sorting_args, filter_args,
+                                     offset, limit)
+        if not isinstance(rows, list):
+            return rows
+
+        elements = _get_collection_elements(rows, table, schema, idl, uri,
+                                            selector, depth, keys_args)
+        if stream_min_rows is not None and len(rows) >= stream_min_rows:
+            return elements
+        resource_result = list(elements)
+    elif is_collection:
         resource_result = get_collection_json(resource, schema, idl, uri,
                                               selector, depth)
     else:
         resource_result = get_row_json(resource.next.row, resource.next.table,
                                        schema, idl, uri, selector, depth)
 
-    # Post process data if it necessary
-    if (resource_result and depth and isinstance(resource_result, list)):
-        # Apply filters, sorting, and pagination
-        resource_result = getutils.post_process_get_data(resource_result,
-                                                         sorting_args,
-                                                         filter_args, offset,
-                                                         limit, keys_args,
-                                                         schema, table,
-                                                         selector,
-                                                         categorize=True)
-
     return resource_result
 
 
+def get_collection_window(resource, schema, idl, uri, selector, depth,
+                          sorting_args, filter_args, offset, limit):
+    '''
+    Returns the uuids of the rows of a collection with depth, after
+    filtering, sorting and pagination. Filters and sorting are evaluated
+    on the filter and sort columns of each row only, so that just the
+    rows within the offset/limit window have to be rendered.
+    '''
+    table = resource.next.table
+    rows = get_collection_rows(resource, schema, idl)
+
+    if not rows:
+        # Offset and limit are still validated
+        return getutils.paginate_get_results(rows, offset, limit)
+
+    elements = [(None, row) for row in rows]
+
+    columns = set(filter_args)
+    sort_columns = []
+    reverse_sort = False
+    if sorting_args:
+        # Last sorting argument is a boolean
+        # indicating if sort should be reversed
+        sort_columns = sorting_args[:-1]
+        reverse_sort = sorting_args[-1]
+        columns.update(sort_columns)
+
+    if columns:
+        # Render only the columns used to filter and sort
+        elements = []
+        for row in rows:
+            idl.row_cache.track(table, row)
+            row_json = _get_row_json(row, table, schema, idl, uri, selector,
+                                     depth, columns=columns)
+            element = getutils.flatten_get_data([row_json])[0]
+            elements.append((element, row))
+
+    if filter_args:
+        filter_sets = getutils.get_filter_sets(filter_args, schema, table)
+        elements = [item for item in elements
+                    if getutils.match_filters(item[0], filter_sets)]
+
+    if sort_columns:
+        elements = sorted(
+            elements,
+            key=lambda item: tuple(getutils.process_sort_value(item[0], k)
+                                   for k in sort_columns),
+            reverse=reverse_sort)
+
+    elements = getutils.paginate_get_results(elements, offset, limit)
+    if isinstance(elements, dict):
+        return elements
+
+    return [item[1] for item in elements]
+
+
+def _get_collection_elements(rows, table, schema, idl, uri, selector, depth,
+                             keys_args):
+    # Generator rendering the rows of a collection with depth. When the
+    # elements are streamed the IDL can be updated between two of them,
+    # rows deleted in the meantime are skipped
+    db_table = idl.tables[table]
+    for row in rows:
+        if row not in db_table.rows:
+            continue
+
+        row_json = get_row_json(row, table, schema, idl, uri, selector, depth)
+
+        # Specific column retrieval, and grouping of the columns
+        # in configuration, statistics and status
+        yield getutils.post_process_get_data([row_json], [], {}, None, None,
+                                             keys_args, schema, table,
+                                             selector, categorize=True)[0]
+
+
+def get_collection_rows(resource, schema, idl):
+    '''
+    Returns the uuids of the rows of the collection resource.next,
+    in the order they are listed by get_collection_json
+    '''
+    if resource.relation is OVSDB_SCHEMA_TOP_LEVEL:
+        table = resource.next.table
+        idl.row_cache.track(table, None)
+        return [row.uuid for row in idl.tables[table].rows.itervalues()]
+
+    elif resource.relation is OVSDB_SCHEMA_CHILD:
+        table = resource.table
+        row = resource.row
+        column = resource.column
+        idl.row_cache.track(table, row)
+        db_col = idl.tables[table].rows[row].__getattr__(column)
+        return [_get_referenced_row(schema, table, row, column, value,
+                                    idl).uuid
+                for value in db_col]
+
+    elif resource.relation is OVSDB_SCHEMA_BACK_REFERENCE:
+        table = resource.next.table
+        references = schema.ovs_tables[table].references
+        _refCol = None
+        for key, value in references.iteritems():
+            if (value.relation == OVSDB_SCHEMA_PARENT and
+                    value.ref_table == resource.table):
+                _refCol = key
+                break
+
+        if _refCol is None:
+            return None
+
+        idl.row_cache.track(table, None)
+        return [row.uuid
+                for row in idl.parent_to_rows(table, _refCol, resource.row)]
+
+
 def get_collection_json(resource, schema, idl, uri, selector, depth):
 
     if resource.relation is OVSDB_SCHEMA_TOP_LEVEL:
@@ -150,73 +361,87 @@ def get_collection_json(resource, schema, idl, uri, selector, depth):
 def get_row_json(row, table, schema, idl, uri, selector=None,
                  depth=0, depth_counter=0):
 
+    # Rows being modified by a transaction are not cached
+    if idl.txn is not None:
+        return _get_row_json(row, table, schema, idl, uri, selector,
+                             depth, depth_counter)
+
+    # The cached data is dropped by the IDL when the row, or any row
+    # read to render it, changes
+    row_cache = idl.row_cache
+    key = (table, row, selector, depth, depth_counter, uri)
+    data = row_cache.get(key)
+    if data is not None:
+        return data
+
+    row_cache.begin()
+    try:
+        row_cache.track(table, row)
+        data = _get_row_json(row, table, schema, idl, uri, selector,
+                             depth, depth_counter)
+    except:
+        row_cache.abort()
+        raise
+
+    row_cache.end(key, data)
+    return data
+
+
+def _get_row_json(row, table, schema, idl, uri, selector=None,
+                  depth=0, depth_counter=0, columns=None):
+
     depth_counter += 1
-    db_table = idl.tables[table]
-    db_row = db_table.rows[row]
-    schema_table = schema.ovs_tables[table]
+    db_row = idl.tables[table].rows[row]
+
+    plan = get_render_plan(table, selector, schema, idl)
+    if columns is not None:
+        plan = plan.select(columns)
 
-    config_keys = {}
     config_data = {}
-    if selector is None or selector == OVSDB_SCHEMA_CONFIG:
-        config_keys = schema_table.config
-        config_data = utils.row_to_json(db_row, config_keys)
-    # To remove the unnecessary empty values from the config data
-    config_data = {key: config_data[key] for key in config_keys
-                   if not(config_data[key] == None or
-                   config_data[key] == {} or config_data[key] == [])}
-
-    stats_keys = {}
-    stats_data = {}
-    if selector is None or selector == OVSDB_SCHEMA_STATS:
-        stats_keys = schema_table.stats
-        stats_data = utils.row_to_json(db_row, stats_keys)
-    # To remove all the empty columns from the satistics data
-    stats_data = {key: stats_data[key] for key in stats_keys
-                  if stats_data[key]}
-
-    status_keys = {}
-    status_data = {}
-    if selector is None or selector == OVSDB_SCHEMA_STATUS:
-        status_keys = schema_table.status
-        status_data = utils.row_to_json(db_row, status_keys)
-    # To remove all the empty columns from the status data
-    status_data = {key: status_data[key] for key in status_keys
-                   if status_data[key]}
-
-    references = schema_table.references
-    reference_data = []
-    for key in references:
-        # Ignore parent column in case of back references as we
-        # already are in the child table whose row we need to fetch
-        if references[key].ref_table == schema_table.parent:
-            continue
+    for key, convert in plan.config:
+        value = convert(db_row.__getattr__(key))
+        # To remove the unnecessary empty values from the config data
+        if not (value is None or value == {} or value == []):
+            config_data[key] = value
 
-        if (depth_counter >= depth):
-            depth = 0
+    # Empty columns are removed from the statistics and status data
+    stats_data = {}
+    for key, convert in plan.stats:
+        value = convert(db_row.__getattr__(key))
+        if value:
+            stats_data[key] = value
+
+    if plan.statistics:
+        stats_row = idl.statistics.get_row(table, row)
+        if stats_row is not None:
+            for key, convert in plan.statistics:
+                value = convert(stats_row.__getattr__(key))
+                if value:
+                    stats_data[key] = value
 
-        temp = get_column_json(key, row, table, schema,
-                               idl, uri, selector, depth,
-                               depth_counter)
+    status_data = {}
+    for key, convert in plan.status:
+        value = convert(db_row.__getattr__(key))
+        if value:
+            status_data[key] = value
+
+    if (depth_counter >= depth):
+        depth = 0
+
+    category_data = {OVSDB_SCHEMA_CONFIG: config_data,
+                     OVSDB_SCHEMA_STATS: stats_data,
+                     OVSDB_SCHEMA_STATUS: status_data}
+    for key, category in plan.references:
+        reference_data = get_column_json(key, row, table, schema,
+                                         idl, uri, selector, depth,
+                                         depth_counter)
 
         # The condition below is used to discard the empty list of references
         # in the data returned for get requests
-        if not temp:
+        if not reference_data:
             continue
 
-        reference_data = temp
-
-        # depending upon the category of reference
-        # pair them with the right data set
-        category = references[key].category
-
-        if config_keys and category == OVSDB_SCHEMA_CONFIG:
-            config_data.update({key: reference_data})
-
-        elif stats_keys and category == OVSDB_SCHEMA_STATS:
-            stats_data.update({key: reference_data})
-
-        elif status_keys and category == OVSDB_SCHEMA_STATUS:
-            status_data.update({key: reference_data})
+        category_data[category][key] = reference_data
 
     # TODO Data categorization should be refactored as it
     # is also executed when sorting and filtering results
@@ -227,10 +452,125 @@ def get_row_json(row, table, schema, idl, uri, selector=None,
     return data
 
 
+class RenderPlan(object):
+    """
+    The columns of a table rendered by _get_row_json() for a selector,
+    computed once from the REST schema.
+
+    config, stats and status are tuples of (column name, converter) of
+    the columns replicated by the IDL, statistics those fetched on
+    demand (see opsrest.statistics). references is a tuple of (column
+    name, category) of the reference columns to render, but the one to
+    the parent table.
+    """
+    def __init__(self, config=(), stats=(), statistics=(), status=(),
+                 references=()):
+        self.config = config
+        self.stats = stats
+        self.statistics = statistics
+        self.status = status
+        self.references = references
+
+    @classmethod
+    def from_schema(cls, table, selector, schema, idl):
+        schema_table = schema.ovs_tables[table]
+        db_table = idl.tables[table]
+
+        # Columns not replicated by the IDL (see the registration profile
+        # setting) are left out, but for the statistics fetched on demand
+        if table in idl.partial_tables:
+            replicated = db_table.columns
+        else:
+            replicated = None
+
+        statistics_columns = {}
+        if idl.statistics is not None:
+            statistics_columns = idl.statistics.columns.get(table, {})
+
+        categories = {}
+        if selector is None or selector == OVSDB_SCHEMA_CONFIG:
+            categories[OVSDB_SCHEMA_CONFIG] = schema_table.config
+        if selector is None or selector == OVSDB_SCHEMA_STATS:
+            categories[OVSDB_SCHEMA_STATS] = schema_table.stats
+        if selector is None or selector == OVSDB_SCHEMA_STATUS:
+            categories[OVSDB_SCHEMA_STATUS] = schema_table.status
+
+        def converters(column_keys, columns=None):
+            return tuple((key, utils.get_column_converter(column_keys[key]))
+                         for key in sorted(column_keys)
+                         if columns is None or key in columns)
+
+        config_keys = categories.get(OVSDB_SCHEMA_CONFIG, {})
+        stats_keys = categories.get(OVSDB_SCHEMA_STATS, {})
+        status_keys = categories.get(OVSDB_SCHEMA_STATUS, {})
+
+        references = []
+        for key in sorted(schema_table.references):
+            reference = schema_table.references[key]
+            # Ignore parent column in case of back references as we
+            # already are in the child table whose row we need to fetch
+            if reference.ref_table == schema_table.parent:
+                continue
+
+            if replicated is not None and key not in replicated:
+                continue
+
+            # Only the references of a category that has columns are
+            # paired with its data set
+            if categories.get(reference.category):
+                references.append((key, reference.category))
+
+        return cls(config=converters(config_keys, replicated),
+                   stats=converters(stats_keys, replicated),
+                   statistics=converters(stats_keys, statistics_columns),
+                   status=converters(status_keys, replicated),
+                   references=tuple(references))
+
+    def select(self, columns):
+        """
+        Returns the plan restricted to columns.
+        """
+        def select(entries):
+            return tuple(entry for entry in entries if entry[0] in columns)
+
+        return RenderPlan(config=select(self.config),
+                          stats=select(self.stats),
+                          statistics=select(self.statistics),
+                          status=select(self.status),
+                          references=select(self.references))
+
+
+def get_render_plan(table, selector, schema, idl):
+    key = (table, selector)
+    plan = idl.render_plans.get(key)
+    if plan is None:
+        plan = RenderPlan.from_schema(table, selector, schema, idl)
+        idl.render_plans[key] = plan
+
+    return plan
+
+
+def build_render_plans(schema, idl):
+    """
+    Computes the render plans of all the tables of the REST schema
+    replicated by idl, so rows are rendered without looking up the
+    schema.
+    """
+    idl.render_plans.clear()
+    for table in schema.ovs_tables:
+        if table not in idl.tables:
+            continue
+
+        for selector in (None, OVSDB_SCHEMA_CONFIG, OVSDB_SCHEMA_STATS,
+                         OVSDB_SCHEMA_STATUS):
+            get_render_plan(table, selector, schema, idl)
+
+
 # get list of all table row entries
 def get_table_json(table, schema, idl, uri, selector=None, depth=0):
 
     db_table = idl.tables[table]
+    idl.row_cache.track(table, None)
 
     resources_list = []
 
@@ -254,6 +594,7 @@ def get_column_json(column, row, table, schema, idl, uri,
     db_table = idl.tables[table]
     db_row = db_table.rows[row]
     db_col = db_row.__getattr__(column)
+    idl.row_cache.track(table, row)
 
     current_table = schema.ovs_tables[table]
 
@@ -337,21 +678,19 @@ def get_back_references_json(parent_row, parent_table, table,
         return None
 
     resources_list = []
+    rows = idl.parent_to_rows(table, _refCol, parent_row)
+    idl.row_cache.track(table, None)
 
     if not depth:
-        for row in idl.tables[table].rows.itervalues():
-            ref = row.__getattr__(_refCol)
-            if ref.uuid == parent_row:
-                tmp = utils.get_table_key(row, table, schema, idl, False)
-                _uri = _create_uri(uri, tmp)
-                resources_list.append(_uri)
+        for row in rows:
+            tmp = utils.get_table_key(row, table, schema, idl, False)
+            _uri = _create_uri(uri, tmp)
+            resources_list.append(_uri)
     else:
-        for row in idl.tables[table].rows.itervalues():
-            ref = row.__getattr__(_refCol)
-            if ref.uuid == parent_row:
-                json_row = get_row_json(row.uuid, _refCol, schema, idl, uri,
-                                        selector, depth)
-                resources_list.append(json_row)
+        for row in rows:
+            json_row = get_row_json(row.uuid, table, schema, idl, uri,
+                                    selector, depth)
+            resources_list.append(json_row)
 
     return resources_list
 
@@ -27,7 +27,9 @@ from opsrest.exceptions import APIException, TransactionFailed, \
     ParameterNotAllowed, NotAuthenticated, \
     AuthenticationFailed, ForbiddenMethod
 from opsrest.settings import settings
+from opsrest.compression import strip_etag_suffix
 from opsrest.utils.auditlogutils import audit_log_user_msg, audit
+from opsrest.utils import jsonutils
 from opsrest.utils.getutils import get_query_arg
 from opsrest.utils.utils import redirect_http_to_https
 
@@ -123,11 +125,65 @@ class BaseHandler(web.RequestHandler):
         if data is None:
             return super(BaseHandler, self).compute_etag()
 
+        # data is the body encoded by jsonutils.dumps(), or a list of parts
+        if isinstance(data, basestring):
+            data = [data]
+
         hasher = hashlib.sha1()
         for element in data:
             hasher.update(element)
         return '"%s"' % hasher.hexdigest()
 
+    def check_etag_header(self):
+        '''
+        As web.RequestHandler.check_etag_header(), the ETags of compressed
+        responses match the ETag of the uncompressed response.
+        '''
+        computed_etag = self._headers.get(HTTP_HEADER_ETAG, "")
+        etags = re.findall(r'\*|(?:W/)?"[^"]*"', self.request.headers.get(
+            HTTP_HEADER_CONDITIONAL_IF_NONE_MATCH, ""))
+        if not computed_etag or not etags:
+            return False
+
+        if etags[0] == '*':
+            return True
+
+        # Use a weak comparison when comparing entity-tags
+        def value(etag):
+            if etag.startswith('W/'):
+                etag = etag[2:]
+            return strip_etag_suffix(etag)
+
+        computed_etag = value(computed_etag)
+        for etag in etags:
+            if value(etag) == computed_etag:
+                return True
+
+        return False
+
+    def process_if_none_match(self, etag):
+        '''
+        Returns True if the request has an If-None-Match header matching
+        etag, in that case the status is set to 304 (Not Modified) and
+        the request must be finished without a body.
+        '''
+        if etag is None:
+            return False
+
+        if HTTP_HEADER_CONDITIONAL_IF_NONE_MATCH not in self.request.headers:
+            return False
+
+        app_log.debug("Processing If-None-Match")
+
+        self.set_header(HTTP_HEADER_ETAG, etag)
+        if self.check_etag_header():
+            app_log.debug("Etag %s matches, resource not modified" % etag)
+            self.set_status(httplib.NOT_MODIFIED)
+            return True
+
+        self.clear_header(HTTP_HEADER_ETAG)
+        return False
+
     @gen.coroutine
     def process_if_match(self):
         if HTTP_HEADER_CONDITIONAL_IF_MATCH in self.request.headers:
@@ -137,14 +193,20 @@ class BaseHandler(web.RequestHandler):
             selector = self.get_query_argument(REST_QUERY_PARAM_SELECTOR, None)
             query_arguments = self.request.query_arguments
             result = None
+            current_etag = None
 
             from opsrest.handlers.ovsdbapi import OVSDBAPIHandler
             if isinstance(self, OVSDBAPIHandler):
                 app_log.debug("If-Match is for OVSDBAPIHandler")
-                from opsrest import get
-                result = get.get_resource(self.idl, self.resource_path,
-                                          self.schema, self.request.path,
-                                          selector, query_arguments)
+                # Rendered like for a GET, with the same statistics.
+                # The ETag is cached along with the resource, it is only
+                # rendered again if its rows changed
+                (result, body, current_etag) = \
+                    yield self.render_resource(selector)
+                if body is not None:
+                    result = body
+                else:
+                    result = None
             elif self.controller is not None:
                 app_log.debug("If-Match is for custom resource")
 
@@ -174,9 +236,12 @@ class BaseHandler(web.RequestHandler):
             etags = self.request.headers.get(HTTP_HEADER_CONDITIONAL_IF_MATCH,
                                              "").split(',')
             app_log.debug("Header Etag: %s" % etags)
-            current_etag = self.compute_etag(json.dumps(result))
+            if current_etag is None:
+                current_etag = self.compute_etag(
+                    jsonutils.dumps(result))
             app_log.debug("Current etag: %s" % current_etag)
             for e in etags:
+                e = strip_etag_suffix(e.strip())
                 if e == current_etag or e == '"*"':
                     match = True
                     break
@@ -188,6 +253,8 @@ class BaseHandler(web.RequestHandler):
                 # https://tools.ietf.org/html/rfc7232#section-3.1
                 if self.request.method == REQUEST_TYPE_UPDATE:
                     data = json.loads(self.request.body)
+                    if isinstance(result, basestring):
+                        result = json.loads(result)
                     if OVSDB_SCHEMA_CONFIG in data and \
                         data[OVSDB_SCHEMA_CONFIG] == \
                             result[OVSDB_SCHEMA_CONFIG]:
@@ -0,0 +1,126 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+from tornado import gen
+from tornado.log import app_log
+
+import json
+import httplib
+from functools import partial
+
+from opsrest.handlers import base
+from opsrest.utils import utils
+from opsrest.utils import jsonutils
+from opsrest.constants import *
+from opsrest.exceptions import APIException, LengthRequired
+
+from opsrest import bulk
+
+
+class BulkHandler(base.BaseHandler):
+    """
+    Applies a list of POST, PUT, PATCH and DELETE operations on OVSDB
+    resources in a single transaction, see bulk.bulk_resources. Responds
+    with the status code of each operation, or with the error of the
+    first failed operation if none of them was applied.
+    """
+
+    @gen.coroutine
+    def prepare(self):
+        try:
+            # Call parent's prepare to check authentication
+            super(BulkHandler, self).prepare()
+
+            # Check ovsdb connection before each request
+            if not self.ref_object.manager.connected:
+                self.set_status(httplib.SERVICE_UNAVAILABLE)
+                self.finish()
+
+        except APIException as e:
+            self.on_exception(e)
+            self.finish()
+
+        except Exception, e:
+            self.on_exception(e)
+            self.finish()
+
+    @gen.coroutine
+    def options(self):
+        self.set_header(HTTP_HEADER_ALLOW, ', '.join([REQUEST_TYPE_CREATE,
+                                                      REQUEST_TYPE_OPTIONS]))
+        self.set_status(httplib.OK)
+        self.finish()
+
+    @gen.coroutine
+    def post(self):
+        try:
+
+            if HTTP_HEADER_CONTENT_LENGTH not in self.request.headers:
+                raise LengthRequired
+
+            # get the list of operations
+            operations = json.loads(self.request.body)
+
+            # create a new ovsdb transaction
+            manager = self.ref_object.manager
+            self.txn = manager.get_new_transaction()
+
+            # bulk_resources applies all the operations to the ovsdb
+            # transaction, the manager commits it
+            results = []
+            apply_changes = partial(bulk.bulk_resources, operations,
+                                    self.schema, idl=self.idl, commit=False,
+                                    results=results)
+            status = yield manager.commit_transaction(self.txn,
+                                                      apply_changes)
+
+            # complete transaction
+            self.transaction_complete(results, status)
+
+        except APIException as e:
+            self.on_exception(e)
+
+        except ValueError as e:
+            self.set_status(httplib.BAD_REQUEST)
+            self.set_header(HTTP_HEADER_CONTENT_TYPE,
+                            HTTP_CONTENT_TYPE_JSON)
+            self.write(utils.to_json_error(e))
+
+        except Exception as e:
+            self.on_exception(e)
+
+        self.finish()
+
+    def transaction_complete(self, results, status):
+
+        app_log.debug("Bulk transaction result: %s", status)
+
+        if status not in (SUCCESS, UNCHANGED):
+            error = self.txn.get_error()
+            raise APIException(error)
+
+        response = []
+        for (method, path, operation_status) in results:
+            # Nothing is changed if the transaction itself is unchanged
+            if status == UNCHANGED:
+                operation_status = UNCHANGED
+            response.append({BULK_KEY_METHOD: method,
+                             BULK_KEY_PATH: path,
+                             BULK_KEY_STATUS:
+                             bulk.get_operation_status(method,
+                                                       operation_status)})
+
+        self.set_status(httplib.OK)
+        self.set_header(HTTP_HEADER_CONTENT_TYPE, HTTP_CONTENT_TYPE_JSON)
+        self.write(jsonutils.dumps(response))
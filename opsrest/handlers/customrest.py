@@ -22,6 +22,7 @@ from tornado.log import app_log
 
 # Local imports
 from opsrest.handlers.base import BaseHandler
+from opsrest.utils import jsonutils
 from opsrest.exceptions import APIException, MethodNotAllowed, \
     LengthRequired, ParseError
 from opsrest.constants import\
@@ -81,7 +82,7 @@ class CustomRESTHandler(BaseHandler):
                 self.set_status(httplib.OK)
                 self.set_header(HTTP_HEADER_CONTENT_TYPE,
                                 HTTP_CONTENT_TYPE_JSON)
-                self.write(json.dumps(result))
+                self.write(jsonutils.dumps(result))
         except APIException as e:
             self.on_exception(e)
         except Exception, e:
@@ -131,10 +132,15 @@ class CustomRESTHandler(BaseHandler):
             except:
                 raise ParseError("Malformed JSON request body")
             query_args = self.request.query_arguments
-            yield self.controller.update(resource_id, data,
-                                         self.current_user,
-                                         query_args)
+            result = yield self.controller.update(resource_id, data,
+                                                  self.current_user,
+                                                  query_args)
             self.set_status(httplib.OK)
+            # e.g. the report of a dry run
+            if result is not None:
+                self.set_header(HTTP_HEADER_CONTENT_TYPE,
+                                HTTP_CONTENT_TYPE_JSON)
+                self.write(jsonutils.dumps(result))
         except APIException as e:
             self.on_exception(e)
 
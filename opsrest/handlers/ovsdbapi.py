@@ -13,15 +13,21 @@
 #  under the License.
 
 from tornado import gen
+from tornado import iostream
 from tornado.log import app_log
 
 import json
 import httplib
+import types
+import uuid
+from functools import partial
 
 from opsrest.handlers import base
 from opsrest.parse import parse_url_path
 from opsrest.utils import utils
+from opsrest.utils import jsonutils
 from opsrest.constants import *
+from opsrest.settings import settings
 from opsrest.exceptions import APIException, LengthRequired, \
     ParameterNotAllowed
 from opsrest.utils.getutils import get_filters_args
@@ -60,6 +66,16 @@ class OVSDBAPIHandler(base.BaseHandler):
                     raise ParameterNotAllowed("argument filter is only "
                                               "allowed in %s"
                                               % REQUEST_TYPE_READ)
+                # If-None-Match support, answer with 304 from the
+                # cached ETag without rendering the resource
+                if self.request.method == REQUEST_TYPE_READ:
+                    etag = get.get_cached_etag(self.idl, self.resource_path,
+                                               self.request.path,
+                                               self.request.query_arguments)
+                    if self.process_if_none_match(etag):
+                        self.finish()
+                        return
+
                 # If Match support
                 match = yield self.process_if_match()
                 app_log.debug("If-Match result: %s" % match)
@@ -95,17 +111,26 @@ class OVSDBAPIHandler(base.BaseHandler):
 
             app_log.debug("Query arguments %s" % self.request.query_arguments)
 
-            result = get.get_resource(self.idl, self.resource_path,
-                                      self.schema, self.request.path,
-                                      selector, self.request.query_arguments)
+            (result, body, etag) = yield self.render_resource(
+                selector, settings.get('get_stream_min_rows'))
 
-            if result is None:
-                self.set_status(httplib.NOT_FOUND)
-            elif self.successful_query(result):
+            if isinstance(result, types.GeneratorType):
+                yield self.write_elements(result)
+            elif body is not None:
                 self.set_status(httplib.OK)
                 self.set_header(HTTP_HEADER_CONTENT_TYPE,
                                 HTTP_CONTENT_TYPE_JSON)
-                self.write(json.dumps(result))
+                self.set_header(HTTP_HEADER_ETAG, etag)
+                # finish() doesn't check If-None-Match when the ETag is
+                # set, e.g. when the response wasn't cached in prepare()
+                if self.check_etag_header():
+                    self.set_status(httplib.NOT_MODIFIED)
+                else:
+                    self.write(body)
+            elif result is None:
+                self.set_status(httplib.NOT_FOUND)
+            else:
+                self.successful_query(result)
 
         except APIException as e:
             self.on_exception(e)
@@ -115,6 +140,94 @@ class OVSDBAPIHandler(base.BaseHandler):
 
         self.finish()
 
+    @gen.coroutine
+    def render_resource(self, selector, stream_min_rows=None):
+        '''
+        Returns the (result, body, etag) of get.get_resource_body() for
+        the requested resource, as served by GET and compared with the
+        If-Match header. The statistics not replicated in the IDL are
+        fetched first for the resource, or table for a collection, and
+        on a miss for the tables of the resources rendered with depth.
+        '''
+        statistics = self.idl.statistics
+        if statistics is not None and \
+                selector in (None, OVSDB_SCHEMA_STATS):
+            resource = self.resource_path
+            while resource.next is not None:
+                resource = resource.next
+            if isinstance(resource.row, uuid.UUID):
+                yield statistics.fetch_row(resource.table, resource.row)
+            else:
+                yield statistics.fetch([resource.table])
+            statistics.missing.clear()
+
+        get_resource_body = partial(get.get_resource_body, self.idl,
+                                    self.resource_path, self.schema,
+                                    self.request.path, selector,
+                                    self.request.query_arguments,
+                                    stream_min_rows)
+        (result, body, etag) = get_resource_body()
+
+        if statistics is not None and statistics.missing and \
+                not isinstance(result, types.GeneratorType):
+            yield statistics.fetch()
+            (result, body, etag) = get_resource_body()
+
+        raise gen.Return((result, body, etag))
+
+    @gen.coroutine
+    def write_elements(self, elements):
+        '''
+        Writes a JSON list of elements rendered one at a time, flushing
+        the response every 'get_stream_chunk_rows' elements and letting
+        the IOLoop serve other requests meanwhile.
+
+        Errors raised before the first flush are reported as usual, once
+        the status and part of the list are sent the connection is
+        closed instead, so that the client doesn't take the truncated
+        body as complete.
+        '''
+        self.streaming = True
+        chunk_rows = settings.get('get_stream_chunk_rows', 100)
+
+        self.set_status(httplib.OK)
+        self.set_header(HTTP_HEADER_CONTENT_TYPE, HTTP_CONTENT_TYPE_JSON)
+        self.write('[')
+
+        count = 0
+        try:
+            for element in elements:
+                if count:
+                    self.write(', ')
+                self.write(jsonutils.dumps(element))
+
+                count += 1
+                if count % chunk_rows == 0:
+                    try:
+                        yield self.flush()
+                    except iostream.StreamClosedError:
+                        app_log.debug("Connection closed while streaming")
+                        return
+        except Exception as e:
+            if not self._headers_written:
+                self.clear()
+                raise
+
+            app_log.error("Error while streaming %s, closing the "
+                          "connection: %s" % (self.request.path, e))
+            self.request.connection.close()
+            return
+
+        self.write(']')
+
+    def compute_etag(self, data=None):
+        # The body of a streamed response is not known when the
+        # response is finished, there is no ETag for it
+        if data is None and getattr(self, 'streaming', False):
+            return None
+
+        return super(OVSDBAPIHandler, self).compute_etag(data)
+
     @gen.coroutine
     def post(self):
         try:
@@ -126,21 +239,17 @@ class OVSDBAPIHandler(base.BaseHandler):
             post_data = json.loads(self.request.body)
 
             # create a new ovsdb transaction
-            self.txn = self.ref_object.manager.get_new_transaction()
-
-            # post_resource performs data verficiation, prepares and
-            # commits the ovsdb transaction
-            result = post.post_resource(post_data, self.resource_path,
-                                        self.schema, self.txn,
-                                        self.idl)
-
-            status = result.status
-            if status == INCOMPLETE:
-                self.ref_object.manager.monitor_transaction(self.txn)
-                # on 'incomplete' state we wait until the transaction
-                # completes with either success or failure
-                yield self.txn.event.wait()
-                status = self.txn.status
+            manager = self.ref_object.manager
+            self.txn = manager.get_new_transaction(group=True)
+
+            # post_resource performs data verficiation and prepares the
+            # ovsdb transaction, the manager commits it and waits until
+            # it completes with either success or failure
+            apply_changes = partial(post.post_resource, post_data,
+                                    self.resource_path, self.schema,
+                                    idl=self.idl, commit=False)
+            status = yield manager.commit_transaction(self.txn,
+                                                      apply_changes)
 
             # complete transaction
             self.transaction_complete(status)
@@ -169,20 +278,16 @@ class OVSDBAPIHandler(base.BaseHandler):
             # get the PUT body
             update_data = json.loads(self.request.body)
             # create a new ovsdb transaction
-            self.txn = self.ref_object.manager.get_new_transaction()
-
-            # put_resource performs data verfication, prepares and
-            # commits the ovsdb transaction
-            result = put.put_resource(update_data, self.resource_path,
-                                      self.schema, self.txn, self.idl)
+            manager = self.ref_object.manager
+            self.txn = manager.get_new_transaction(group=True)
 
-            status = result.status
-            if status == INCOMPLETE:
-                self.ref_object.manager.monitor_transaction(self.txn)
-                # on 'incomplete' state we wait until the transaction
-                # completes with either success or failure
-                yield self.txn.event.wait()
-                status = self.txn.status
+            # put_resource performs data verfication and prepares the
+            # ovsdb transaction, committed by the manager
+            apply_changes = partial(put.put_resource, update_data,
+                                    self.resource_path, self.schema,
+                                    idl=self.idl, commit=False)
+            status = yield manager.commit_transaction(self.txn,
+                                                      apply_changes)
 
             # complete transaction
             self.transaction_complete(status)
@@ -211,22 +316,17 @@ class OVSDBAPIHandler(base.BaseHandler):
             # get the PATCH body
             update_data = json.loads(self.request.body)
             # create a new ovsdb transaction
-            self.txn = self.ref_object.manager.get_new_transaction()
-
-            # patch_resource performs data verification, prepares and
-            # commits the ovsdb transaction
-            result = patch.patch_resource(update_data,
-                                          self.resource_path,
-                                          self.schema, self.txn,
-                                          self.idl, self.request.path)
-
-            status = result.status
-            if status == INCOMPLETE:
-                self.ref_object.manager.monitor_transaction(self.txn)
-                # on 'incomplete' state we wait until the transaction
-                # completes with either success or failure
-                yield self.txn.event.wait()
-                status = self.txn.status
+            manager = self.ref_object.manager
+            self.txn = manager.get_new_transaction(group=True)
+
+            # patch_resource performs data verification and prepares the
+            # ovsdb transaction, committed by the manager
+            apply_changes = partial(patch.patch_resource, update_data,
+                                    self.resource_path, self.schema,
+                                    idl=self.idl, uri=self.request.path,
+                                    commit=False)
+            status = yield manager.commit_transaction(self.txn,
+                                                      apply_changes)
 
             # complete transaction
             self.transaction_complete(status)
@@ -251,18 +351,14 @@ class OVSDBAPIHandler(base.BaseHandler):
     def delete(self):
 
         try:
-            self.txn = self.ref_object.manager.get_new_transaction()
-
-            result = delete.delete_resource(self.resource_path,
-                                            self.schema, self.txn,
-                                            self.idl)
-            status = result.status
-            if status == INCOMPLETE:
-                self.ref_object.manager.monitor_transaction(self.txn)
-                # on 'incomplete' state we wait until the transaction
-                # completes with either success or failure
-                yield self.txn.event.wait()
-                status = self.txn.status
+            manager = self.ref_object.manager
+            self.txn = manager.get_new_transaction(group=True)
+
+            apply_changes = partial(delete.delete_resource,
+                                    self.resource_path, self.schema,
+                                    idl=self.idl, commit=False)
+            status = yield manager.commit_transaction(self.txn,
+                                                      apply_changes)
 
             # complete transaction
             self.transaction_complete(status)
@@ -13,25 +13,66 @@
 #  under the License.
 
 import time
+from functools import partial
+from tornado import gen
 from tornado.ioloop import IOLoop
 from tornado.log import app_log
 
 from ovs.db import error
 from ovs.db.idl import SchemaHelper
+import ovs.db.schema
 
 from ops.opsidl import OpsIdl
 from opsrest.transaction import OvsdbTransactionList, OvsdbTransaction
+from opsrest.statistics import StatisticsCache
+from opsrest import get
 from opsrest.constants import \
     OVSDB_DEFAULT_CONNECTION_TIMEOUT,\
-    INCOMPLETE
+    OVSDB_DEFAULT_TRANSACTION_TIMEOUT,\
+    OVSDB_DEFAULT_GROUP_COMMIT_WINDOW,\
+    OVSDB_DEFAULT_GROUP_COMMIT_MAX_OPERATIONS,\
+    OVSDB_DEFAULT_STATISTICS_TTL,\
+    IDL_REGISTER_ALL, IDL_REGISTER_NO_STATISTICS, IDL_REGISTER_CONFIG,\
+    INCOMPLETE, SUCCESS, UNCHANGED
 
 
 class OvsdbConnectionManager:
-    def __init__(self, remote, schema, *args, **kwargs):
+    def __init__(self, remote, schema, restschema=None, group_commit=False,
+                 group_commit_window=OVSDB_DEFAULT_GROUP_COMMIT_WINDOW,
+                 register_profile=IDL_REGISTER_ALL, register_columns=None,
+                 statistics_on_demand=False,
+                 statistics_ttl=OVSDB_DEFAULT_STATISTICS_TTL,
+                 *args, **kwargs):
         self.timeout = OVSDB_DEFAULT_CONNECTION_TIMEOUT
+        self.transaction_timeout = OVSDB_DEFAULT_TRANSACTION_TIMEOUT
+        # Group commit: the changes of the requests received within
+        # group_commit_window are committed in a single transaction
+        self.group_commit = group_commit
+        self.group_commit_window = group_commit_window
+        self.group_commit_max_operations = \
+            OVSDB_DEFAULT_GROUP_COMMIT_MAX_OPERATIONS
+        self.group_operations = []
+        self.group_timeout = None
+        self.group_in_progress = False
+        self.group_commits = 0
+        self.group_fallbacks = 0
+        self.group_conflicts = 0
         self.remote = remote
         self.schema = schema
+        self.restschema = restschema
         self.schema_helper = None
+        # Columns replicated by the IDL: a registration profile, plus
+        # additional columns by table name
+        if register_profile not in (IDL_REGISTER_ALL,
+                                    IDL_REGISTER_NO_STATISTICS,
+                                    IDL_REGISTER_CONFIG):
+            raise ValueError("Unknown registration profile %s" %
+                             register_profile)
+        self.register_profile = register_profile
+        self.register_columns = register_columns or {}
+        # Statistics columns are not replicated but fetched when needed
+        self.statistics_on_demand = statistics_on_demand
+        self.statistics_ttl = statistics_ttl
         self.idl = None
         self.transactions = None
         self.curr_seqno = 0
@@ -43,8 +84,16 @@ class OvsdbConnectionManager:
             if self.idl is not None:
                 self.idl.close()
             self.schema_helper = SchemaHelper(self.schema)
-            self.schema_helper.register_all()
-            self.idl = OpsIdl(self.remote, self.schema_helper)
+            db_schema = ovs.db.schema.DbSchema.from_json(
+                self.schema_helper.schema_json)
+            self.register_schema_columns()
+            self.idl = OpsIdl(self.remote, self.schema_helper,
+                              self.restschema)
+            self.idl.txn_completed = self.txn_completed
+            if self.statistics_on_demand and self.restschema is not None:
+                self.idl.statistics = self.get_statistics_cache(db_schema)
+            if self.restschema is not None:
+                get.build_render_plans(self.restschema, self.idl)
             self.curr_seqno = self.idl.change_seqno
 
             # We do not reset transactions when the DB connection goes down
@@ -58,6 +107,58 @@ class OvsdbConnectionManager:
             IOLoop.current().add_timeout(time.time() + self.timeout,
                                          self.start)
 
+    def register_schema_columns(self):
+        """
+        Registers the columns of the registration profile. Without a REST
+        schema to tell the category of the columns all of them are.
+        """
+        profile = self.register_profile
+        if profile == IDL_REGISTER_ALL and self.statistics_on_demand:
+            profile = IDL_REGISTER_NO_STATISTICS
+
+        if profile == IDL_REGISTER_ALL or self.restschema is None:
+            self.schema_helper.register_all()
+            return
+
+        app_log.info("Registering %s columns" % profile)
+        tables = self.schema_helper.schema_json['tables']
+        for table_name, table_json in tables.iteritems():
+            table_schema = self.restschema.ovs_tables.get(table_name)
+            columns = set(self.register_columns.get(table_name, []))
+
+            if table_schema is None:
+                # Not served by REST, e.g. used by validators
+                if profile == IDL_REGISTER_NO_STATISTICS:
+                    columns.update(table_json['columns'])
+            elif profile == IDL_REGISTER_NO_STATISTICS:
+                columns.update([column for column in table_json['columns']
+                                if column not in table_schema.stats])
+            else:
+                columns.update(table_schema.config)
+                columns.update(table_schema.references)
+                columns.update(table_schema.index_columns)
+
+            # An empty list would register all the columns
+            if columns:
+                self.schema_helper.register_columns(
+                    str(table_name), [str(column) for column in columns])
+
+    def get_statistics_cache(self, db_schema):
+        # The statistics columns of the REST schema not replicated
+        columns = {}
+        for table_name, table_schema in \
+                self.restschema.ovs_tables.iteritems():
+            table = self.idl.tables.get(table_name)
+            if table is None:
+                continue
+
+            for column_name in table_schema.stats:
+                if column_name not in table.columns:
+                    column = db_schema.tables[table_name].columns[column_name]
+                    columns.setdefault(table_name, {})[column_name] = column
+
+        return StatisticsCache(self.idl, columns, self.statistics_ttl)
+
     def idl_init(self):
         try:
             self.idl.run()
@@ -109,22 +210,352 @@ class OvsdbConnectionManager:
                 self.idl_reconnect()
         elif events & IOLoop.READ:
             app_log.debug("Updating idl replica")
+            # Replies to the pending transactions are dispatched to
+            # txn_completed() from here
             self.idl.run()
-            if self.curr_seqno != self.idl.change_seqno and \
-               len(self.transactions.txn_list):
-                self.check_transactions()
             self.curr_seqno = self.idl.change_seqno
 
-    def check_transactions(self):
-        for index, tx in enumerate(self.transactions.txn_list):
-            tx.commit()
-            # TODO: Handle all states
-            if tx.status is not INCOMPLETE:
-                self.transactions.txn_list.pop(index)
-                tx.event.set()
+    def txn_completed(self, idl_txn):
+        # Called by the IDL with the reply to a committed transaction
+        txn = self.transactions.pop_txn(idl_txn._request_id)
+        if txn is None:
+            # Not monitored, e.g. already timed out
+            return
+
+        IOLoop.current().remove_timeout(txn.timeout)
+        txn.commit()
+        self.transactions.txn_completed(txn)
+        txn.event.set()
 
-    def get_new_transaction(self):
+    def txn_timed_out(self, txn):
+        request_id = txn.get_request_id()
+        if self.transactions.pop_txn(request_id) is None:
+            return
+
+        app_log.warning("Transaction %s timed out after %s seconds" %
+                        (request_id, self.transaction_timeout))
+        # The reply, if any, is ignored from now on. The transaction
+        # might get committed anyhow
+        self.idl._outstanding_txns.pop(request_id, None)
+        txn.abort()
+        txn.commit()
+        self.transactions.txn_timed_out(txn)
+        txn.event.set()
+
+    def get_new_transaction(self, group=False):
+        """
+        With group set and group commit enabled, the transaction is a
+        placeholder for the result of the changes applied and committed
+        by commit_transaction(), possibly together with other requests.
+        """
+        if group and self.group_commit:
+            return OvsdbTransaction()
         return OvsdbTransaction(self.idl)
 
+    @gen.coroutine
+    def commit_transaction(self, txn, apply_changes):
+        """
+        Prepares txn with apply_changes(txn), commits it and waits for
+        its completion. Returns the final status of txn, exceptions
+        raised by apply_changes are raised here.
+
+        If txn is a group placeholder, apply_changes is called later with
+        the transaction shared by the requests of the group, so it must
+        only depend on the IDL and its arguments.
+        """
+        if txn.txn is not None:
+            apply_changes(txn)
+            status = yield self._commit_and_wait(txn)
+            raise gen.Return(status)
+
+        self.group_operations.append((txn, apply_changes))
+        self._schedule_group_commit()
+        yield txn.event.wait()
+        if txn.exception is not None:
+            raise txn.exception
+        raise gen.Return(txn.status)
+
+    @gen.coroutine
+    def _commit_and_wait(self, txn):
+        status = txn.commit()
+        if status == INCOMPLETE:
+            self.monitor_transaction(txn)
+            # on 'incomplete' state we wait until the transaction
+            # completes with either success or failure
+            yield txn.event.wait()
+            status = txn.status
+        raise gen.Return(status)
+
+    def _schedule_group_commit(self):
+        # Groups are committed one at a time, the operations received
+        # meanwhile are committed as soon as the current group completes
+        if self.group_in_progress:
+            return
+
+        if len(self.group_operations) >= self.group_commit_max_operations:
+            if self.group_timeout is not None:
+                IOLoop.current().remove_timeout(self.group_timeout)
+                self.group_timeout = None
+            IOLoop.current().add_callback(self._group_commit)
+        elif self.group_timeout is None:
+            self.group_timeout = IOLoop.current().add_timeout(
+                time.time() + self.group_commit_window, self._group_commit)
+
+    @gen.coroutine
+    def _group_commit(self):
+        if self.group_timeout is not None:
+            IOLoop.current().remove_timeout(self.group_timeout)
+            self.group_timeout = None
+
+        operations = self.group_operations[:self.group_commit_max_operations]
+        del self.group_operations[:len(operations)]
+        if not operations:
+            return
+
+        self.group_in_progress = True
+        try:
+            (group_txn, deferred) = self._apply_group(operations)
+            if deferred:
+                # Committed with the next group, before the operations
+                # received after them
+                self.group_operations[:0] = deferred
+            if group_txn is not None:
+                self.group_commits += 1
+                status = yield self._commit_and_wait(group_txn)
+                if status in (SUCCESS, UNCHANGED) or len(operations) == 1:
+                    for txn, apply_changes in operations:
+                        self._operation_completed(txn, group_txn)
+                else:
+                    # The failure can't be attributed to an operation,
+                    # commit them again one by one
+                    app_log.debug("Group commit of %d operations failed "
+                                  "(%s), committing them individually" %
+                                  (len(operations), status))
+                    self.group_fallbacks += 1
+                    for txn, apply_changes in operations:
+                        yield self._commit_operation(txn, apply_changes)
+
+        except Exception as e:
+            app_log.error("Group commit failed: %s" % e)
+            for txn, apply_changes in operations:
+                if not txn.event.is_set():
+                    self._operation_failed(txn, e)
+
+        finally:
+            self.group_in_progress = False
+
+        if self.group_operations:
+            # These operations waited for this group already
+            IOLoop.current().add_callback(self._group_commit)
+
+    def _apply_group(self, operations):
+        """
+        Applies operations in order to a new transaction, returns it
+        (None if no operation is left) and the operations deferred to
+        the next group. operations is updated with the operations
+        applied to the transaction.
+
+        An operation conflicts with a previous operation of the group if
+        it writes a column the other one modified, or creates a row with
+        the same index as one created by the other one. Edits of set and
+        map columns (e.g. the references added to a parent by child
+        POSTs) only conflict if they add, remove or modify the same
+        elements, applied in order they give the result of committing
+        them one after the other.
+
+        The changes of a failed or conflicting operation can't be
+        removed from the transaction, so the transaction is prepared
+        again with the previous operations, and the conflicting
+        operation and the ones following it are deferred. Each
+        operation is applied at most twice.
+        """
+        group_txn = OvsdbTransaction(self.idl)
+        snapshot = {}
+        group_changes = _GroupChanges()
+        for index, (txn, apply_changes) in enumerate(operations):
+            try:
+                apply_changes(group_txn)
+            except Exception as e:
+                self._operation_failed(txn, e)
+                deferred = operations[index + 1:]
+                break
+
+            (columns, indexes, snapshot) = \
+                self._get_operation_changes(group_txn, snapshot)
+            if group_changes.conflicts(columns, indexes):
+                app_log.debug("Group commit operation conflicts with a "
+                              "previous one, deferred")
+                self.group_conflicts += 1
+                deferred = operations[index:]
+                break
+
+            group_changes.add(columns, indexes)
+        else:
+            return (group_txn, [])
+
+        group_txn.abort()
+        del operations[index:]
+        if not operations:
+            return (None, deferred)
+
+        group_txn = OvsdbTransaction(self.idl)
+        for index, (txn, apply_changes) in enumerate(operations):
+            try:
+                apply_changes(group_txn)
+            except Exception as e:
+                # Applied successfully on the same data already, it's
+                # not expected to fail now
+                group_txn.abort()
+                self._operation_failed(txn, e)
+                deferred[:0] = operations[:index] + operations[index + 1:]
+                del operations[:]
+                return (None, deferred)
+
+        return (group_txn, deferred)
+
+    def _get_operation_changes(self, txn, snapshot):
+        """
+        Returns the changes of the rows of txn since snapshot, the
+        (table name, index values) of the rows inserted since then, and
+        the new snapshot. A snapshot maps the uuid of each row of the
+        transaction to its changes.
+
+        The changes map (row uuid, column name) to the keys of the
+        elements added, removed or modified for set and map columns,
+        and to None for other columns. A deleted row is (row uuid, None).
+        """
+        columns = {}
+        indexes = set()
+        new_snapshot = {}
+        for uuid, row in txn.txn._txn_rows.iteritems():
+            changes = row._changes
+            if changes is not None:
+                changes = dict(changes)
+            new_snapshot[uuid] = changes
+
+            if uuid in snapshot and snapshot[uuid] == changes:
+                continue
+
+            if changes is None:
+                columns[(uuid, None)] = None
+                continue
+
+            previous = snapshot.get(uuid) or {}
+            for column_name, datum in changes.iteritems():
+                old_datum = previous.get(column_name)
+                if old_datum is None and row._data is not None:
+                    old_datum = row._data.get(column_name)
+                if old_datum is not None and datum == old_datum:
+                    continue
+                columns[(uuid, column_name)] = _get_edited_keys(old_datum,
+                                                                datum)
+
+            if row._data is None:
+                index = self._get_row_index(row)
+                if index is not None:
+                    indexes.add(index)
+
+        return (columns, indexes, new_snapshot)
+
+    def _get_row_index(self, row):
+        # (table name, index values) of a row, None without REST indexes
+        table_name = row._table.name
+        if self.restschema is None or \
+                table_name not in self.restschema.ovs_tables:
+            return None
+
+        columns = self.restschema.ovs_tables[table_name].indexes
+        if not columns or columns == ['uuid']:
+            return None
+
+        return (table_name,
+                tuple(str(row.__getattr__(column)) for column in columns))
+
+    @gen.coroutine
+    def _commit_operation(self, txn, apply_changes):
+        single_txn = OvsdbTransaction(self.idl)
+        try:
+            apply_changes(single_txn)
+        except Exception as e:
+            single_txn.abort()
+            self._operation_failed(txn, e)
+            return
+
+        yield self._commit_and_wait(single_txn)
+        self._operation_completed(txn, single_txn)
+
+    def _operation_completed(self, txn, committed_txn):
+        txn.txn = committed_txn.txn
+        txn.status = committed_txn.status
+        txn.event.set()
+
+    def _operation_failed(self, txn, exception):
+        txn.exception = exception
+        txn.event.set()
+
     def monitor_transaction(self, txn):
+        if txn.commit() != INCOMPLETE:
+            # Already completed
+            txn.event.set()
+            return
+
         self.transactions.add_txn(txn)
+        txn.timeout = IOLoop.current().add_timeout(
+            time.time() + self.transaction_timeout,
+            partial(self.txn_timed_out, txn))
+
+
+class _GroupChanges(object):
+    """
+    Changes of the operations of a group (see
+    OvsdbConnectionManager._get_operation_changes())
+    """
+    def __init__(self):
+        self.columns = {}
+        self.rows = set()
+        self.indexes = set()
+
+    def add(self, columns, indexes):
+        for (uuid, column_name), keys in columns.iteritems():
+            self.rows.add(uuid)
+            current = self.columns.get((uuid, column_name), set())
+            if current is None or keys is None:
+                self.columns[(uuid, column_name)] = None
+            else:
+                self.columns[(uuid, column_name)] = current | keys
+        self.indexes.update(indexes)
+
+    def conflicts(self, columns, indexes):
+        if indexes & self.indexes:
+            return True
+
+        for (uuid, column_name), keys in columns.iteritems():
+            if column_name is None:
+                # Deleted row
+                if uuid in self.rows:
+                    return True
+            elif (uuid, None) in self.columns:
+                return True
+            elif (uuid, column_name) in self.columns:
+                current = self.columns[(uuid, column_name)]
+                if current is None or keys is None or current & keys:
+                    return True
+
+        return False
+
+
+def _get_edited_keys(old_datum, datum):
+    # The keys of the elements of a set or map column added, removed or
+    # modified from old_datum to datum, None for other columns
+    if datum.type.n_max <= 1:
+        return None
+
+    old_values = old_datum.values if old_datum is not None else {}
+    keys = set()
+    for key, value in datum.values.iteritems():
+        if key not in old_values or old_values[key] != value:
+            keys.add(key)
+    for key in old_values:
+        if key not in datum.values:
+            keys.add(key)
+    return keys
@@ -177,8 +177,8 @@ def verify_back_reference(resource, new_resource, schema,
         Some resources have the same parent. BGP_Routers can share the same
         VRF and hence will have the same reference pointer under the 'vrf'
         column. If bgp_routers for a particular VRF is desired, we search
-        in the entire BGP_Router table to find those BGP Routers that have
-        the same VRF under the 'vrf' column and return a list of UUIDs
+        the BGP_Router parent index of the IDL for those BGP Routers that
+        have the same VRF under the 'vrf' column and return a list of UUIDs
         of those BGP_Router entries.
     '''
 
@@ -206,14 +206,10 @@ def verify_back_reference(resource, new_resource, schema,
             return False
     else:
         # Look for all resources that back reference the same parent
-        row = None
         row_list = []
-        index_list = []
-        for item in idl.tables[new_resource.table].rows.itervalues():
-            reference = item.__getattr__(_refCol)
-
-            if reference.uuid == resource.row:
-                row_list.append(item.uuid)
+        for item in idl.parent_to_rows(new_resource.table, _refCol,
+                                       resource.row):
+            row_list.append(item.uuid)
 
         new_resource.row = row_list
         return True
@@ -241,6 +237,6 @@ def verify_index(resource, parent, index_values, schema, idl):
         dbtable = idl.tables[resource.table]
         table_schema = schema.ovs_tables[resource.table]
 
-        row = utils.index_to_row(index_values, table_schema, dbtable)
+        row = utils.index_to_row(index_values, table_schema, dbtable, idl)
 
     return row
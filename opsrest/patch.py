@@ -28,7 +28,7 @@ from tornado.log import app_log
 from copy import deepcopy
 
 
-def patch_resource(data, resource, schema, txn, idl, uri):
+def patch_resource(data, resource, schema, txn, idl, uri, commit=True):
 
     # Allow PATCH operation on System table
     if resource is None:
@@ -92,6 +92,9 @@ def patch_resource(data, resource, schema, txn, idl, uri):
             app_log.debug(e.error)
             raise DataValidationFailed(e.error)
 
+    if not commit:
+        return None
+
     result = txn.commit()
     return OvsdbTransactionResult(result)
 
@@ -24,7 +24,7 @@ import httplib
 from tornado.log import app_log
 
 
-def post_resource(data, resource, schema, txn, idl):
+def post_resource(data, resource, schema, txn, idl, commit=True):
     """
     /system/bridges: POST allowed as we are adding a new Bridge
                      to a child table
@@ -97,5 +97,8 @@ def post_resource(data, resource, schema, txn, idl):
         app_log.debug(e.error)
         raise DataValidationFailed(e.error)
 
+    if not commit:
+        return None
+
     result = txn.commit()
     return OvsdbTransactionResult(result)
@@ -23,7 +23,7 @@ import httplib
 from tornado.log import app_log
 
 
-def put_resource(data, resource, schema, txn, idl):
+def put_resource(data, resource, schema, txn, idl, commit=True):
 
     # Allow PUT operation on System table
     if resource is None:
@@ -102,5 +102,8 @@ def put_resource(data, resource, schema, txn, idl):
         app_log.debug(e.error)
         raise DataValidationFailed(e.error)
 
+    if not commit:
+        return None
+
     result = txn.commit()
     return OvsdbTransactionResult(result)
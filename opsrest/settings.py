@@ -22,6 +22,8 @@ define("HTTPS_port", default=443, help="run on the given port", type=int)
 define("HTTP_port", default=80, help="run on the given port", type=int)
 define("config", default=None, help="tornado config file")
 define("debug", default=False, help="debug mode")
+define("workers", default=1, type=int,
+       help="number of worker processes, 0 for one per CPU")
 
 settings = {}
 settings['logging'] = 'info'
@@ -37,3 +39,50 @@ settings['cfg_db_schema'] = "%s/usr/share/openvswitch/configdb.ovsschema" % os.e
 
 settings["account_schema"] = os.path.join(os.path.dirname(custom.__file__),
                                           'schemas/Account.json')
+
+# GET on collections with depth of at least this number of elements
+# are streamed, flushing the response every 'get_stream_chunk_rows'
+settings['get_stream_min_rows'] = 1000
+settings['get_stream_chunk_rows'] = 100
+
+# Commit the changes of the requests received within a few milliseconds
+# in a single OVSDB transaction
+settings['group_commit'] = False
+
+# Columns replicated from OVSDB: 'all', 'no-statistics' or 'config' (only
+# configuration, reference and index columns), plus the columns listed by
+# table name in 'idl_register_columns'. Columns not replicated are not
+# served, and are not available to the validators.
+settings['idl_register_profile'] = 'all'
+settings['idl_register_columns'] = {}
+
+# Don't replicate the statistics columns, fetch them from OVSDB when a
+# GET needs them and keep them for 'statistics_ttl' seconds
+settings['statistics_on_demand'] = False
+settings['statistics_ttl'] = 2.0
+
+# Encoder of the JSON responses: 'json', 'simplejson', 'ujson' or 'auto'
+# (simplejson, then ujson, if importable). ujson is the fastest, but it
+# doesn't format documents, and with older versions reals, as json does,
+# so the other encoders are only used if selected here.
+settings['json_encoder'] = 'json'
+
+# If enabled, compress the JSON responses of at least
+# 'compress_min_length' bytes with gzip, at 'compress_level' (1-9), if
+# the client accepts it
+settings['compress_response'] = False
+settings['compress_min_length'] = 1024
+settings['compress_level'] = 6
+
+# With more than one worker (see the 'workers' option), the number of
+# times a worker exiting abnormally is restarted
+settings['worker_max_restarts'] = 100
+
+# If not 0, custom validators running for more than
+# 'validator_time_budget' seconds are interrupted and fail the
+# validation. The rows of declarative configuration writes with at least
+# 'validator_parallel_min_jobs' rows to validate are split between
+# 'validator_workers' forked processes.
+settings['validator_time_budget'] = 0
+settings['validator_workers'] = 1
+settings['validator_parallel_min_jobs'] = 500
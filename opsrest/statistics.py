@@ -0,0 +1,191 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+import time
+from functools import partial
+
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop
+from tornado.log import app_log
+
+import ovs.db.data
+import ovs.jsonrpc
+import ovs.ovsuuid
+from ovs.db import error
+
+# Row cache dependency on the statistics of a table, as the row uuid
+STATISTICS_DEPENDENCY = 'statistics'
+
+
+def _uuid_to_uuid(atom, base):
+    return atom
+
+
+class StatisticsRow(object):
+    """
+    Statistics fetched for a row, read as the attributes of an IDL row.
+    """
+    def __init__(self, values):
+        self._values = values
+
+    def __getattr__(self, column_name):
+        try:
+            return self._values[column_name]
+        except KeyError:
+            raise AttributeError(column_name)
+
+
+class StatisticsCache(object):
+    """
+    Statistics columns that are not replicated by the IDL, fetched from
+    the database with a select when a GET needs them and kept for 'ttl'
+    seconds.
+
+    Rendering a row with get_row() records the table in 'missing' if
+    its statistics are not fetched yet, the caller fetches them with
+    fetch() and renders the row again. The statistics of a single row
+    can be fetched with fetch_row(), e.g. for the GET of one resource.
+    Values rendered from statistics depend on (table name,
+    STATISTICS_DEPENDENCY) in the row cache, invalidated when they're
+    fetched and when they expire.
+    """
+    def __init__(self, idl, columns, ttl):
+        self.idl = idl
+        # table name -> {column name: ovs.db.schema.ColumnSchema}
+        self.columns = columns
+        self.ttl = ttl
+        # table name -> {row uuid: {column name: value}}
+        self._tables = {}
+        # Rows fetched on their own, table name -> {row uuid: values}
+        self._rows = {}
+        # table name or (table name, row uuid) -> Future
+        self._fetching = {}
+        # tables rendered without their statistics
+        self.missing = set()
+
+    def get_row(self, table_name, uuid):
+        self.idl.row_cache.track(table_name, STATISTICS_DEPENDENCY)
+
+        rows = self._tables.get(table_name)
+        if rows is None:
+            rows = self._rows.get(table_name, {})
+            if uuid not in rows:
+                self.missing.add(table_name)
+                return None
+
+        values = rows.get(uuid)
+        if values is None:
+            return None
+        return StatisticsRow(values)
+
+    @gen.coroutine
+    def fetch(self, table_names=None):
+        """
+        Fetches the statistics of table_names, or of the missing tables.
+        """
+        if table_names is None:
+            table_names = self.missing
+            self.missing = set()
+
+        yield [self._fetch_table(table_name) for table_name in table_names
+               if table_name in self.columns and
+               table_name not in self._tables]
+
+    @gen.coroutine
+    def fetch_row(self, table_name, uuid):
+        """
+        Fetches the statistics of the row uuid of table_name, unless the
+        statistics of the whole table are already fetched.
+        """
+        if table_name in self.columns and \
+                table_name not in self._tables and \
+                uuid not in self._rows.get(table_name, {}):
+            yield self._fetch_table(table_name, uuid)
+
+    def _fetch_table(self, table_name, uuid=None):
+        key = table_name if uuid is None else (table_name, uuid)
+        future = self._fetching.get(key)
+        if future is not None:
+            return future
+
+        future = Future()
+        self._fetching[key] = future
+
+        where = []
+        if uuid is not None:
+            where = [['_uuid', '==', ['uuid', str(uuid)]]]
+
+        columns = ['_uuid'] + self.columns[table_name].keys()
+        params = [self.idl._db.name, {'op': 'select',
+                                      'table': table_name,
+                                      'where': where,
+                                      'columns': columns}]
+        if not self.idl.send_request('transact', params,
+                                     partial(self._fetch_reply, table_name,
+                                             uuid)):
+            self._fetch_reply(table_name, uuid, None)
+
+        return future
+
+    def _fetch_reply(self, table_name, uuid, msg):
+        rows = {}
+        if msg is None or msg.type != ovs.jsonrpc.Message.T_REPLY:
+            app_log.warning("Failed to fetch statistics of %s" % table_name)
+        else:
+            try:
+                rows = self._parse_rows(table_name, msg.result[0]['rows'])
+            except (error.Error, KeyError, IndexError, TypeError) as e:
+                app_log.warning("Invalid statistics of %s: %s" %
+                                (table_name, e))
+
+        # Failures are cached too, not to retry on every request
+        if uuid is None:
+            self._tables[table_name] = rows
+            key = table_name
+            expire = partial(self.expire, table_name)
+        else:
+            self._rows.setdefault(table_name, {})[uuid] = rows.get(uuid)
+            key = (table_name, uuid)
+            expire = partial(self.expire_row, table_name, uuid)
+        self.idl.row_cache.invalidate(table_name, STATISTICS_DEPENDENCY)
+        IOLoop.current().add_timeout(time.time() + self.ttl, expire)
+
+        self._fetching.pop(key).set_result(None)
+
+    def _parse_rows(self, table_name, rows_json):
+        columns = self.columns[table_name]
+        rows = {}
+        for row_json in rows_json:
+            uuid = ovs.ovsuuid.from_json(row_json['_uuid'])
+            values = {}
+            for column_name, column in columns.iteritems():
+                datum = ovs.db.data.Datum.from_json(column.type,
+                                                    row_json[column_name])
+                values[column_name] = datum.to_python(_uuid_to_uuid)
+            rows[uuid] = values
+
+        return rows
+
+    def expire(self, table_name):
+        if self._tables.pop(table_name, None) is not None:
+            self.idl.row_cache.invalidate(table_name, STATISTICS_DEPENDENCY)
+
+    def expire_row(self, table_name, uuid):
+        rows = self._rows.get(table_name)
+        if rows is not None and uuid in rows:
+            del rows[uuid]
+            if not rows:
+                del self._rows[table_name]
+            self.idl.row_cache.invalidate(table_name, STATISTICS_DEPENDENCY)
@@ -14,22 +14,80 @@
 
 import ovs.db.idl
 import json
+import time
 from tornado.locks import Event
 
+from opsrest.constants import SUCCESS
+
 
 class OvsdbTransactionList:
+    """
+    Registry of the transactions waiting for their reply from the
+    database, by the JSON-RPC id of their request, so that each reply
+    is dispatched to its transaction directly. Also keeps the queue
+    depth and commit latency metrics reported in the diag dump.
+    """
     def __init__(self):
-        self.txn_list = []
+        self.txns = {}
+        self.max_pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+
+    def __len__(self):
+        return len(self.txns)
 
     def add_txn(self, txn):
-        self.txn_list.append(txn)
+        txn.start_time = time.time()
+        self.txns[txn.get_request_id()] = txn
+        self.max_pending = max(self.max_pending, len(self.txns))
+
+    def pop_txn(self, request_id):
+        return self.txns.pop(request_id, None)
+
+    def txn_completed(self, txn):
+        latency = time.time() - txn.start_time
+        self.completed += 1
+        if txn.status != SUCCESS:
+            self.failed += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.last_latency = latency
+
+    def txn_timed_out(self, txn):
+        self.timed_out += 1
+
+    def get_stats(self):
+        average = 0.0
+        if self.completed:
+            average = self.total_latency / self.completed
+
+        return {'pending': len(self.txns),
+                'max_pending': self.max_pending,
+                'completed': self.completed,
+                'failed': self.failed,
+                'timed_out': self.timed_out,
+                'average_latency': average,
+                'max_latency': self.max_latency,
+                'last_latency': self.last_latency}
 
 
 class OvsdbTransaction:
-    def __init__(self, idl):
+    def __init__(self, idl=None):
         self.status = None
-        self.txn = ovs.db.idl.Transaction(idl)
+        # Without an IDL this is only a placeholder for the result of the
+        # changes of a request committed together with other requests,
+        # txn is set to the shared transaction once it's complete
+        self.txn = None
+        if idl is not None:
+            self.txn = ovs.db.idl.Transaction(idl)
         self.event = Event()
+        self.exception = None
+        self.start_time = None
+        self.timeout = None
 
     def commit(self):
         self.status = self.txn.commit()
@@ -39,11 +97,28 @@ class OvsdbTransaction:
         return self.txn.insert(table)
 
     def abort(self):
-        if self.txn is not None:
+        if self.txn is None:
+            return
+
+        if self.txn.idl.txn is self.txn:
             self.txn.abort()
+        elif self.txn._status == ovs.db.idl.Transaction.INCOMPLETE:
+            # Already committed, Transaction.abort() would also drop the
+            # transaction being prepared on the IDL meanwhile. The reply
+            # to this one is ignored from now on.
+            self.txn._status = ovs.db.idl.Transaction.ABORTED
+
+    def get_request_id(self):
+        return self.txn._request_id
 
     def get_error(self):
-        return json.loads(self.txn.get_error())
+        # Only errors reported by the database are JSON, otherwise
+        # this is the description of the status (e.g. "aborted")
+        error = self.txn.get_error()
+        try:
+            return json.loads(error)
+        except ValueError:
+            return error
 
 
 class OvsdbTransactionResult:
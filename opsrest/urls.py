@@ -15,6 +15,7 @@
 from opsrest.handlers.staticcontent import StaticContentHandler
 from opsrest.handlers.login import LoginHandler
 from opsrest.handlers.ovsdbapi import OVSDBAPIHandler
+from opsrest.handlers.bulk import BulkHandler
 from opsrest.handlers.customrest import CustomRESTHandler
 from custom.logcontroller import LogController
 from custom.accountcontroller import AccountController
@@ -26,6 +27,7 @@ REGEX_RESOURCE_ID = '?(?P<resource_id>[A-Za-z0-9-_]+[$]?)?/?'
 url_patterns =\
     [(r'/login', LoginHandler),
      (r'/rest/v1/system', OVSDBAPIHandler),
+     (r'/rest/v1/system/bulk', BulkHandler),
      (r'/rest/v1/system/.*', OVSDBAPIHandler)]
 
 custom_url_patterns =\
@@ -427,29 +427,39 @@ def categorize_get_data(schema, data, table=None, selector=None):
 
 def filter_get_results(get_data, filters, schema, table=None):
     filtered_data = []
+    filter_sets = get_filter_sets(filters, schema, table)
 
     for element in get_data:
-        valid = True
-        for key in filters:
-            if key in element:
+        if match_filters(element, filter_sets):
+            filtered_data.append(element)
 
-                column_type = _get_column_type(key, schema, table)
-                filter_set = _process_filters(filters[key], column_type)
+    return filtered_data
 
-                if type(element[key]) is list:
-                    value_set = set(element[key])
-                else:
-                    value_set = set([element[key]])
 
-                if filter_set.difference(value_set) == filter_set:
-                    valid = False
-            else:
-                valid = False
+def get_filter_sets(filters, schema, table=None):
+    filter_sets = {}
 
-        if valid:
-            filtered_data.append(element)
+    for key in filters:
+        column_type = _get_column_type(key, schema, table)
+        filter_sets[key] = _process_filters(filters[key], column_type)
 
-    return filtered_data
+    return filter_sets
+
+
+def match_filters(element, filter_sets):
+    for key, filter_set in filter_sets.iteritems():
+        if key not in element:
+            return False
+
+        if type(element[key]) is list:
+            value_set = set(element[key])
+        else:
+            value_set = set([element[key]])
+
+        if filter_set.difference(value_set) == filter_set:
+            return False
+
+    return True
 
 
 def _get_column_type(column, schema, table=None):
@@ -16,6 +16,62 @@ import json
 
 from tornado.log import app_log
 
+from opsrest.constants import JSON_ENCODER_AUTO, JSON_ENCODER_JSON, \
+    JSON_ENCODER_SIMPLEJSON, JSON_ENCODER_UJSON
+
+# Encoder of the JSON responses, selected at startup with set_encoder()
+encoder = JSON_ENCODER_JSON
+dumps = json.dumps
+
+
+def _get_simplejson_dumps():
+    import simplejson
+    return simplejson.dumps
+
+
+def _get_ujson_dumps():
+    import ujson
+
+    def dumps(data):
+        # URIs are not escaped, as json doesn't
+        return ujson.dumps(data, escape_forward_slashes=False)
+
+    return dumps
+
+
+_ENCODERS = [(JSON_ENCODER_SIMPLEJSON, _get_simplejson_dumps),
+             (JSON_ENCODER_UJSON, _get_ujson_dumps),
+             (JSON_ENCODER_JSON, lambda: json.dumps)]
+
+
+def set_encoder(name=JSON_ENCODER_JSON):
+    """
+    Selects the encoder used by dumps(), one of JSON_ENCODER_*. With
+    JSON_ENCODER_AUTO the first importable of simplejson, ujson and
+    json is selected. Raises ValueError if the encoder is unknown or
+    can't be imported.
+    """
+    global encoder, dumps
+
+    for encoder_name, get_dumps in _ENCODERS:
+        if name != JSON_ENCODER_AUTO and name != encoder_name:
+            continue
+
+        try:
+            encoder_dumps = get_dumps()
+        except ImportError as e:
+            if name == JSON_ENCODER_AUTO:
+                continue
+            raise ValueError("JSON encoder %s is not available: %s" %
+                             (name, e))
+
+        encoder = encoder_name
+        dumps = encoder_dumps
+        app_log.info("Using JSON encoder %s" % encoder)
+        return
+
+    raise ValueError("Unknown JSON encoder %s" % name)
+
 
 # This function is used to convert the response from string to list of json
 # objects
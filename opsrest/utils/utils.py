@@ -13,6 +13,7 @@
 #  under the License.
 
 import json
+import ovs.db.data
 import ovs.db.idl
 import ovs
 import ovs.db.types as ovs_types
@@ -89,16 +90,27 @@ def get_column_data_from_row(row, column):
         column - column name
     """
     if type(str(column)) is types.StringType:
-        return row.__getattr__(column)
+        return _get_column_value(row, column)
     elif type(column) is types.ListType:
         columns = []
         for item in column:
-            columns.append(row.__getattr__(item))
+            columns.append(_get_column_value(row, item))
         return columns
     else:
         return None
 
 
+def _get_column_value(row, column):
+    # A row inserted by the transaction only has the columns written so
+    # far, e.g. a parent created earlier in a bulk request, the others
+    # have their default value
+    if row._data is None and column not in row._changes:
+        datum = ovs.db.data.Datum.default(row._table.columns[column].type)
+        return datum.to_python(ovs.db.idl._uuid_to_row)
+
+    return row.__getattr__(column)
+
+
 def check_resource(resource, idl):
     """
     using Resource and Idl instance return a tuple
@@ -359,6 +371,95 @@ def row_to_json(row, column_keys):
     return data_json
 
 
+def get_column_converter(column):
+    """
+    Returns a function converting the value of a column of an IDL row
+    to JSON, as row_to_json does, specialized for the key and value
+    types and the number of elements of column (an OVSColumn). Types
+    without a specialized converter are converted with to_json.
+    """
+    key_type = column.type
+    value_type = column.value_type
+
+    if column.is_dict:
+        if value_type == ovs_types.StringType:
+            return _string_map_to_json
+        elif value_type in (ovs_types.IntegerType, ovs_types.RealType):
+            return _number_map_to_json
+
+        return lambda data: dict_to_json(data, value_type)
+
+    if column.n_max > 1:
+        if key_type == ovs_types.StringType:
+            return _string_list_to_json
+        elif key_type in (ovs_types.IntegerType, ovs_types.RealType):
+            return _number_list_to_json
+
+        return lambda data: list_to_json(data, key_type)
+
+    if key_type == ovs_types.StringType:
+        convert = str
+    elif key_type in (ovs_types.IntegerType, ovs_types.RealType,
+                      ovs_types.BooleanType):
+        convert = _value_to_json
+    elif key_type == ovs_types.UuidType:
+        convert = _uuid_to_json
+    else:
+        convert = lambda data: to_json(data, key_type)
+
+    if column.n_min == 1:
+        return convert
+
+    # Optional values are lists of at most one element in the IDL
+    def convert_optional(data):
+        if data:
+            return convert(data[0])
+        return None
+
+    return convert_optional
+
+
+def _value_to_json(data):
+    return data
+
+
+def _uuid_to_json(data):
+    if data is None:
+        return None
+    elif type(data) is ovs.db.idl.Row:
+        return str(data.uuid)
+
+    return str(data)
+
+
+def _string_map_to_json(data):
+    if not data:
+        return data
+
+    return {key: str(value) for key, value in data.iteritems()}
+
+
+def _number_map_to_json(data):
+    if not data:
+        return data
+
+    return dict(data)
+
+
+def _string_list_to_json(data):
+    if not data:
+        return data
+
+    return [str(value) for value in data]
+
+
+def _number_list_to_json(data):
+    if not data:
+        return data
+
+    return list(data)
+
+
 def get_empty_by_basic_type(data):
     type_ = type(data)
 
@@ -502,16 +603,136 @@ def list_to_json(data, value_type=None):
     return data_json
 
 
-def index_to_row(index_values, table_schema, dbtable):
+def index_to_row(index_values, table_schema, dbtable, idl=None):
     """
     This subroutine fetches the row reference using index_values.
     index_values is a list which contains the combination indices
     that are used to identify a resource.
+
+    Rows are looked up by UUID directly in dbtable.rows, or through
+    the REST index map maintained by ops.opsidl.OpsIdl. The map only
+    holds committed rows, if idl is given the rows inserted or modified
+    by the transaction being built (idl.txn) are looked up too.
     """
     indexes = table_schema.indexes
     if len(index_values) != len(indexes):
         return None
 
+    if len(indexes) == 1 and indexes[0] == 'uuid':
+        try:
+            return dbtable.rows.get(uuid.UUID(index_values[0]))
+        except ValueError:
+            return None
+
+    rest_index_map = getattr(dbtable, 'rest_index_map', None)
+    if rest_index_map is None:
+        return _scan_index_to_row(index_values, indexes, dbtable)
+
+    rows = rest_index_map.get(tuple(index_values))
+
+    # The map reflects committed data, skip rows deleted or modified
+    # in the current transaction
+    for row in (rows or {}).itervalues():
+        if dbtable.rows.get(row.uuid) is row and \
+                _row_matches_index(row, indexes, index_values):
+            return row
+
+    txn = getattr(idl, 'txn', None)
+    if txn is not None:
+        return _txn_index_to_row(index_values, indexes, dbtable, txn)
+
+    return None
+
+
+def _txn_index_to_row(index_values, indexes, dbtable, txn):
+    # Rows of dbtable inserted or modified by txn, not indexed yet
+    txn_rows = txn._txn_rows
+    if not isinstance(txn_rows, _TxnRows):
+        txn_rows = txn._txn_rows = _TxnRows(txn_rows)
+
+    return txn_rows.get_row(dbtable.name, indexes, tuple(index_values))
+
+
+class _TxnRows(dict):
+    """
+    Rows of a transaction (ovs.db.idl.Transaction._txn_rows) indexed by
+    their REST index values per table. The transaction adds a row every
+    time a column is written or the row is deleted, the index values of
+    the rows added since the last lookup of a table are computed again
+    at the next one.
+    """
+    def __init__(self, rows):
+        dict.__init__(self, rows)
+        # table name -> {index values: {row uuid: row}}
+        self.indexes = {}
+        # row uuid -> index values of the row in indexes
+        self.row_indexes = {}
+        # table name -> {row uuid: row} written since the last lookup
+        self.written = {}
+        for row_uuid, row in rows.iteritems():
+            self._add_written(row_uuid, row)
+
+    def __setitem__(self, row_uuid, row):
+        dict.__setitem__(self, row_uuid, row)
+        self._add_written(row_uuid, row)
+
+    def __delitem__(self, row_uuid):
+        row = self[row_uuid]
+        dict.__delitem__(self, row_uuid)
+        self._add_written(row_uuid, row)
+
+    def _add_written(self, row_uuid, row):
+        self.written.setdefault(row._table.name, {})[row_uuid] = row
+
+    def get_row(self, table_name, indexes, index_values):
+        table_indexes = self.indexes.setdefault(table_name, {})
+        for row_uuid, row in self.written.pop(table_name, {}).iteritems():
+            old_values = self.row_indexes.pop(row_uuid, None)
+            if old_values is not None:
+                rows = table_indexes[old_values]
+                del rows[row_uuid]
+                if not rows:
+                    del table_indexes[old_values]
+
+            if self.get(row_uuid) is not row or row._changes is None:
+                continue
+
+            try:
+                values = _get_row_index_values(row, indexes)
+            except AttributeError:
+                # Inserted row whose index columns are not written yet
+                continue
+            self.row_indexes[row_uuid] = values
+            table_indexes.setdefault(values, {})[row_uuid] = row
+
+        rows = table_indexes.get(index_values)
+        if not rows:
+            return None
+        return rows.itervalues().next()
+
+
+def _get_row_index_values(row, indexes):
+    values = []
+    for index in indexes:
+        if index == 'uuid':
+            values.append(str(row.uuid))
+            continue
+
+        current = row.__getattr__(index)
+        if isinstance(current, ovs.db.idl.Row):
+            current = current.uuid
+        elif isinstance(current, unicode):
+            current = current.encode('utf-8')
+        values.append(str(current))
+
+    return tuple(values)
+
+
+def _row_matches_index(row, indexes, index_values):
+    return _get_row_index_values(row, indexes) == tuple(index_values)
+
+
+def _scan_index_to_row(index_values, indexes, dbtable):
     for row in dbtable.rows.itervalues():
         i = 0
         for index, value in zip(indexes, index_values):
@@ -666,17 +887,15 @@ def get_parent_row(table_name, child_row, column, schema, idl):
     Returns idl.Row object
     """
     table = schema.ovs_tables[table_name]
-    for uuid, row_ref in idl.tables[table_name].rows.iteritems():
-        reflist = get_column_data_from_row(row_ref, column)
-        for value in reflist:
-            if table.references[column].kv_type:
-                db_col = row_ref.__getattr__(column)
-                row_value = db_col[value]
-                if row_value.uuid == child_row.uuid:
-                    return row_ref, value
-            else:
-                if value.uuid == child_row.uuid:
-                    return row_ref
+    child_table_name = table.references[column].ref_table
+    for row_ref, key in idl.reference_to_rows(child_table_name,
+                                              child_row.uuid, table_name,
+                                              column):
+        idl.row_cache.track(table_name, row_ref.uuid)
+        if table.references[column].kv_type:
+            return row_ref, key
+        else:
+            return row_ref
 
 
 def get_table_key(row, table_name, schema, idl, forward_ref=True):
@@ -686,6 +905,7 @@ def get_table_key(row, table_name, schema, idl, forward_ref=True):
     """
     key_list = []
     table = schema.ovs_tables[table_name]
+    idl.row_cache.track(table_name, row.uuid)
 
     # Verify if is kv reference
     if table.parent:
@@ -33,6 +33,9 @@ class BaseValidator(object):
     resource: Used for registering a validator with a resource/table name.
               It is used for validator lookup. Derived classes must define
               a value for proper registration/lookup.
+
+    Validators must not modify the IDL (rows or transaction), they may
+    run in a forked process validating a copy of it.
     """
     resource = ""
 
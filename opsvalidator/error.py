@@ -2,12 +2,14 @@ VERIFICATION_FAILED = 10001
 NO_REFERENCED_BY = 10002
 FAILED_REFERENCED_BY = 10003
 RESOURCES_EXCEEDED = 10004
+TIME_BUDGET_EXCEEDED = 10005
 
 error_messages = {
     VERIFICATION_FAILED: 'Verification failed',
     NO_REFERENCED_BY: 'Missing referenced_by resource',
     FAILED_REFERENCED_BY: 'Verification failed for referenced_by resource',
-    RESOURCES_EXCEEDED: 'Number of allowed resources exceeded'
+    RESOURCES_EXCEEDED: 'Number of allowed resources exceeded',
+    TIME_BUDGET_EXCEEDED: 'Validation time budget exceeded'
 }
 
 
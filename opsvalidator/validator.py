@@ -1,14 +1,79 @@
 import pkgutil
 import sys
 import imp
+import errno
 import os
 import re
+import signal
+import stat
+import time
+import cPickle as pickle
+import ovs.fatal_signal
+from tornado.ioloop import IOLoop
 from tornado.log import app_log
 from opsrest import constants
 from opsvalidator.base import BaseValidator, ValidationArgs
+from opsvalidator.error import ValidationError, TIME_BUDGET_EXCEEDED
 
 g_validators = {}
 
+# Validator type -> ValidatorStats
+g_stats = {}
+
+# Maximum time in seconds of a validator invocation, None for no limit
+g_time_budget = None
+
+# Number of processes validating the rows of exec_validators_in_workers(),
+# if there are at least g_parallel_min_jobs rows
+g_workers = 1
+g_parallel_min_jobs = 500
+
+# Set while a validator runs with a time budget
+g_budget_armed = False
+
+
+class ValidatorStats(object):
+    """
+    Execution time of the invocations of a validator, in seconds
+    """
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.budget_exceeded = 0
+
+    def add(self, elapsed, budget_exceeded=False):
+        self.calls += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        if budget_exceeded:
+            self.budget_exceeded += 1
+
+    def merge(self, other):
+        self.calls += other.calls
+        self.total_time += other.total_time
+        self.max_time = max(self.max_time, other.max_time)
+        self.budget_exceeded += other.budget_exceeded
+
+
+class TimeBudgetExceeded(BaseException):
+    """
+    Interrupts a validator exceeding the time budget, a BaseException
+    so that validators catching Exception don't stop it
+    """
+    pass
+
+
+def configure(time_budget=None, workers=1, parallel_min_jobs=500):
+    global g_time_budget, g_workers, g_parallel_min_jobs
+    g_time_budget = time_budget or None
+    g_workers = max(workers, 1)
+    g_parallel_min_jobs = parallel_min_jobs
+
+
+def get_stats():
+    return g_stats
+
 
 def init_plugins(plugin_dir):
     find_plugins(plugin_dir)
@@ -61,7 +126,7 @@ def exec_validators(idl, schema, table_name, row, method,
             app_log.debug("Invoking validator \"%s\" for resource \"%s\"" %
                           (validator.type(), resource_name))
 
-            validate_by_method(validator, method, validation_args)
+            exec_validator(validator, method, validation_args)
     else:
         app_log.debug("Custom validator for \"%s\" does not exist" %
                       resource_name)
@@ -79,3 +144,228 @@ def validate_by_method(validator, method, validation_args):
         validator.validate_deletion(validation_args)
     else:
         app_log.debug("Unsupported validation for method %s" % method)
+
+
+def exec_validator(validator, method, validation_args):
+    """
+    Invokes validator, interrupted with a ValidationError if it runs for
+    more than g_time_budget seconds. Without SIGALRM (e.g. outside of
+    the main thread) the validator completes, and then fails if it
+    exceeded the time budget.
+    """
+    start = time.time()
+    completed = None
+    try:
+        completed = _run_with_budget(validate_by_method, g_time_budget,
+                                     validator, method, validation_args)
+    finally:
+        elapsed = time.time() - start
+        budget_exceeded = g_time_budget is not None and \
+            (completed is False or elapsed > g_time_budget)
+        stats = g_stats.get(validator.type())
+        if stats is None:
+            stats = ValidatorStats()
+            g_stats[validator.type()] = stats
+        stats.add(elapsed, budget_exceeded)
+        app_log.debug("Validator \"%s\" completed in %.3f ms" %
+                      (validator.type(), elapsed * 1000))
+
+    if budget_exceeded:
+        details = "Validator %s of %s %s after %.3f s, the time budget "\
+                  "is %.3f s" % (validator.type(),
+                                 validation_args.resource_table,
+                                 "completed" if completed else "interrupted",
+                                 elapsed, g_time_budget)
+        app_log.warning(details)
+        raise ValidationError(TIME_BUDGET_EXCEEDED, details)
+
+
+def _budget_alarm(signum, frame):
+    if g_budget_armed:
+        raise TimeBudgetExceeded()
+
+
+def _run_with_budget(function, budget, *args):
+    # Returns False if function was interrupted by the time budget
+    global g_budget_armed
+    if budget is None:
+        function(*args)
+        return True
+
+    try:
+        previous = signal.signal(signal.SIGALRM, _budget_alarm)
+    except ValueError:
+        # Not in the main thread
+        function(*args)
+        return True
+
+    try:
+        g_budget_armed = True
+        signal.setitimer(signal.ITIMER_REAL, budget)
+        function(*args)
+        g_budget_armed = False
+    except TimeBudgetExceeded:
+        return False
+    finally:
+        g_budget_armed = False
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+    return True
+
+
+def _exec_job(job):
+    # job is the arguments of exec_validators(), returns the error of
+    # the validation or None
+    try:
+        exec_validators(*job)
+    except ValidationError as e:
+        return e.error
+    return None
+
+
+def exec_validators_in_workers(jobs):
+    """
+    Executes the validators of jobs, each one the arguments of
+    exec_validators() for an independent row, and returns the
+    ValidationError.error of each job, None if its validation succeeded.
+
+    With at least g_parallel_min_jobs jobs, they are split between
+    g_workers forked processes, which validate against a copy of the
+    IDL as it is, including the changes of the current transaction.
+    The jobs of a process that fails are validated in this process.
+    Validators must not modify the IDL: the changes of a forked process
+    are lost, and it can't reach the database or the clients.
+    """
+    if g_workers <= 1 or len(jobs) < g_parallel_min_jobs:
+        return [_exec_job(job) for job in jobs]
+
+    chunk_size = (len(jobs) + g_workers - 1) / g_workers
+    workers = []
+    for index in range(0, len(jobs), chunk_size):
+        chunk = jobs[index:index + chunk_size]
+        try:
+            workers.append((_fork_worker(chunk), chunk))
+        except OSError as e:
+            app_log.warning("Failed to fork a validator worker: %s" % e)
+            workers.append((None, chunk))
+
+    results = []
+    for worker, chunk in workers:
+        chunk_results = None
+        if worker is not None:
+            chunk_results = _wait_worker(worker)
+        if chunk_results is None:
+            chunk_results = [_exec_job(job) for job in chunk]
+        results.extend(chunk_results)
+
+    return results
+
+
+def _fork_worker(jobs):
+    global g_stats
+    read_fd, write_fd = os.pipe()
+    try:
+        pid = os.fork()
+    except OSError:
+        os.close(read_fd)
+        os.close(write_fd)
+        raise
+
+    if pid != 0:
+        os.close(write_fd)
+        return (pid, read_fd)
+
+    # Validator worker, replies with its results and statistics and
+    # exits without returning to the caller
+    status = 1
+    try:
+        os.close(read_fd)
+        _detach_from_parent(write_fd)
+        g_stats = {}
+        results = [_exec_job(job) for job in jobs]
+        with os.fdopen(write_fd, 'wb') as pipe:
+            pickle.dump((results, g_stats), pipe, pickle.HIGHEST_PROTOCOL)
+        status = 0
+    except BaseException as e:
+        app_log.warning("Validator worker failed: %r" % e)
+    finally:
+        os._exit(status)
+
+
+def _detach_from_parent(keep_fd):
+    # Keeps a validator worker from using what it inherited from the
+    # parent: the files of the parent (e.g. the pidfile) are not removed
+    # on a fatal signal, the IOLoop of the parent is not used, and the
+    # sockets (HTTP listening sockets and connections, OVSDB and unixctl
+    # connections) are replaced with /dev/null. Their descriptors stay
+    # allocated, so that the objects still referring to them can't use
+    # files opened by the worker.
+    ovs.fatal_signal.fork()
+    IOLoop.clear_instance()
+    IOLoop.clear_current()
+
+    try:
+        fds = [int(fd) for fd in os.listdir('/proc/self/fd')]
+    except OSError:
+        fds = range(3, os.sysconf('SC_OPEN_MAX'))
+
+    null_fd = os.open(os.devnull, os.O_RDWR)
+    try:
+        for fd in fds:
+            if fd in (keep_fd, null_fd):
+                continue
+            try:
+                if stat.S_ISSOCK(os.fstat(fd).st_mode):
+                    os.dup2(null_fd, fd)
+            except OSError:
+                # Closed, e.g. the descriptor listing /proc/self/fd
+                pass
+    finally:
+        os.close(null_fd)
+
+
+def _wait_worker(worker):
+    # Returns the results of the worker, None if it failed
+    (pid, read_fd) = worker
+    try:
+        data = _read_all(read_fd)
+    finally:
+        os.close(read_fd)
+    (pid, status) = _retry_on_eintr(os.waitpid, pid, 0)
+
+    if status != 0 or not data:
+        app_log.warning("Validator worker %d failed, status %d" %
+                        (pid, status))
+        return None
+
+    (results, stats) = pickle.loads(data)
+    for validator_type, worker_stats in stats.iteritems():
+        if validator_type in g_stats:
+            g_stats[validator_type].merge(worker_stats)
+        else:
+            g_stats[validator_type] = worker_stats
+    return results
+
+
+def _read_all(fd):
+    # Reads fd until the end of file. A file object can't be used, its
+    # read() loses the data already read when interrupted by a signal
+    chunks = []
+    while True:
+        chunk = _retry_on_eintr(os.read, fd, 65536)
+        if not chunk:
+            return ''.join(chunks)
+        chunks.append(chunk)
+
+
+def _retry_on_eintr(function, *args):
+    # The system calls waiting for the workers are interrupted by the
+    # signals handled meanwhile, e.g. the SIGCHLD handler of
+    # tornado.process.Subprocess on the exit of any child process
+    while True:
+        try:
+            return function(*args)
+        except (IOError, OSError) as e:
+            if e.errno != errno.EINTR:
+                raise
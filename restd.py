@@ -1,17 +1,31 @@
 #!/usr/bin/env python
+import errno
+import os
+import random
+import sys
+import time
 import tornado.httpserver
 import tornado.ioloop
 import tornado.options
 import tornado.web
 import tornado.autoreload
+import tornado.netutil
+import tornado.process
 from tornado.options import options
 import tornado.web
 from tornado.ioloop import IOLoop
 from opsrest.settings import settings
 from opsrest.application import OvsdbApiApplication
 from opsrest.manager import OvsdbConnectionManager
+from opsvalidator import validator
 from tornado.log import app_log
+import ovs.daemon
+import ovs.dirs
+import ovs.fatal_signal
+import ovs.poller
+import ovs.util
 import ovs.unixctl
+import ovs.unixctl.client
 import ovs.unixctl.server
 import ops_diagdump
 import tornado.http1connection
@@ -22,38 +36,132 @@ options.logging = settings['logging']
 enable_pretty_logging()
 
 
+# Number of worker processes, see main()
+worker_count = 1
+
+# unixctl command of the workers, replying with their diagnostic dump
+WORKER_DIAG_COMMAND = "restd/worker-diag"
+
+# Interval at which the supervisor of the workers checks if they exited
+WORKER_POLL_INTERVAL_MS = 1000
+
+unixctl_server = None
+
+
 def diag_basic_handler(argv):
     # argv[0] is set to the string "basic"
     # argv[1] is set to the feature name, e.g. rest
     feature = argv.pop()
     buff = "Diagnostic dump response for feature " + feature + ".\n"
+    if worker_count == 1:
+        return buff + diag_worker_report()
+
+    # The supervisor serves the diagnostic dump, the workers reply to
+    # WORKER_DIAG_COMMAND on their own unixctl socket
+    for task_id in range(worker_count):
+        buff += "Worker %d:\n" % task_id
+        buff += get_worker_report(task_id)
+        buff += "\n"
+    return buff
+
+
+def get_worker_report(task_id):
+    error, client = ovs.unixctl.client.UnixctlClient.create(
+        worker_unixctl_path(task_id))
+    if error:
+        return "  Not available: %s\n" % os.strerror(error)
+
+    error, reply_error, reply = client.transact(WORKER_DIAG_COMMAND, [])
+    client.close()
+    if error:
+        return "  Not available: %s\n" % os.strerror(error)
+    elif reply_error is not None:
+        return "  Failed: %s\n" % reply_error
+    return reply
+
+
+def unixctl_worker_diag(conn, argv, aux):
+    conn.reply(diag_worker_report())
+
+
+def worker_unixctl_path(task_id):
+    return "%s/%s-worker.%d.ctl" % (ovs.dirs.RUNDIR, ovs.util.PROGRAM_NAME,
+                                    task_id)
+
+
+def diag_worker_report():
+    buff = ""
+    if worker_count > 1:
+        buff += "Process ID: %d\n" % os.getpid()
     buff += "Active HTTPS connections:\n"
     for conn in HTTPS_server._connections:
         buff += "  Client IP is %s\n" % conn.context
     buff += "Transactions list:\n"
-    buff += "  Index\t  Status\n"
-    buff += "  ---------------\n"
+    buff += "  Request ID\t  Status\t  Age (s)\n"
+    buff += "  ----------------------------------\n"
     transactions = app.manager.transactions
-    for index, txn in enumerate(transactions.txn_list):
-        buff += "  %s\t  %s\n" % (index, txn.status)
+    now = time.time()
+    for request_id, txn in transactions.txns.items():
+        buff += "  %s\t  %s\t  %.3f\n" % (request_id, txn.status,
+                                         now - txn.start_time)
     buff += "Total number of pending "\
-            "transactions is %s" % len(transactions.txn_list)
+            "transactions is %s\n" % len(transactions)
+    stats = transactions.get_stats()
+    buff += "Transactions statistics:\n"
+    buff += "  Maximum pending: %s\n" % stats['max_pending']
+    buff += "  Completed: %s\n" % stats['completed']
+    buff += "  Failed: %s\n" % stats['failed']
+    buff += "  Timed out: %s\n" % stats['timed_out']
+    buff += "  Commit latency (ms): average %.3f, maximum %.3f, "\
+            "last %.3f" % (stats['average_latency'] * 1000,
+                           stats['max_latency'] * 1000,
+                           stats['last_latency'] * 1000)
+    if app.manager.group_commit:
+        buff += "\nGroup commit: %s transactions, %s fallbacks, "\
+                "%s conflicts, %s queued operations" % (
+                    app.manager.group_commits, app.manager.group_fallbacks,
+                    app.manager.group_conflicts,
+                    len(app.manager.group_operations))
+    buff += "\nValidators:\n"
+    buff += "  Validator\t  Calls\t  Total (ms)\t  Maximum (ms)\t"\
+            "  Over budget\n"
+    buff += "  ----------------------------------------------------------\n"
+    for validator_type, stats in sorted(validator.get_stats().items()):
+        buff += "  %s\t  %d\t  %.3f\t  %.3f\t  %d\n" % (
+            validator_type, stats.calls, stats.total_time * 1000,
+            stats.max_time * 1000, stats.budget_exceeded)
     return buff
 
 
 class UnixctlManager:
-    def start(self):
+    def __init__(self, path=None):
+        # The unixctl server of a worker listens on 'path' and only
+        # serves WORKER_DIAG_COMMAND
+        self.path = path
+
+    def create(self):
         app_log.info("Creating unixctl server")
-        ovs.daemon.set_pidfile(None)
-        ovs.daemon._make_pidfile()
+        if self.path is None:
+            ovs.daemon.set_pidfile(None)
+            ovs.daemon._make_pidfile()
         global unixctl_server
-        error, unixctl_server = ovs.unixctl.server.UnixctlServer.create(None)
+        error, unixctl_server = \
+            ovs.unixctl.server.UnixctlServer.create(self.path)
         if error:
             app_log.error("Failed to create unixctl server")
-        else:
+        elif self.path is None:
             app_log.info("Created unixctl server")
             app_log.info("Init diag dump")
             ops_diagdump.init_diag_dump_basic(diag_basic_handler)
+        else:
+            app_log.info("Created unixctl server %s" % self.path)
+            ovs.unixctl.command_register(WORKER_DIAG_COMMAND, "", 0, 0,
+                                         unixctl_worker_diag, None)
+        return error
+
+    def start(self):
+        error = self.create()
+        if not error:
             # Add handler in tornado
             IOLoop.current().add_handler(
                 unixctl_server._listener.socket.fileno(),
@@ -69,10 +177,117 @@ class UnixctlManager:
             unixctl_server.run()
 
 
+def fork_worker(task_id):
+    """
+    Forks the worker task_id, returns its pid in the supervisor and None
+    in the worker.
+    """
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # The files of the supervisor (pidfile, unixctl socket) are not
+    # unlinked when the worker exits, and its unixctl sockets are closed
+    ovs.fatal_signal.fork()
+    if unixctl_server is not None:
+        unixctl_server._listener.socket.close()
+        for conn in unixctl_server._conns:
+            if conn._rpc.stream is not None:
+                conn._rpc.stream.socket.close()
+    random.seed()
+    return None
+
+
+def run_workers(count, max_restarts):
+    """
+    Forks count worker processes, returns the task id (0 to count - 1)
+    of the worker in each of them.
+
+    The parent process supervises the workers and never returns: it owns
+    the pidfile and serves the diagnostic dump, which includes the
+    report of each worker, and it restarts the workers exiting
+    abnormally, up to max_restarts times. It exits once all the workers
+    exited normally.
+    """
+    children = {}
+    for task_id in range(count):
+        pid = fork_worker(task_id)
+        if pid is None:
+            return task_id
+        children[pid] = task_id
+
+    UnixctlManager().create()
+
+    restarts = 0
+    while children:
+        poller = ovs.poller.Poller()
+        if unixctl_server is not None:
+            unixctl_server.wait(poller)
+        poller.timer_wait(WORKER_POLL_INTERVAL_MS)
+        poller.block()
+        if unixctl_server is not None:
+            unixctl_server.run()
+
+        while children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            if pid == 0:
+                break
+
+            task_id = children.pop(pid, None)
+            if task_id is None:
+                continue
+            if os.WIFSIGNALED(status):
+                app_log.warning("Worker %d (pid %d) killed by signal %d, "
+                                "restarting" % (task_id, pid,
+                                                os.WTERMSIG(status)))
+            elif os.WEXITSTATUS(status) != 0:
+                app_log.warning("Worker %d (pid %d) exited with status %d, "
+                                "restarting" % (task_id, pid,
+                                                os.WEXITSTATUS(status)))
+            else:
+                app_log.info("Worker %d (pid %d) exited normally" %
+                             (task_id, pid))
+                continue
+
+            restarts += 1
+            if restarts > max_restarts:
+                raise RuntimeError("Too many worker restarts, giving up")
+
+            pid = fork_worker(task_id)
+            if pid is None:
+                return task_id
+            children[pid] = task_id
+
+    sys.exit(0)
+
+
 def main():
-    global app, HTTPS_server, HTTP_server
+    global app, HTTPS_server, HTTP_server, worker_count
 
     options.parse_command_line()
+
+    worker_count = options.workers
+    if worker_count <= 0:
+        worker_count = tornado.process.cpu_count()
+
+    if worker_count > 1:
+        # The listening sockets are shared by the workers, each one with
+        # its own OVSDB connection and IDL replica. The parent process
+        # supervises them, see run_workers().
+        app_log.debug("Server listening to port: %s" % options.HTTPS_port)
+        HTTPS_sockets = tornado.netutil.bind_sockets(options.HTTPS_port)
+        app_log.debug("Server listening to port: %s" % options.HTTP_port)
+        HTTP_sockets = tornado.netutil.bind_sockets(options.HTTP_port)
+
+        app_log.info("Starting %d workers" % worker_count)
+        task_id = run_workers(worker_count,
+                              settings['worker_max_restarts'])
+
     app_log.debug("Creating OVSDB API Application!")
     app = OvsdbApiApplication(settings)
 
@@ -82,13 +297,20 @@ def main():
 
     HTTP_server = tornado.httpserver.HTTPServer(app)
 
-    app_log.debug("Server listening to port: %s" % options.HTTPS_port)
-    HTTPS_server.listen(options.HTTPS_port)
+    if worker_count > 1:
+        HTTPS_server.add_sockets(HTTPS_sockets)
+        HTTP_server.add_sockets(HTTP_sockets)
+    else:
+        app_log.debug("Server listening to port: %s" % options.HTTPS_port)
+        HTTPS_server.listen(options.HTTPS_port)
 
-    app_log.debug("Server listening to port: %s" % options.HTTP_port)
-    HTTP_server.listen(options.HTTP_port)
+        app_log.debug("Server listening to port: %s" % options.HTTP_port)
+        HTTP_server.listen(options.HTTP_port)
 
-    unixmgr = UnixctlManager()
+    if worker_count > 1:
+        unixmgr = UnixctlManager(worker_unixctl_path(task_id))
+    else:
+        unixmgr = UnixctlManager()
     unixmgr.start()
     app_log.info("Starting server!")
     tornado.ioloop.IOLoop.instance().start()
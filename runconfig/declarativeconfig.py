@@ -4,7 +4,6 @@ from opsrest.exceptions import DataValidationFailed
 from opsrest import verify
 from validatoradapter import ValidatorAdapter
 from tornado.log import app_log
-from copy import deepcopy
 import ovs
 import urllib
 import types
@@ -103,17 +102,13 @@ def _get_row_data(row, table_name, schema, idl, index=None):
                     column_name = name
                     break
 
-            # Iterate through entire child table to find those rows belonging
-            # to the same parent
-            for item in idl.tables[child_name].rows.itervalues():
-                # Get the parent row reference
-                ref = item.__getattr__(column_name)
-                # Parent reference is same as 'row' (row was passed to
-                #this function) this is now the child of 'row'
-                if ref.uuid == row.uuid:
-                    data = _get_row_data(item, child_name, schema, idl)
-                    if data is not None:
-                        children_data.update(data)
+            # Get the rows belonging to the same parent from the
+            # parent index of the child table
+            for item in idl.parent_to_rows(child_name, column_name,
+                                           row.uuid):
+                data = _get_row_data(item, child_name, schema, idl)
+                if data is not None:
+                    children_data.update(data)
 
         if children_data:
             row_data[child_name] = children_data
@@ -190,9 +185,61 @@ def read(schema, idl):
 
 # WRITE CONFIG
 
+# The configuration is applied as a delta from the running configuration:
+# each existing row is compared to its data as read() returns it (its
+# 'old data'), and only the rows with modified columns are verified,
+# written and validated. Rows without old data are written as a whole.
+
+
+def _is_empty(value):
+    return value is None or value == {} or value == []
+
+
+def get_changed_columns(columns, old_data, row_data):
+    '''
+    Returns the columns whose value in row_data, the requested
+    configuration of a row, differs from old_data. Missing columns are
+    empty.
+    '''
+    changed = []
+    for key in columns:
+        old_value = old_data.get(key)
+        value = row_data.get(key)
+        if _is_empty(old_value) and _is_empty(value):
+            continue
+        if old_value != value:
+            changed.append(key)
+    return changed
+
+
+def get_changed_references(references, old_data, row_data):
+    '''
+    Returns the 'reference' columns whose list of referenced indexes in
+    row_data differs from old_data, regardless of the order.
+    '''
+    changed = []
+    for key, value in references.iteritems():
+        if value.relation != 'reference':
+            continue
+        if sorted(old_data.get(key) or []) != sorted(row_data.get(key) or []):
+            changed.append(key)
+    return changed
+
+
+def _get_uuids(rows):
+    if isinstance(rows, dict):
+        return dict((key, row.uuid) for key, row in rows.iteritems()
+                    if row is not None)
+    return set(row.uuid for row in rows if row is not None)
+
 
 def setup_row(index_values, table, row_data, txn, reflist, schema, idl,
-              validator_adapter, errors, old_row=None):
+              validator_adapter, errors, old_row=None, old_data=None):
+    '''
+    Sets up the row of index_values and its children, returns (row,
+    is_new, is_changed), is_changed is False if the row is not written.
+    old_data is the running configuration of the row, see read().
+    '''
 
     # Initialize the flag for row to check if it is new row
     is_new = False
@@ -203,45 +250,57 @@ def setup_row(index_values, table, row_data, txn, reflist, schema, idl,
     else:
         row = utils.index_to_row(index_values,
                                  schema.ovs_tables[table],
-                                 idl.tables[table])
+                                 idl.tables[table], idl)
 
     # Create a new row if not found in DB
     if row is None:
         if is_immutable_table(table, schema):
             # Do NOT add row in Immutable table_data
-            return (None, False)
+            return (None, False, False)
         row = txn.insert(idl.tables[table])
         is_new = True
 
     # Routes are special case - only static routes can be updated
     if table == 'Route':
         if not is_new and row.__getattr__('from') != 'static':
-            return (None, False)
+            return (None, False, False)
         elif is_new:
             row.__setattr__('from', 'static')
 
     references = schema.ovs_tables[table].references
     children = schema.ovs_tables[table].children
 
+    config_rows = schema.ovs_tables[table].config
+    if is_new or old_data is None:
+        old_data = None
+        config_keys = config_rows.keys()
+        is_changed = True
+    else:
+        # Only the modified columns are verified and written
+        config_keys = get_changed_columns(config_rows, old_data, row_data)
+        is_changed = bool(config_keys or
+                          get_changed_references(references, old_data,
+                                                 row_data))
+
     try:
-        request_type = REQUEST_TYPE_CREATE if is_new else REQUEST_TYPE_UPDATE
-        get_all_errors = True
-
-        # Check for back-references and remove it from the row data since
-        # it will be checked upon recursive call anyways.
-        _row_data = deepcopy(row_data)
-        for data in row_data:
-            if data in children and data not in references:
-                del _row_data[data]
-
-        results = verify.verify_config_data(_row_data, table, schema,
-                                            request_type, get_all_errors)
+        if is_changed:
+            request_type = REQUEST_TYPE_CREATE if is_new else \
+                REQUEST_TYPE_UPDATE
+            get_all_errors = True
+
+            # Check for back-references and remove it from the row data
+            # since it will be checked upon recursive call anyways.
+            # verify_config_data() doesn't modify the data, the values
+            # don't need to be copied.
+            _row_data = dict((key, value)
+                             for key, value in row_data.iteritems()
+                             if key not in children or key in references)
+
+            results = verify.verify_config_data(_row_data, table, schema,
+                                                request_type, get_all_errors)
     except DataValidationFailed as e:
         errors.extend(e.detail)
 
-    config_rows = schema.ovs_tables[table].config
-    config_keys = config_rows.keys()
-
     # Iterate over all config keys
     for key in config_keys:
         # Ignore if row is existing and column is immutable
@@ -285,11 +344,12 @@ def setup_row(index_values, table, row_data, txn, reflist, schema, idl,
             reference = table_schema.references[key]
             kv_type = reference.kv_type
 
-            if not is_new and key not in row_data:
+            if not is_new and key not in row_data and row.__getattr__(key):
                 if kv_type:
                     row.__setattr__(key, {})
                 else:
                     row.__setattr__(key, [])
+                is_changed = True
         else:
             # back-references
             if child_table not in row_data:
@@ -305,6 +365,9 @@ def setup_row(index_values, table, row_data, txn, reflist, schema, idl,
             if key in references else key
 
         if key in row_data:
+            old_children = {}
+            if old_data is not None:
+                old_children = old_data.get(key, {})
 
             if key in references:
                 # forward referenced children
@@ -338,22 +401,20 @@ def setup_row(index_values, table, row_data, txn, reflist, schema, idl,
                     else:
                         child_index_values = utils.escaped_split(child_index)
 
-                    (child_row, is_child_new) = setup_row(child_index_values,
-                                                          child_table,
-                                                          child_row_data,
-                                                          txn, reflist,
-                                                          schema, idl,
-                                                          validator_adapter,
-                                                          errors,
-                                                          current_row)
+                    (child_row, is_child_new, is_child_changed) = \
+                        setup_row(child_index_values, child_table,
+                                  child_row_data, txn, reflist, schema, idl,
+                                  validator_adapter, errors, current_row,
+                                  old_children.get(child_index))
                     if child_row is None:
                         continue
 
-                    op = REQUEST_TYPE_CREATE if is_child_new else \
-                        REQUEST_TYPE_UPDATE
-
-                    validator_adapter.add_resource_op(op, child_row,
-                                                      child_table, row, table)
+                    if is_child_changed:
+                        op = REQUEST_TYPE_CREATE if is_child_new else \
+                            REQUEST_TYPE_UPDATE
+                        validator_adapter.add_resource_op(op, child_row,
+                                                          child_table, row,
+                                                          table)
                     if kv_type:
                         child_reference_list.update({child_index: child_row})
                     else:
@@ -361,8 +422,11 @@ def setup_row(index_values, table, row_data, txn, reflist, schema, idl,
                         # Save this in global reflist
                         reflist[(child_table, child_index)] = (child_row,
                                                                is_child_new)
-                if not is_immutable_table(child_table, schema):
+                if (not is_immutable_table(child_table, schema) and
+                        (is_new or _get_uuids(row.__getattr__(key)) !=
+                         _get_uuids(child_reference_list))):
                     row.__setattr__(key, child_reference_list)
+                    is_changed = True
             else:
                 # backward referenced children
                 parent_column = None
@@ -375,21 +439,20 @@ def setup_row(index_values, table, row_data, txn, reflist, schema, idl,
                 for child_index, child_row_data in row_data[key].iteritems():
                     child_index_values = utils.escaped_split(child_index)
 
-                    (child_row, is_child_new) = setup_row(child_index_values,
-                                                          child_table,
-                                                          child_row_data,
-                                                          txn, reflist,
-                                                          schema, idl,
-                                                          validator_adapter,
-                                                          errors)
+                    (child_row, is_child_new, is_child_changed) = \
+                        setup_row(child_index_values, child_table,
+                                  child_row_data, txn, reflist, schema, idl,
+                                  validator_adapter, errors, None,
+                                  old_children.get(child_index))
                     if child_row is None:
                         continue
 
-                    op = REQUEST_TYPE_CREATE if is_child_new else \
-                        REQUEST_TYPE_UPDATE
-
-                    validator_adapter.add_resource_op(op, child_row,
-                                                      child_table, row, table)
+                    if is_child_changed:
+                        op = REQUEST_TYPE_CREATE if is_child_new else \
+                            REQUEST_TYPE_UPDATE
+                        validator_adapter.add_resource_op(op, child_row,
+                                                          child_table, row,
+                                                          table)
 
                     # Set the references column in child row
                     if parent_column is not None and is_child_new:
@@ -399,7 +462,7 @@ def setup_row(index_values, table, row_data, txn, reflist, schema, idl,
                     reflist[(child_table, child_index)] = (child_row,
                                                            is_child_new)
 
-    return (row, is_new)
+    return (row, is_new, is_changed)
 
 
 def clean_subtree(table, entries, txn, schema, idl, validator_adapter,
@@ -421,9 +484,9 @@ def clean_subtree(table, entries, txn, schema, idl, validator_adapter,
                 if value.relation == 'parent':
                     parent_column = key
                     break
-            for row in idl.tables[table].rows.itervalues():
-                if parent_column is not None and \
-                   row.__getattr__(parent_column) == parent:
+            if parent_column is not None:
+                for row in idl.parent_to_rows(table, parent_column,
+                                              parent.uuid):
                     clean_row(table, row, txn, schema, idl, validator_adapter)
 
 
@@ -468,19 +531,25 @@ def clean_row(table, row, txn, schema, idl, validator_adapter):
 
 
 def setup_table(table, table_data, txn, reflist, schema, idl,
-                validator_adapter, errors):
+                validator_adapter, errors, old_table_data=None):
+
+    if old_table_data is None:
+        old_table_data = {}
 
     # Iterate over each row
     for index, row_data in table_data.iteritems():
         index_values = utils.escaped_split(index)
 
-        (row, isNew) = setup_row(index_values, table, row_data, txn, reflist,
-                                 schema, idl, validator_adapter, errors)
+        (row, isNew, isChanged) = setup_row(index_values, table, row_data,
+                                            txn, reflist, schema, idl,
+                                            validator_adapter, errors, None,
+                                            old_table_data.get(index))
         if row is None:
             continue
 
-        op = REQUEST_TYPE_CREATE if isNew else REQUEST_TYPE_UPDATE
-        validator_adapter.add_resource_op(op, row, table)
+        if isChanged:
+            op = REQUEST_TYPE_CREATE if isNew else REQUEST_TYPE_UPDATE
+            validator_adapter.add_resource_op(op, row, table)
 
         # Save this in global reflist
         reflist[(table, index)] = (row, isNew)
@@ -518,8 +587,10 @@ def setup_references(table, table_data, txn, reflist, schema, idl, errors):
                         (ref_row, is_new_referenced) = reflist[(ref_table,
                                                                 item)]
                         new_reference_list.append(ref_row)
-                # Set the reference list
-                row.__setattr__(key, new_reference_list)
+                # Set the reference list, if modified
+                if (isNew or _get_uuids(row.__getattr__(key)) !=
+                        _get_uuids(new_reference_list)):
+                    row.__setattr__(key, new_reference_list)
 
         # Do the same for all child tables
         for key in schema.ovs_tables[table].children:
@@ -546,12 +617,13 @@ def remove_deleted_rows(table, table_data, txn, schema, idl, validator_adapter,
                 break
 
     # Find rows for deletion from the DB that are not in the declarative config
-    for row in idl.tables[table].rows.itervalues():
-        index = utils.row_to_index(row, table, schema, idl, parent)
+    if parent_column is not None:
+        rows = idl.parent_to_rows(table, parent_column, parent.uuid)
+    else:
+        rows = idl.tables[table].rows.values()
 
-        if (parent_column is not None and
-           row.__getattr__(parent_column) != parent):
-            continue
+    for row in rows:
+        index = utils.row_to_index(row, table, schema, idl, parent)
 
         # Routes are special case - only static routes can be deleted
         if table == 'Route' and row.__getattr__('from') != 'static':
@@ -579,12 +651,15 @@ def remove_orphaned_rows(txn, schema, idl, validator_adapter):
         if parent_column is None:
             continue
 
-        # Delete orphans
+        # Delete orphans, the children of parents that no longer exist
+        parent_rows = idl.tables[table_schema.parent].rows
         delete_rows = []
-        for row in idl.tables[table_name].rows.itervalues():
-            parent_row = row.__getattr__(parent_column)
-            if parent_row not in idl.tables[table_schema.parent].rows:
-                delete_rows.append(row)
+        for parent_uuid in idl.tables[table_name].parent_map.get(
+                parent_column, {}).keys():
+            if parent_uuid not in parent_rows:
+                delete_rows.extend(idl.parent_to_rows(table_name,
+                                                      parent_column,
+                                                      parent_uuid))
         for i in delete_rows:
             i.delete()
 
@@ -603,15 +678,20 @@ def write_config_to_db(schema, idl, data):
     # validations.
     validator_adapter = ValidatorAdapter(idl, schema)
 
+    # Running configuration, only its differences with data are written
+    old_data = read(schema, idl)
+
     # Start with System table
     table_name = 'System'
 
+    # Reconstruct System record with correct UUID from the DB
+    system_uuid = str(idl.tables[table_name].rows.keys()[0])
+    old_data[table_name] = {system_uuid: old_data[table_name]}
+
     if table_name not in data:
         # Log the error, but proceed to collect all errors
         errors.append("System table missing")
     else:
-        # Reconstruct System record with correct UUID from the DB
-        system_uuid = str(idl.tables[table_name].rows.keys()[0])
         data[table_name] = {system_uuid: data[table_name]}
 
     # Iterate over all top-level tables
@@ -630,7 +710,7 @@ def write_config_to_db(schema, idl, data):
                                 validator_adapter)
 
         setup_table(table_name, new_data, txn, reflist, schema, idl,
-                    validator_adapter, errors)
+                    validator_adapter, errors, old_data.get(table_name))
 
     # The tables are all set up, now connect the references together
     for table_name, value in data.iteritems():
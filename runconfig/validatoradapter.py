@@ -1,3 +1,5 @@
+import time
+
 from opsrest.constants import *
 from opsvalidator import validator
 from opsvalidator.error import ValidationError
@@ -69,17 +71,29 @@ class ValidatorAdapter(object):
                 delete_op_data.resource_row.delete()
 
     def _exec_modification_validators(self):
-        for create_op_data in self.resource_ops_dict[REQUEST_TYPE_CREATE]:
-            self._exec_validator_with_op(create_op_data)
+        # The rows are validated independently of each other, possibly
+        # in validator worker processes
+        ops_data = self.resource_ops_dict[REQUEST_TYPE_CREATE] + \
+            self.resource_ops_dict[REQUEST_TYPE_UPDATE]
+        jobs = [(self.idl, self.schema, op_data.resource_table,
+                 op_data.resource_row, op_data.method,
+                 op_data.p_resource_table, op_data.p_resource_row)
+                for op_data in ops_data]
 
-        for update_op_data in self.resource_ops_dict[REQUEST_TYPE_UPDATE]:
-            self._exec_validator_with_op(update_op_data)
+        for error in validator.exec_validators_in_workers(jobs):
+            if error is not None:
+                app_log.info("Validation failed:")
+                app_log.info(error)
+                self.errors.append(error)
 
     def exec_validators_with_ops(self):
         app_log.debug("Executing validators for all ops..")
+        start = time.time()
         # Deletion validations should occur first, since the deletions were
         # postponed in order to retain the row data for validations. Prior
         # to modification validations, the rows should actually be removed
         # from the IDL.
         self._exec_deletion_validators_and_delete()
         self._exec_modification_validators()
+        app_log.debug("Validators executed in %.3f ms" %
+                      ((time.time() - start) * 1000))
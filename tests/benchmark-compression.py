@@ -0,0 +1,97 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+# NOTE: run using Python2 on the switch, next to a running OVSDB
+import gzip
+import sys
+import time
+from io import BytesIO
+
+import ovs.db.idl
+
+import ops.dc
+from opslib import restparser
+from opsrest import get
+from opsrest.constants import *
+from opsrest.parse import parse_url_path
+from opsrest.settings import settings
+from opsrest.utils import jsonutils
+from ops.opsidl import OpsIdl
+
+'''
+Bytes on the wire and CPU cost of the gzip compression of the responses,
+for the full configuration and a GET with depth=2, at each compression
+level.
+
+usage: benchmark-compression.py [URI] [ITERATIONS]
+'''
+
+LEVELS = [1, 6, 9]
+
+
+def connect():
+    schema_helper = ovs.db.idl.SchemaHelper(settings['ovs_schema'])
+    schema_helper.register_all()
+    restschema = restparser.parseSchema(settings['ext_schema'])
+    idl = OpsIdl(settings['ovs_remote'], schema_helper, restschema)
+
+    seqno = idl.change_seqno
+    while seqno == idl.change_seqno:
+        idl.run()
+        time.sleep(0.01)
+
+    return (idl, restschema)
+
+
+def compress(body, level):
+    # As GZipContentEncoding does
+    value = BytesIO()
+    gzip_file = gzip.GzipFile(mode="w", fileobj=value, compresslevel=level)
+    gzip_file.write(body)
+    gzip_file.close()
+    return value.getvalue()
+
+
+def benchmark(name, body, iterations):
+    print("%s: %d bytes uncompressed" % (name, len(body)))
+    for level in LEVELS:
+        start = time.clock()
+        for i in range(iterations):
+            compressed = compress(body, level)
+        elapsed = (time.clock() - start) / iterations
+        print("  gzip level %d: %d bytes (%.1f%%), %.2f ms CPU" %
+              (level, len(compressed), 100.0 * len(compressed) / len(body),
+               elapsed * 1000))
+
+
+def main():
+    uri = sys.argv[1] if len(sys.argv) > 1 else '/rest/v1/system'
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    jsonutils.set_encoder(settings.get('json_encoder', JSON_ENCODER_JSON))
+    (idl, restschema) = connect()
+
+    full_config = jsonutils.dumps(ops.dc.read(restschema, idl))
+    benchmark('Full configuration', full_config, iterations)
+
+    resource = parse_url_path(uri, restschema, idl, REQUEST_TYPE_READ)
+    depth2 = jsonutils.dumps(get.get_resource(idl, resource, restschema,
+                                              uri, None,
+                                              {REST_QUERY_PARAM_DEPTH:
+                                               ['2']}))
+    benchmark('GET %s?depth=2' % uri, depth2, iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+# NOTE: run using Python2 on the switch, next to a running OVSDB
+import copy
+import sys
+import time
+
+import ovs.db.idl
+
+import ops.dc
+from opslib import restparser
+from opsrest.settings import settings
+from ops.opsidl import OpsIdl
+
+'''
+Benchmark of ops.dc.write with a large synthetic configuration: the
+running configuration with VLANS VLANs added to bridge_normal. The
+configuration is applied, applied again unchanged, and then the
+original configuration is restored (deleting the VLANs).
+
+usage: benchmark-dc-write.py [VLANS]
+'''
+
+BRIDGE = 'bridge_normal'
+
+
+def connect():
+    schema_helper = ovs.db.idl.SchemaHelper(settings['ovs_schema'])
+    schema_helper.register_all()
+    restschema = restparser.parseSchema(settings['ext_schema'])
+    idl = OpsIdl(settings['ovs_remote'], schema_helper, restschema)
+
+    seqno = idl.change_seqno
+    while seqno == idl.change_seqno:
+        idl.run()
+        time.sleep(0.01)
+
+    return (idl, restschema)
+
+
+def synthetic_config(config, vlans):
+    config = copy.deepcopy(config)
+    bridge = config['System']['bridges'][BRIDGE]
+    bridge_vlans = bridge.setdefault('vlans', {})
+    for vlan_id in range(2, vlans + 2):
+        name = 'VLAN%d' % vlan_id
+        bridge_vlans[name] = {'id': vlan_id, 'name': name, 'admin': 'up'}
+    return config
+
+
+def benchmark(name, idl, restschema, config):
+    # dc.write modifies the configuration
+    config = copy.deepcopy(config)
+    start = time.time()
+    result = ops.dc.write(config, restschema, idl)
+    elapsed = time.time() - start
+    print("%s: %.2f s, %s" % (name, elapsed, result))
+
+
+def main():
+    vlans = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+
+    (idl, restschema) = connect()
+
+    running = ops.dc.read(restschema, idl)
+    config = synthetic_config(running, vlans)
+
+    benchmark('Apply %d VLANs' % vlans, idl, restschema, config)
+    benchmark('Apply %d VLANs again' % vlans, idl, restschema, config)
+    benchmark('Restore the configuration', idl, restschema, running)
+
+
+if __name__ == "__main__":
+    main()
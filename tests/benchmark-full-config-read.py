@@ -0,0 +1,82 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+# NOTE: run using Python2 on the switch, next to a running OVSDB
+import sys
+import time
+
+import ovs.db.idl
+
+import ops.dc
+from opslib import restparser
+from opsrest.settings import settings
+from ops.opsidl import OpsIdl
+
+'''
+Benchmark of the read of the full running configuration, comparing
+ops.dc.read without cache with the configuration maintained in the row
+cache, when it is unchanged and after a row is modified.
+
+usage: benchmark-full-config-read.py [ITERATIONS]
+'''
+
+
+def connect():
+    schema_helper = ovs.db.idl.SchemaHelper(settings['ovs_schema'])
+    schema_helper.register_all()
+    restschema = restparser.parseSchema(settings['ext_schema'])
+    idl = OpsIdl(settings['ovs_remote'], schema_helper, restschema)
+
+    seqno = idl.change_seqno
+    while seqno == idl.change_seqno:
+        idl.run()
+        time.sleep(0.01)
+
+    return (idl, restschema)
+
+
+def benchmark(name, function, iterations):
+    start = time.time()
+    for i in range(iterations):
+        result = function()
+    elapsed = (time.time() - start) / iterations
+    print("%s: %.3f ms per read" % (name, elapsed * 1000))
+    return result
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    (idl, restschema) = connect()
+    system = idl.tables['System'].rows.values()[0]
+
+    def modified_read():
+        # As if the IDL was notified of a change of the System row
+        idl.row_cache.invalidate('System', system.uuid)
+        return ops.dc.read(restschema, idl, cached=True)
+
+    old = benchmark('Uncached', lambda: ops.dc.read(restschema, idl),
+                    iterations)
+    new = benchmark('Cached', lambda: ops.dc.read(restschema, idl,
+                                                  cached=True),
+                    iterations)
+    benchmark('Cached, System row modified', modified_read, iterations)
+
+    if old != new:
+        print("ERROR: results differ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
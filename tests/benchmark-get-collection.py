@@ -0,0 +1,131 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+# NOTE: run using Python2 on the switch, next to a running OVSDB
+import sys
+import time
+
+import ovs.db.idl
+
+from opslib import restparser
+from opsrest import get
+from opsrest.constants import *
+from opsrest.parse import parse_url_path
+from opsrest.settings import settings
+from opsrest.utils import getutils
+from ops.opsidl import OpsIdl
+
+'''
+Benchmark of a GET on a resource collection with depth, comparing the
+rendering of the filter/sort columns and the pagination window only,
+with the rendering of the whole collection followed by post-processing.
+
+usage: benchmark-get-collection.py URI [QUERY_ARGS] [ITERATIONS]
+e.g. benchmark-get-collection.py /rest/v1/system/vrfs/vrf_default/routes \\
+         "depth=1;limit=10;sort=prefix" 20
+'''
+
+
+def connect():
+    schema_helper = ovs.db.idl.SchemaHelper(settings['ovs_schema'])
+    schema_helper.register_all()
+    restschema = restparser.parseSchema(settings['ext_schema'])
+    idl = OpsIdl(settings['ovs_remote'], schema_helper, restschema)
+
+    seqno = idl.change_seqno
+    while seqno == idl.change_seqno:
+        idl.run()
+        time.sleep(0.01)
+
+    return (idl, restschema)
+
+
+def parse_query_args(query):
+    query_arguments = {}
+    for arg in query.split(';'):
+        if arg:
+            name, value = arg.split('=', 1)
+            query_arguments.setdefault(name, []).append(value)
+    return query_arguments
+
+
+def get_all_rendered(idl, restschema, uri, query_arguments):
+    # Renders the whole collection and post-processes it
+    resource = parse_url_path(uri, restschema, idl, REQUEST_TYPE_READ)
+    while resource.next.next is not None:
+        resource = resource.next
+
+    selector = getutils.get_query_arg(REST_QUERY_PARAM_SELECTOR,
+                                      query_arguments)
+    depth = getutils.get_depth_param(query_arguments)
+    sorting_args = []
+    filter_args = {}
+    pagination_args = {}
+    keys_args = []
+    getutils.validate_query_args(sorting_args, filter_args, pagination_args,
+                                 keys_args, query_arguments, restschema,
+                                 resource.next, selector, depth, True)
+
+    offset = pagination_args.get(REST_QUERY_PARAM_OFFSET)
+    limit = pagination_args.get(REST_QUERY_PARAM_LIMIT)
+
+    _uri = get._get_uri(resource, restschema, uri)
+    result = get.get_collection_json(resource, restschema, idl, _uri,
+                                     selector, depth)
+    return getutils.post_process_get_data(result, sorting_args, filter_args,
+                                          offset, limit, keys_args,
+                                          restschema, resource.next.table,
+                                          selector, categorize=True)
+
+
+def get_window_rendered(idl, restschema, uri, query_arguments):
+    resource = parse_url_path(uri, restschema, idl, REQUEST_TYPE_READ)
+    selector = getutils.get_query_arg(REST_QUERY_PARAM_SELECTOR,
+                                      query_arguments)
+    return get.get_resource(idl, resource, restschema, uri, selector,
+                            query_arguments)
+
+
+def benchmark(name, function, iterations, *args):
+    start = time.time()
+    for i in range(iterations):
+        # Do not measure the row cache
+        args[0].row_cache.clear()
+        result = function(*args)
+    elapsed = (time.time() - start) / iterations
+    print("%s: %.2f ms per GET, %d elements" % (name, elapsed * 1000,
+                                                 len(result)))
+    return result
+
+
+def main():
+    uri = sys.argv[1]
+    query_arguments = parse_query_args(sys.argv[2] if len(sys.argv) > 2
+                                       else 'depth=1;limit=10')
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    (idl, restschema) = connect()
+
+    old = benchmark('Render all, then post-process', get_all_rendered,
+                    iterations, idl, restschema, uri, query_arguments)
+    new = benchmark('Render pagination window', get_window_rendered,
+                    iterations, idl, restschema, uri, query_arguments)
+
+    if old != new:
+        print("ERROR: results differ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
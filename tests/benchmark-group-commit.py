@@ -0,0 +1,172 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+# NOTE: run using Python2 on the switch, next to a running OVSDB
+import sys
+import time
+from functools import partial
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from opslib import restparser
+from opsrest import delete, patch, post
+from opsrest.constants import *
+from opsrest.manager import OvsdbConnectionManager
+from opsrest.parse import parse_url_path
+from opsrest.settings import settings
+
+'''
+Throughput benchmark of concurrent requests committed in a transaction
+per request and with group commit:
+- PATCH requests on the System table, each one adding a key to
+  other_config
+- POST requests of VLANs on bridge_normal, each one adding a reference
+  to the VLANs of the bridge
+
+usage: benchmark-group-commit.py [REQUESTS] [CONCURRENCY]
+'''
+
+SYSTEM_URI = '/rest/v1/system'
+VLANS_URI = '/rest/v1/system/bridges/bridge_normal/vlans'
+BENCHMARK_KEY_PREFIX = 'benchmark-group-commit-'
+BENCHMARK_VLAN_PREFIX = 'GROUPCOMMIT'
+BENCHMARK_VLAN_FIRST_ID = 2
+
+
+@gen.coroutine
+def connect(group_commit):
+    restschema = restparser.parseSchema(settings['ext_schema'])
+    manager = OvsdbConnectionManager(settings['ovs_remote'],
+                                     settings['ovs_schema'], restschema,
+                                     group_commit=group_commit)
+    manager.start()
+    while not manager.connected:
+        yield gen.sleep(0.1)
+
+    raise gen.Return(manager)
+
+
+@gen.coroutine
+def patch_system(manager, operations):
+    resource = parse_url_path(SYSTEM_URI, manager.restschema, manager.idl,
+                              REQUEST_TYPE_PATCH)
+    txn = manager.get_new_transaction(group=True)
+    apply_changes = partial(patch.patch_resource, operations, resource,
+                            manager.restschema, idl=manager.idl,
+                            uri=SYSTEM_URI, commit=False)
+    status = yield manager.commit_transaction(txn, apply_changes)
+    if status not in (SUCCESS, UNCHANGED):
+        raise Exception("PATCH failed: %s" % txn.get_error())
+
+
+@gen.coroutine
+def post_vlan(manager, vlan_id):
+    resource = parse_url_path(VLANS_URI, manager.restschema, manager.idl,
+                              REQUEST_TYPE_CREATE)
+    txn = manager.get_new_transaction(group=True)
+    data = {OVSDB_SCHEMA_CONFIG: {
+        'name': BENCHMARK_VLAN_PREFIX + str(vlan_id),
+        'id': vlan_id,
+        'admin': 'up'}}
+    apply_changes = partial(post.post_resource, data, resource,
+                            manager.restschema, idl=manager.idl,
+                            commit=False)
+    status = yield manager.commit_transaction(txn, apply_changes)
+    if status not in (SUCCESS, UNCHANGED):
+        raise Exception("POST failed: %s" % txn.get_error())
+
+
+@gen.coroutine
+def delete_vlan(manager, name):
+    uri = VLANS_URI + '/' + name
+    resource = parse_url_path(uri, manager.restschema, manager.idl,
+                              REQUEST_TYPE_DELETE)
+    txn = manager.get_new_transaction(group=True)
+    apply_changes = partial(delete.delete_resource, resource,
+                            manager.restschema, idl=manager.idl,
+                            commit=False)
+    yield manager.commit_transaction(txn, apply_changes)
+
+
+@gen.coroutine
+def patch_client(manager, requests, index, concurrency):
+    for i in range(index, requests, concurrency):
+        yield patch_system(manager, [{'op': 'add',
+                                      'path': '/other_config/' +
+                                      BENCHMARK_KEY_PREFIX + str(i),
+                                      'value': str(i)}])
+
+
+@gen.coroutine
+def patch_cleanup(manager):
+    # Concurrent transactions per request overwrite each other's keys
+    system = manager.idl.tables['System'].rows.values()[0]
+    keys = [key for key in system.other_config
+            if key.startswith(BENCHMARK_KEY_PREFIX)]
+    if keys:
+        yield patch_system(manager, [{'op': 'remove',
+                                      'path': '/other_config/' + key}
+                                     for key in keys])
+
+
+@gen.coroutine
+def vlan_client(manager, requests, index, concurrency):
+    for i in range(index, requests, concurrency):
+        yield post_vlan(manager, BENCHMARK_VLAN_FIRST_ID + i)
+
+
+@gen.coroutine
+def vlan_cleanup(manager):
+    names = [row.name for row in manager.idl.tables['VLAN'].rows.values()
+             if row.name.startswith(BENCHMARK_VLAN_PREFIX)]
+    yield [delete_vlan(manager, name) for name in names]
+
+
+@gen.coroutine
+def benchmark(name, client, cleanup, group_commit, requests, concurrency):
+    manager = yield connect(group_commit)
+
+    start = time.time()
+    yield [client(manager, requests, index, concurrency)
+           for index in range(concurrency)]
+    elapsed = time.time() - start
+    transactions = manager.transactions.completed
+
+    yield cleanup(manager)
+    IOLoop.current().remove_handler(manager.ovs_socket.fileno())
+    manager.idl.close()
+
+    print("%s, %s: %d requests in %.2f s, %.1f requests/s, "
+          "%d transactions, %d conflicts" %
+          (name, "group commit" if group_commit else
+           "transaction per request", requests, elapsed,
+           requests / elapsed, transactions, manager.group_conflicts))
+
+
+@gen.coroutine
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    for group_commit in (False, True):
+        yield benchmark("PATCH System", patch_client, patch_cleanup,
+                        group_commit, requests, concurrency)
+    for group_commit in (False, True):
+        yield benchmark("POST VLAN", vlan_client, vlan_cleanup,
+                        group_commit, requests, concurrency)
+
+
+if __name__ == "__main__":
+    IOLoop.current().run_sync(main)
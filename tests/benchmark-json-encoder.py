@@ -0,0 +1,101 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+# NOTE: run using Python2 on the switch, next to a running OVSDB
+import os
+import resource
+import sys
+import time
+
+import ovs.db.idl
+
+import ops.dc
+from opslib import restparser
+from opsrest import get
+from opsrest.constants import *
+from opsrest.parse import parse_url_path
+from opsrest.settings import settings
+from opsrest.utils import jsonutils
+from ops.opsidl import OpsIdl
+
+'''
+Benchmark of the JSON encoders on the full configuration (as read by
+ops.dc.read) and on a GET with depth=2, reporting the encode time and
+the peak memory of each encoder. Each encoder runs in its own process.
+
+usage: benchmark-json-encoder.py [URI] [ITERATIONS]
+'''
+
+ENCODERS = [JSON_ENCODER_JSON, JSON_ENCODER_SIMPLEJSON, JSON_ENCODER_UJSON]
+
+
+def connect():
+    schema_helper = ovs.db.idl.SchemaHelper(settings['ovs_schema'])
+    schema_helper.register_all()
+    restschema = restparser.parseSchema(settings['ext_schema'])
+    idl = OpsIdl(settings['ovs_remote'], schema_helper, restschema)
+
+    seqno = idl.change_seqno
+    while seqno == idl.change_seqno:
+        idl.run()
+        time.sleep(0.01)
+
+    return (idl, restschema)
+
+
+def benchmark(name, encoder, data, iterations):
+    pid = os.fork()
+    if pid:
+        os.waitpid(pid, 0)
+        return
+
+    try:
+        jsonutils.set_encoder(encoder)
+    except ValueError as e:
+        print("%s, %s: %s" % (name, encoder, e))
+        os._exit(0)
+
+    # ru_maxrss is in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    for i in range(iterations):
+        body = jsonutils.dumps(data)
+    elapsed = (time.time() - start) / iterations
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - peak
+
+    print("%s, %s: %.2f ms per encode, %d bytes, peak memory +%d kB" %
+          (name, encoder, elapsed * 1000, len(body), peak))
+    os._exit(0)
+
+
+def main():
+    uri = sys.argv[1] if len(sys.argv) > 1 else '/rest/v1/system'
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    (idl, restschema) = connect()
+
+    full_config = ops.dc.read(restschema, idl)
+
+    resource_ = parse_url_path(uri, restschema, idl, REQUEST_TYPE_READ)
+    depth2 = get.get_resource(idl, resource_, restschema, uri, None,
+                              {REST_QUERY_PARAM_DEPTH: ['2']})
+
+    for encoder in ENCODERS:
+        benchmark('Full configuration', encoder, full_config, iterations)
+    for encoder in ENCODERS:
+        benchmark('GET %s?depth=2' % uri, encoder, depth2, iterations)
+
+
+if __name__ == "__main__":
+    main()
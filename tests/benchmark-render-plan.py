@@ -0,0 +1,149 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+# NOTE: run using Python2 on the switch, next to a running OVSDB
+import sys
+import time
+
+import ovs.db.idl
+
+from opslib import restparser
+from opsrest import get
+from opsrest.constants import *
+from opsrest.parse import parse_url_path
+from opsrest.settings import settings
+from opsrest.utils import utils
+from opsrest.utils import getutils
+from ops.opsidl import OpsIdl
+
+'''
+Micro-benchmark of the rendering of the rows of a table, comparing the
+render plans with the lookup of the REST schema columns for every row.
+
+usage: benchmark-render-plan.py URI [SELECTOR] [ITERATIONS]
+e.g. benchmark-render-plan.py /rest/v1/system/interfaces status 20
+'''
+
+
+def connect():
+    schema_helper = ovs.db.idl.SchemaHelper(settings['ovs_schema'])
+    schema_helper.register_all()
+    restschema = restparser.parseSchema(settings['ext_schema'])
+    idl = OpsIdl(settings['ovs_remote'], schema_helper, restschema)
+
+    seqno = idl.change_seqno
+    while seqno == idl.change_seqno:
+        idl.run()
+        time.sleep(0.01)
+
+    return (idl, restschema)
+
+
+def get_row_json_schema_lookup(row, table, schema, idl, uri, selector=None,
+                               depth=0, depth_counter=0):
+    # Rendering of a row before the render plans
+    depth_counter += 1
+    db_row = idl.tables[table].rows[row]
+    schema_table = schema.ovs_tables[table]
+
+    config_keys = {}
+    config_data = {}
+    if selector is None or selector == OVSDB_SCHEMA_CONFIG:
+        config_keys = schema_table.config
+        config_data = utils.row_to_json(db_row, config_keys)
+    config_data = {key: config_data[key] for key in config_data
+                   if not(config_data[key] == None or
+                   config_data[key] == {} or config_data[key] == [])}
+
+    stats_keys = {}
+    stats_data = {}
+    if selector is None or selector == OVSDB_SCHEMA_STATS:
+        stats_keys = schema_table.stats
+        stats_data = utils.row_to_json(db_row, stats_keys)
+    stats_data = {key: stats_data[key] for key in stats_data
+                  if stats_data[key]}
+
+    status_keys = {}
+    status_data = {}
+    if selector is None or selector == OVSDB_SCHEMA_STATUS:
+        status_keys = schema_table.status
+        status_data = utils.row_to_json(db_row, status_keys)
+    status_data = {key: status_data[key] for key in status_data
+                   if status_data[key]}
+
+    references = schema_table.references
+    for key in references:
+        if references[key].ref_table == schema_table.parent:
+            continue
+
+        if (depth_counter >= depth):
+            depth = 0
+
+        reference_data = get.get_column_json(key, row, table, schema,
+                                             idl, uri, selector, depth,
+                                             depth_counter)
+        if not reference_data:
+            continue
+
+        category = references[key].category
+        if config_keys and category == OVSDB_SCHEMA_CONFIG:
+            config_data.update({key: reference_data})
+        elif stats_keys and category == OVSDB_SCHEMA_STATS:
+            stats_data.update({key: reference_data})
+        elif status_keys and category == OVSDB_SCHEMA_STATUS:
+            status_data.update({key: reference_data})
+
+    return getutils._categorize_by_selector(config_data, stats_data,
+                                            status_data, selector)
+
+
+def benchmark(name, function, iterations, idl, restschema, table, uri,
+              selector):
+    rows = idl.tables[table].rows.keys()
+    start = time.time()
+    for i in range(iterations):
+        result = [function(row, table, restschema, idl, uri, selector)
+                  for row in rows]
+    elapsed = time.time() - start
+    print("%s: %.0f rows/s, %d rows" % (name, len(rows) * iterations /
+                                        elapsed, len(rows)))
+    return result
+
+
+def main():
+    uri = sys.argv[1]
+    selector = sys.argv[2] if len(sys.argv) > 2 else None
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    (idl, restschema) = connect()
+
+    resource = parse_url_path(uri, restschema, idl, REQUEST_TYPE_READ)
+    while resource.next.next is not None:
+        resource = resource.next
+    table = resource.next.table
+
+    # The row cache is bypassed, rows are rendered every time
+    old = benchmark('Schema lookup per row', get_row_json_schema_lookup,
+                    iterations, idl, restschema, table, uri, selector)
+    get.build_render_plans(restschema, idl)
+    new = benchmark('Render plan', get._get_row_json, iterations, idl,
+                    restschema, table, uri, selector)
+
+    if old != new:
+        print("ERROR: results differ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
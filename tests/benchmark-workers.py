@@ -0,0 +1,77 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+# NOTE: run using Python2 against a running restd
+import sys
+import time
+import urllib
+
+from tornado import gen
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+from tornado.ioloop import IOLoop
+
+'''
+Read load test of restd: concurrent GETs of a resource, reporting the
+requests per second. Run it against restd started with --workers=1, 2,
+4... to compare the throughput with the number of workers.
+
+usage: benchmark-workers.py BASE_URL USER PASSWORD [URI] [REQUESTS]
+                            [CONCURRENCY]
+e.g. benchmark-workers.py https://172.17.0.2 netop netop \\
+         "/rest/v1/system/interfaces?depth=1" 2000 20
+'''
+
+
+@gen.coroutine
+def login(http_client, base_url, user, password):
+    body = urllib.urlencode({'username': user, 'password': password})
+    response = yield http_client.fetch(
+        HTTPRequest(base_url + '/login', method='POST', body=body,
+                    validate_cert=False))
+    raise gen.Return(response.headers['Set-Cookie'])
+
+
+@gen.coroutine
+def client(http_client, url, cookie, requests):
+    for i in range(requests):
+        yield http_client.fetch(HTTPRequest(url, headers={'Cookie': cookie},
+                                            validate_cert=False))
+
+
+@gen.coroutine
+def main():
+    base_url = sys.argv[1].rstrip('/')
+    user = sys.argv[2]
+    password = sys.argv[3]
+    uri = sys.argv[4] if len(sys.argv) > 4 else '/rest/v1/system'
+    requests = int(sys.argv[5]) if len(sys.argv) > 5 else 1000
+    concurrency = int(sys.argv[6]) if len(sys.argv) > 6 else 20
+
+    AsyncHTTPClient.configure(None, max_clients=concurrency)
+    http_client = AsyncHTTPClient()
+    cookie = yield login(http_client, base_url, user, password)
+
+    start = time.time()
+    yield [client(http_client, base_url + uri, cookie,
+                  requests / concurrency)
+           for i in range(concurrency)]
+    elapsed = time.time() - start
+
+    total = requests / concurrency * concurrency
+    print("%d GET %s in %.2f s, %.1f requests/s (concurrency %d)" %
+          (total, uri, elapsed, total / elapsed, concurrency))
+
+
+if __name__ == "__main__":
+    IOLoop.current().run_sync(main)
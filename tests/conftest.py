@@ -0,0 +1,169 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+# Fixtures of the unit tests (test_ops-restd_ut_*.py), they run without a
+# switch or an OVSDB server: the IDL is populated directly with the
+# updates the server would send.
+
+import copy
+import json
+import os
+import sys
+import uuid
+import xml.etree.ElementTree as ET
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import ovs.db.idl
+from opslib import restparser
+
+from ops.opsidl import OpsIdl
+
+
+EXTSCHEMA = {
+    "name": "OpenSwitch",
+    "version": "0.1.8",
+    "tables": {
+        "System": {
+            "isRoot": True,
+            "maxRows": 1,
+            "columns": {
+                "hostname": {
+                    "category": "configuration",
+                    "type": {"key": "string", "min": 0, "max": 1}},
+                "vrfs": {
+                    "category": "configuration",
+                    "relationship": "1:m",
+                    "type": {"key": {"type": "uuid", "refTable": "VRF"},
+                             "min": 0, "max": "unlimited"}}}},
+        "VRF": {
+            "indexes": [["name"]],
+            "columns": {
+                "name": {
+                    "category": "configuration",
+                    "type": "string"},
+                "ports": {
+                    "category": "configuration",
+                    "relationship": "reference",
+                    "type": {"key": {"type": "uuid", "refTable": "Port"},
+                             "min": 0, "max": "unlimited"}},
+                "bgp_routers": {
+                    "category": "configuration",
+                    "relationship": "1:m",
+                    "type": {"key": {"type": "integer"},
+                             "value": {"type": "uuid",
+                                       "refTable": "BGP_Router"},
+                             "min": 0, "max": "unlimited"}}}},
+        "BGP_Router": {
+            "columns": {
+                "router_id": {
+                    "category": "configuration",
+                    "type": {"key": "string", "min": 0, "max": 1}}}},
+        "BGP_Neighbor": {
+            "isRoot": True,
+            "indexes": [["bgp_router", "ip_or_group_name"]],
+            "columns": {
+                "bgp_router": {
+                    "category": "configuration",
+                    "relationship": "m:1",
+                    "type": {"key": {"type": "uuid",
+                                     "refTable": "BGP_Router"}}},
+                "ip_or_group_name": {
+                    "category": "configuration",
+                    "type": "string"},
+                "remote_as": {
+                    "category": "configuration",
+                    "type": {"key": "integer", "min": 0, "max": 1}}}},
+        "Port": {
+            "isRoot": True,
+            "indexes": [["name"]],
+            "columns": {
+                "name": {
+                    "category": "configuration",
+                    "type": "string"},
+                "tag": {
+                    "category": "configuration",
+                    "type": {"key": "integer", "min": 0, "max": 1}},
+                "other_config": {
+                    "category": "configuration",
+                    "type": {"key": "string", "value": "string",
+                             "min": 0, "max": "unlimited"}},
+                "statistics": {
+                    "category": "statistics",
+                    "type": {"key": "string", "value": "integer",
+                             "min": 0, "max": "unlimited"}}}}}}
+
+EXTSCHEMA_ONLY_KEYS = ("category", "relationship", "mutable")
+
+
+def _get_ovsschema():
+    ovsschema = copy.deepcopy(EXTSCHEMA)
+    for table in ovsschema["tables"].itervalues():
+        for column in table["columns"].itervalues():
+            for key in EXTSCHEMA_ONLY_KEYS:
+                column.pop(key, None)
+    return ovsschema
+
+
+@pytest.fixture
+def restschema(monkeypatch):
+    # The schema has no XML documentation of its columns
+    monkeypatch.setattr(restparser, 'xml_tree',
+                        ET.ElementTree(ET.Element('database')),
+                        raising=False)
+    schema = restparser.RESTSchema.from_json(EXTSCHEMA)
+    for name, table in schema.ovs_tables.iteritems():
+        table.mutable = not restparser.is_immutable(name, schema)
+    return schema
+
+
+@pytest.fixture
+def idl(restschema, tmpdir):
+    path = tmpdir.join("test.ovsschema")
+    path.write(json.dumps(_get_ovsschema()))
+    schema_helper = ovs.db.idl.SchemaHelper(str(path))
+    schema_helper.register_all()
+    return OpsIdl('unix:/nonexistent', schema_helper, restschema)
+
+
+@pytest.fixture
+def update_row():
+    """
+    Returns a function applying to the IDL the update the database would
+    send for a row: update_row(idl, table_name, row_uuid, new, old=None).
+    new and old are the OVSDB JSON of the columns, new is None if the row
+    is deleted. Returns the row.
+    """
+    def _update_row(idl, table_name, row_uuid, new, old=None):
+        row_update = {}
+        if new is not None:
+            row_update["new"] = new
+        if old is not None:
+            row_update["old"] = old
+        idl._Idl__parse_update({table_name: {str(row_uuid): row_update}})
+        return idl.tables[table_name].rows.get(row_uuid)
+    return _update_row
+
+
+@pytest.fixture
+def insert_row(update_row):
+    """
+    Returns a function inserting a row in the IDL as if the database sent
+    it: insert_row(idl, table_name, new). Returns the row.
+    """
+    def _insert_row(idl, table_name, new):
+        return update_row(idl, table_name, uuid.uuid4(), new)
+    return _insert_row
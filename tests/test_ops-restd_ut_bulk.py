@@ -0,0 +1,113 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+import httplib
+
+import pytest
+
+from opsrest import bulk
+from opsrest.constants import *
+from opsrest.exceptions import BulkOperationFailed
+from opsrest.transaction import OvsdbTransaction
+
+VRFS_PATH = REST_VERSION_PATH + "system/vrfs"
+
+
+def _ref(row):
+    return ["uuid", str(row.uuid)]
+
+
+def _operation(method, path, body=None):
+    operation = {BULK_KEY_METHOD: method, BULK_KEY_PATH: path}
+    if body is not None:
+        operation[BULK_KEY_BODY] = body
+    return operation
+
+
+def _bulk(restschema, idl, operations):
+    # Returns the transaction the operations were applied to and their
+    # results, the transaction is aborted by the caller
+    txn = OvsdbTransaction(idl)
+    results = []
+    try:
+        bulk.bulk_resources(operations, restschema, txn, idl, commit=False,
+                            results=results)
+    except Exception:
+        txn.abort()
+        raise
+    return (txn, results)
+
+
+def test_create_then_child(restschema, idl, insert_row):
+    # The key of the routers of a VRF, named in the XML documentation
+    bgp_routers = restschema.ovs_tables["VRF"].references["bgp_routers"]
+    bgp_routers.column.keyname = "asn"
+    system = insert_row(idl, "System", {"hostname": "switch"})
+
+    operations = [
+        _operation(REQUEST_TYPE_CREATE, VRFS_PATH,
+                   {OVSDB_SCHEMA_CONFIG: {"name": "red"}}),
+        _operation(REQUEST_TYPE_CREATE, VRFS_PATH + "/red/bgp_routers",
+                   {OVSDB_SCHEMA_CONFIG: {"asn": 1,
+                                          "router_id": "1.1.1.1"}})]
+    (txn, results) = _bulk(restschema, idl, operations)
+    try:
+        (vrf,) = idl.tables["VRF"].rows.values()
+        (router,) = idl.tables["BGP_Router"].rows.values()
+        assert system.vrfs == [vrf]
+        assert vrf.bgp_routers == {1: router}
+        assert router.router_id == ["1.1.1.1"]
+        assert results == [(REQUEST_TYPE_CREATE, VRFS_PATH, SUCCESS),
+                           (REQUEST_TYPE_CREATE,
+                            VRFS_PATH + "/red/bgp_routers", SUCCESS)]
+    finally:
+        txn.abort()
+
+
+def test_delete_then_update(restschema, idl, insert_row):
+    router = insert_row(idl, "BGP_Router", {"router_id": "1.1.1.1"})
+    vrf = insert_row(idl, "VRF", {"name": "red",
+                                  "bgp_routers": ["map", [[1, _ref(router)]]]})
+    insert_row(idl, "System", {"hostname": "switch",
+                               "vrfs": ["set", [_ref(vrf)]]})
+    router_path = VRFS_PATH + "/red/bgp_routers/1"
+    operations = [
+        _operation(REQUEST_TYPE_UPDATE, router_path,
+                   {OVSDB_SCHEMA_CONFIG: {"router_id": "1.1.1.1"}}),
+        _operation(REQUEST_TYPE_DELETE, router_path),
+        _operation(REQUEST_TYPE_UPDATE, router_path,
+                   {OVSDB_SCHEMA_CONFIG: {"router_id": "2.2.2.2"}})]
+    with pytest.raises(BulkOperationFailed) as e:
+        _bulk(restschema, idl, operations)
+    assert e.value.index == 2
+    assert e.value.status_code == httplib.NOT_FOUND
+
+    # Without the update, the router written again is unchanged
+    (txn, results) = _bulk(restschema, idl, operations[:2])
+    try:
+        assert idl.tables["BGP_Router"].rows == {}
+        assert vrf.bgp_routers == {}
+        assert results == [(REQUEST_TYPE_UPDATE, router_path, UNCHANGED),
+                           (REQUEST_TYPE_DELETE, router_path, SUCCESS)]
+    finally:
+        txn.abort()
+
+
+def test_get_operation_status():
+    assert bulk.get_operation_status(REQUEST_TYPE_CREATE, SUCCESS) == \
+        httplib.CREATED
+    assert bulk.get_operation_status(REQUEST_TYPE_DELETE, SUCCESS) == \
+        httplib.NO_CONTENT
+    assert bulk.get_operation_status(REQUEST_TYPE_DELETE, UNCHANGED) == \
+        httplib.OK
@@ -0,0 +1,177 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+import copy
+
+import ovs.db.idl
+import pytest
+
+from opsrest.constants import REQUEST_TYPE_UPDATE
+from runconfig import declarativeconfig
+from runconfig.validatoradapter import ValidatorAdapter
+
+
+def _ref(row):
+    return ["uuid", str(row.uuid)]
+
+
+@pytest.fixture
+def config(idl, insert_row):
+    """
+    Returns the running configuration of a System with a VRF, a BGP
+    router and neighbor, and a port
+    """
+    router = insert_row(idl, "BGP_Router", {"router_id": "1.1.1.1"})
+    port = insert_row(idl, "Port", {"name": "1", "tag": 10,
+                                    "other_config": ["map", [["a", "b"]]]})
+    vrf = insert_row(idl, "VRF",
+                     {"name": "red", "ports": ["set", [_ref(port)]],
+                      "bgp_routers": ["map", [[1, _ref(router)]]]})
+    insert_row(idl, "System", {"hostname": "switch",
+                               "vrfs": ["set", [_ref(vrf)]]})
+    insert_row(idl, "BGP_Neighbor", {"bgp_router": _ref(router),
+                                     "ip_or_group_name": "2.2.2.2",
+                                     "remote_as": 100})
+    return declarativeconfig.read(idl.restschema, idl)
+
+
+def _setup_row(restschema, idl, table_name, index_values, row_data,
+               old_data):
+    # Returns the result of setup_row(), the changes of the transaction
+    # as {(table name, row uuid): set of columns} and the validator
+    # operations
+    txn = ovs.db.idl.Transaction(idl)
+    validator_adapter = ValidatorAdapter(idl, restschema)
+    errors = []
+    try:
+        result = declarativeconfig.setup_row(index_values, table_name,
+                                             row_data, txn, {}, restschema,
+                                             idl, validator_adapter, errors,
+                                             old_data=old_data)
+        changes = dict(((row._table.name, row.uuid), set(row._changes))
+                       for row in txn._txn_rows.itervalues())
+    finally:
+        txn.abort()
+
+    assert errors == []
+    operations = [(op.resource_table, op.method)
+                  for ops in validator_adapter.resource_ops_dict.values()
+                  for op in ops]
+    return (result, changes, operations)
+
+
+def test_read(config):
+    assert config == {
+        "System": {
+            "hostname": ["switch"],
+            "vrfs": {
+                "red": {
+                    "name": "red",
+                    "ports": ["1"],
+                    "bgp_routers": {
+                        1: {"router_id": ["1.1.1.1"],
+                            "BGP_Neighbor": {
+                                "2.2.2.2": {
+                                    "ip_or_group_name": "2.2.2.2",
+                                    "remote_as": [100]}}}}}}},
+        "Port": {
+            "1": {"name": "1", "tag": [10], "other_config": {"a": "b"}}}}
+
+
+def test_get_changed_columns():
+    columns = ["name", "tag", "other_config"]
+    old_data = {"name": "1", "tag": [10], "other_config": {}}
+
+    assert declarativeconfig.get_changed_columns(
+        columns, old_data, {"name": "1", "tag": [10]}) == []
+    assert declarativeconfig.get_changed_columns(
+        columns, old_data, {"name": "1", "tag": [10],
+                            "other_config": {}}) == []
+    assert declarativeconfig.get_changed_columns(
+        columns, old_data, {"name": "1", "tag": [20],
+                            "other_config": {"a": "b"}}) == \
+        ["tag", "other_config"]
+    assert declarativeconfig.get_changed_columns(
+        columns, old_data, {"name": "1"}) == ["tag"]
+
+
+def test_get_changed_references(restschema):
+    references = restschema.ovs_tables["VRF"].references
+    old_data = {"ports": ["1", "2"], "bgp_routers": {1: {}}}
+
+    # Only the 'reference' columns, regardless of the order
+    assert declarativeconfig.get_changed_references(
+        references, old_data, {"ports": ["2", "1"]}) == []
+    assert declarativeconfig.get_changed_references(
+        references, old_data, {"ports": ["1"]}) == ["ports"]
+    assert declarativeconfig.get_changed_references(
+        references, {}, {"ports": []}) == []
+
+
+def test_setup_row_unchanged(restschema, idl, config):
+    port_data = config["Port"]["1"]
+    ((row, is_new, is_changed), changes, operations) = _setup_row(
+        restschema, idl, "Port", ["1"], copy.deepcopy(port_data), port_data)
+    assert row.name == "1"
+    assert not is_new and not is_changed
+    assert changes == {} and operations == []
+
+    # Nothing is written in the subtree of an unchanged row
+    vrf_data = config["System"]["vrfs"]["red"]
+    ((row, is_new, is_changed), changes, operations) = _setup_row(
+        restschema, idl, "VRF", ["red"], copy.deepcopy(vrf_data), vrf_data)
+    assert row.name == "red"
+    assert not is_new and not is_changed
+    assert changes == {} and operations == []
+
+
+def test_setup_row_changed_columns(restschema, idl, config):
+    port_data = config["Port"]["1"]
+    row_data = copy.deepcopy(port_data)
+    row_data["tag"] = [20]
+    del row_data["other_config"]
+
+    ((row, is_new, is_changed), changes, operations) = _setup_row(
+        restschema, idl, "Port", ["1"], row_data, port_data)
+    assert not is_new and is_changed
+    assert changes == {("Port", row.uuid): set(["tag", "other_config"])}
+
+
+def test_setup_row_changed_child(restschema, idl, config):
+    vrf_data = config["System"]["vrfs"]["red"]
+    row_data = copy.deepcopy(vrf_data)
+    row_data["bgp_routers"][1]["BGP_Neighbor"]["2.2.2.2"]["remote_as"] = \
+        [200]
+
+    # Only the modified child is written and validated
+    ((row, is_new, is_changed), changes, operations) = _setup_row(
+        restschema, idl, "VRF", ["red"], row_data, vrf_data)
+    assert not is_changed
+    assert changes.values() == [set(["remote_as"])]
+    assert changes.keys()[0][0] == "BGP_Neighbor"
+    assert operations == [("BGP_Neighbor", REQUEST_TYPE_UPDATE)]
+
+
+def test_setup_row_changed_reference(restschema, idl, config, insert_row):
+    insert_row(idl, "Port", {"name": "2"})
+    vrf_data = config["System"]["vrfs"]["red"]
+    row_data = copy.deepcopy(vrf_data)
+    row_data["ports"] = ["1", "2"]
+
+    ((row, is_new, is_changed), changes, operations) = _setup_row(
+        restschema, idl, "VRF", ["red"], row_data, vrf_data)
+    # The references are written by setup_references(), the row is
+    # reported as changed so that its parent validates it
+    assert not is_new and is_changed
+    assert changes == {} and operations == []
@@ -0,0 +1,212 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+import ovs.db.idl
+
+from opsrest.manager import OvsdbConnectionManager
+from opsrest.transaction import OvsdbTransaction
+
+
+def _get_manager(restschema, idl):
+    manager = OvsdbConnectionManager('unix:/nonexistent', None, restschema,
+                                     group_commit=True)
+    manager.idl = idl
+    return manager
+
+
+def _set_tag(port, tag):
+    def apply_changes(txn):
+        port.tag = [tag]
+    return apply_changes
+
+
+def _insert_port(name):
+    def apply_changes(txn):
+        port = txn.insert(txn.txn.idl.tables["Port"])
+        port.name = name
+    return apply_changes
+
+
+def _set_ports(vrf, ports):
+    def apply_changes(txn):
+        vrf.ports = ports
+    return apply_changes
+
+
+def _add_port(vrf, name):
+    # As the POST of a child: inserts the row and adds it to the
+    # references of the parent
+    def apply_changes(txn):
+        port = txn.insert(txn.txn.idl.tables["Port"])
+        port.name = name
+        vrf.ports = vrf.ports + [port]
+    return apply_changes
+
+
+def _set_other_config(port, key, value):
+    def apply_changes(txn):
+        other_config = dict(port.other_config)
+        other_config[key] = value
+        port.other_config = other_config
+    return apply_changes
+
+
+def _delete(row):
+    def apply_changes(txn):
+        row.delete()
+    return apply_changes
+
+
+def _fail(txn):
+    raise ValueError("invalid")
+
+
+def test_apply_group_without_conflicts(restschema, idl, insert_row):
+    port1 = insert_row(idl, "Port", {"name": "1"})
+    port2 = insert_row(idl, "Port", {"name": "2"})
+    manager = _get_manager(restschema, idl)
+
+    operations = [(OvsdbTransaction(), _set_tag(port1, 1)),
+                  (OvsdbTransaction(), _set_tag(port2, 2)),
+                  (OvsdbTransaction(), _insert_port("3"))]
+    (group_txn, deferred) = manager._apply_group(list(operations))
+    try:
+        assert deferred == []
+        assert len(group_txn.txn._txn_rows) == 3
+        assert port1.tag == [1] and port2.tag == [2]
+    finally:
+        group_txn.abort()
+
+
+def _counted(apply_changes, calls):
+    def counted_apply_changes(txn):
+        calls.append(apply_changes)
+        apply_changes(txn)
+    return counted_apply_changes
+
+
+def _check_conflict(manager, first, conflicting, other):
+    # The operations after the conflicting one are deferred as well,
+    # the operations are applied at most twice
+    calls = []
+    first = (OvsdbTransaction(), _counted(first, calls))
+    other = (OvsdbTransaction(), _counted(other, calls))
+    conflicting = (OvsdbTransaction(), conflicting)
+    after = (OvsdbTransaction(), _fail)
+    operations = [first, other, conflicting, after]
+
+    (group_txn, deferred) = manager._apply_group(operations)
+    try:
+        assert operations == [first, other]
+        assert deferred == [conflicting, after]
+        assert len(calls) == 4
+        assert not [txn for (txn, _) in operations + deferred
+                    if txn.event.is_set()]
+    finally:
+        group_txn.abort()
+
+
+def test_apply_group_conflicts(restschema, idl, insert_row):
+    port1 = insert_row(idl, "Port", {"name": "1"})
+    port2 = insert_row(idl, "Port", {"name": "2"})
+    vrf = insert_row(idl, "VRF", {"name": "red"})
+    manager = _get_manager(restschema, idl)
+
+    # Same column
+    _check_conflict(manager, _set_tag(port1, 1), _set_tag(port1, 2),
+                    _set_tag(port2, 2))
+    # Same index
+    _check_conflict(manager, _insert_port("3"), _insert_port("3"),
+                    _insert_port("4"))
+    # Same element of a map column
+    _check_conflict(manager, _set_other_config(port1, "a", "1"),
+                    _set_other_config(port1, "a", "2"),
+                    _set_other_config(port1, "b", "2"))
+    # Same element of a set column
+    _check_conflict(manager, _add_port(vrf, "3"), _set_ports(vrf, [port1]),
+                    _set_tag(port1, 1))
+    # Deleted row
+    _check_conflict(manager, _set_tag(port2, 1), _delete(port2),
+                    _set_tag(port1, 1))
+    assert manager.group_conflicts == 5
+    assert port1.tag == [] and port2.tag == []
+
+
+def test_apply_group_merged_edits(restschema, idl, insert_row):
+    port = insert_row(idl, "Port", {"name": "1"})
+    vrf = insert_row(idl, "VRF", {"name": "red",
+                                  "ports": ["set", [["uuid",
+                                                     str(port.uuid)]]]})
+    manager = _get_manager(restschema, idl)
+
+    # Edits of different elements of a set or map column are merged
+    operations = [(OvsdbTransaction(), _add_port(vrf, str(index)))
+                  for index in range(2, 6)]
+    operations += [(OvsdbTransaction(), _set_other_config(port, "a", "1")),
+                   (OvsdbTransaction(), _set_other_config(port, "b", "2"))]
+    expected = list(operations)
+    (group_txn, deferred) = manager._apply_group(operations)
+    try:
+        assert operations == expected and deferred == []
+        assert sorted(row.name for row in vrf.ports) == \
+            ["1", "2", "3", "4", "5"]
+        assert port.other_config == {"a": "1", "b": "2"}
+    finally:
+        group_txn.abort()
+
+
+def test_apply_group_failure(restschema, idl, insert_row):
+    port1 = insert_row(idl, "Port", {"name": "1"})
+    port2 = insert_row(idl, "Port", {"name": "2"})
+    manager = _get_manager(restschema, idl)
+
+    first = (OvsdbTransaction(), _set_tag(port1, 1))
+    failed = (OvsdbTransaction(), _fail)
+    after = (OvsdbTransaction(), _set_tag(port2, 2))
+    operations = [first, failed, after]
+    (group_txn, deferred) = manager._apply_group(operations)
+    try:
+        assert operations == [first] and deferred == [after]
+        assert failed[0].event.is_set()
+        assert isinstance(failed[0].exception, ValueError)
+        assert port1.tag == [1] and port2.tag == []
+    finally:
+        group_txn.abort()
+
+    operations = [failed, after]
+    (group_txn, deferred) = manager._apply_group(operations)
+    assert group_txn is None
+    assert operations == [] and deferred == [after]
+    assert idl.txn is None
+
+
+def test_abort_committed_transaction(idl, insert_row):
+    port = insert_row(idl, "Port", {"name": "1"})
+
+    txn = OvsdbTransaction(idl)
+    port.tag = [1]
+    # Not connected, the transaction is not sent, handle it as if it was
+    # waiting for its reply
+    txn.commit()
+    txn.txn._status = ovs.db.idl.Transaction.INCOMPLETE
+    assert idl.txn is None
+
+    # A transaction prepared meanwhile is not dropped
+    other = OvsdbTransaction(idl)
+    txn.abort()
+    assert idl.txn is other.txn
+    assert txn.commit() == ovs.db.idl.Transaction.ABORTED
+
+    other.abort()
+    assert idl.txn is None
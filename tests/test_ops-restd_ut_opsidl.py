@@ -0,0 +1,120 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+
+def _ref(row):
+    return ["uuid", str(row.uuid)]
+
+
+def _set(*rows):
+    return ["set", [_ref(row) for row in rows]]
+
+
+def test_rest_index_map(idl, insert_row, update_row):
+    ports = idl.tables["Port"]
+    port = insert_row(idl, "Port", {"name": "1"})
+    assert ports.rest_index_map == {("1",): {port.uuid: port}}
+
+    # Tables indexed by uuid only have no map
+    assert idl.tables["BGP_Router"].rest_index_map is None
+    assert idl.tables["System"].rest_index_map is None
+
+    # Updates of other columns don't re-index
+    update_row(idl, "Port", port.uuid, {"tag": 1}, {"tag": ["set", []]})
+    assert ports.rest_index_map == {("1",): {port.uuid: port}}
+
+    update_row(idl, "Port", port.uuid, {"name": "2"}, {"name": "1"})
+    assert ports.rest_index_map == {("2",): {port.uuid: port}}
+
+    update_row(idl, "Port", port.uuid, None, {"name": "2"})
+    assert ports.rest_index_map == {}
+
+
+def test_parent_map(idl, insert_row, update_row):
+    neighbors = idl.tables["BGP_Neighbor"]
+    router = insert_row(idl, "BGP_Router", {"router_id": "1.1.1.1"})
+    other = insert_row(idl, "BGP_Router", {"router_id": "2.2.2.2"})
+    neighbor = insert_row(idl, "BGP_Neighbor",
+                          {"bgp_router": _ref(router),
+                           "ip_or_group_name": "1.1.1.1"})
+
+    assert neighbors.parent_map == {"bgp_router": {
+        router.uuid: set([neighbor.uuid])}}
+    assert neighbors.rest_index_map == {("1.1.1.1",): {
+        neighbor.uuid: neighbor}}
+    assert idl.parent_to_rows("BGP_Neighbor", "bgp_router",
+                              router.uuid) == [neighbor]
+    assert idl.parent_to_rows("BGP_Neighbor", "bgp_router",
+                              other.uuid) == []
+
+    update_row(idl, "BGP_Neighbor", neighbor.uuid,
+               {"bgp_router": _ref(other)}, {"bgp_router": _ref(router)})
+    assert neighbors.parent_map == {"bgp_router": {
+        other.uuid: set([neighbor.uuid])}}
+    assert idl.parent_to_rows("BGP_Neighbor", "bgp_router",
+                              router.uuid) == []
+
+    update_row(idl, "BGP_Neighbor", neighbor.uuid, None,
+               {"bgp_router": _ref(other)})
+    assert neighbors.parent_map == {"bgp_router": {}}
+    assert neighbors.rest_index_map == {}
+
+
+def test_reverse_ref_map(idl, insert_row, update_row):
+    port1 = insert_row(idl, "Port", {"name": "1"})
+    port2 = insert_row(idl, "Port", {"name": "2"})
+    router = insert_row(idl, "BGP_Router", {"router_id": "1.1.1.1"})
+    vrf = insert_row(idl, "VRF",
+                     {"name": "red", "ports": _set(port1),
+                      "bgp_routers": ["map", [[1, _ref(router)]]]})
+    system = insert_row(idl, "System", {"vrfs": _set(vrf)})
+
+    assert idl.tables["Port"].reverse_ref_map == {
+        port1.uuid: set([("VRF", vrf.uuid, "ports", None)])}
+    assert idl.tables["BGP_Router"].reverse_ref_map == {
+        router.uuid: set([("VRF", vrf.uuid, "bgp_routers", 1)])}
+    assert idl.reference_to_rows("VRF", vrf.uuid, "System",
+                                 "vrfs") == [(system, None)]
+    assert idl.reference_to_rows("BGP_Router", router.uuid, "VRF",
+                                 "bgp_routers") == [(vrf, 1)]
+    assert idl.reference_to_rows("Port", port1.uuid, "VRF",
+                                 "ports") == [(vrf, None)]
+
+    update_row(idl, "VRF", vrf.uuid, {"ports": _set(port2)},
+               {"ports": _set(port1)})
+    assert idl.tables["Port"].reverse_ref_map == {
+        port2.uuid: set([("VRF", vrf.uuid, "ports", None)])}
+    assert idl.reference_to_rows("Port", port1.uuid, "VRF", "ports") == []
+    assert idl.reference_to_rows("Port", port2.uuid, "VRF",
+                                 "ports") == [(vrf, None)]
+
+    update_row(idl, "System", system.uuid, None, {"vrfs": _set(vrf)})
+    assert idl.tables["VRF"].reverse_ref_map == {}
+    assert idl.reference_to_rows("VRF", vrf.uuid, "System", "vrfs") == []
+
+
+def test_row_cache_invalidation(idl, insert_row, update_row):
+    port = insert_row(idl, "Port", {"name": "1"})
+    cache = idl.row_cache
+    for key, row_uuid in (("port", port.uuid), ("ports", None)):
+        cache.begin()
+        cache.track("Port", row_uuid)
+        cache.end(key, key)
+
+    update_row(idl, "Port", port.uuid, {"tag": 1}, {"tag": ["set", []]})
+    assert cache.get("port") is None
+    assert cache.get("ports") == "ports"
+
+    insert_row(idl, "Port", {"name": "2"})
+    assert cache.get("ports") is None
@@ -0,0 +1,137 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+import httplib
+
+import ovs.jsonrpc
+import pytest
+from tornado import testing, web
+
+from opsrest.constants import *
+from opsrest.handlers.ovsdbapi import OVSDBAPIHandler
+from opsrest.settings import settings
+from opsrest.statistics import StatisticsCache
+
+PORT_PATH = REST_VERSION_PATH + "system/ports/1"
+VRFS_PATH = REST_VERSION_PATH + "system/vrfs"
+
+
+class _Manager(object):
+    connected = True
+
+    def __init__(self, idl):
+        self.idl = idl
+
+
+class _Application(object):
+    def __init__(self, restschema, idl):
+        self.restschema = restschema
+        self.manager = _Manager(idl)
+
+
+class TestOVSDBAPIHandler(testing.AsyncHTTPTestCase):
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, restschema, idl, insert_row, monkeypatch):
+        monkeypatch.setitem(settings, 'auth_enabled', False)
+        monkeypatch.setitem(settings, 'compress_response', False)
+        insert_row(idl, "System", {"hostname": "switch"})
+        self.port = insert_row(idl, "Port", {"name": "1"})
+        self.ref_object = _Application(restschema, idl)
+        self.idl = idl
+
+    def get_app(self):
+        return web.Application([(REST_VERSION_PATH + ".*", OVSDBAPIHandler,
+                                 dict(ref_object=self.ref_object))])
+
+    def get_httpserver_options(self):
+        # Requests are sent as if a proxy terminated HTTPS, plain HTTP
+        # requests are redirected
+        return dict(xheaders=True)
+
+    def _get(self, etag=None, header=HTTP_HEADER_CONDITIONAL_IF_NONE_MATCH):
+        headers = {"X-Scheme": "https"}
+        if etag is not None:
+            headers[header] = etag
+        return self.fetch(PORT_PATH, headers=headers)
+
+    def _set_statistics(self, values):
+        # Statistics of the port fetched on demand, as if the column
+        # wasn't replicated, the database replies to the select at once
+        def send_request(method, params, callback):
+            row = {"_uuid": ["uuid", str(self.port.uuid)],
+                   "statistics": ["map", values]}
+            callback(ovs.jsonrpc.Message.create_reply([{"rows": [row]}], 0))
+            return True
+
+        column = self.idl.tables["Port"].columns["statistics"]
+        self.idl.statistics = StatisticsCache(self.idl,
+                                              {"Port": {"statistics": column}},
+                                              60)
+        self.idl.send_request = send_request
+
+    def test_if_none_match_cached(self):
+        response = self._get()
+        assert response.code == httplib.OK
+        etag = response.headers[HTTP_HEADER_ETAG]
+
+        response = self._get(etag)
+        assert response.code == httplib.NOT_MODIFIED
+        assert response.body == ""
+
+    def test_if_none_match_not_cached(self):
+        response = self._get()
+        etag = response.headers[HTTP_HEADER_ETAG]
+
+        # Rendered again, e.g. by another worker or after a restart
+        self.idl.row_cache.clear()
+        response = self._get(etag)
+        assert response.code == httplib.NOT_MODIFIED
+        assert response.body == ""
+        assert response.headers[HTTP_HEADER_ETAG] == etag
+
+        self.idl.row_cache.clear()
+        response = self._get('"other"')
+        assert response.code == httplib.OK
+        assert response.headers[HTTP_HEADER_ETAG] == etag
+        assert response.body
+
+    def test_if_match_statistics(self):
+        self._set_statistics([["rx_packets", 10]])
+        response = self._get()
+        assert response.code == httplib.OK
+        assert "rx_packets" in response.body
+        etag = response.headers[HTTP_HEADER_ETAG]
+
+        # The statistics expired, they are fetched again to compare the
+        # ETag of the current representation
+        self.idl.statistics.expire_row("Port", self.port.uuid)
+        response = self._get(etag, HTTP_HEADER_CONDITIONAL_IF_MATCH)
+        assert response.code == httplib.OK
+        assert response.headers[HTTP_HEADER_ETAG] == etag
+
+        self._set_statistics([["rx_packets", 20]])
+        response = self._get(etag, HTTP_HEADER_CONDITIONAL_IF_MATCH)
+        assert response.code == httplib.PRECONDITION_FAILED
+
+    def test_empty_collection_pagination(self):
+        headers = {"X-Scheme": "https"}
+        response = self.fetch(VRFS_PATH + "?depth=1&offset=0&limit=10",
+                              headers=headers)
+        assert response.code == httplib.OK
+        assert response.body == "[]"
+
+        response = self.fetch(VRFS_PATH + "?depth=1&offset=1",
+                              headers=headers)
+        assert response.code == httplib.BAD_REQUEST
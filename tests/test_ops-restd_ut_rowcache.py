@@ -0,0 +1,110 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+import uuid
+
+from ops.rowcache import RowCache
+
+
+def _compute(cache, key, value, dependencies, etag=None):
+    cache.begin()
+    for table_name, row_uuid in dependencies:
+        cache.track(table_name, row_uuid)
+    cache.end(key, value, etag)
+
+
+def test_invalidate():
+    cache = RowCache()
+    port = uuid.uuid4()
+    other = uuid.uuid4()
+    _compute(cache, "port", {"name": "1"}, [("Port", port)], '"etag"')
+    _compute(cache, "ports", ["1", "2"], [("Port", None)])
+
+    assert cache.get("port") == {"name": "1"}
+    assert cache.get_etag("port") == '"etag"'
+    assert cache.get_etag("ports") is None
+    assert len(cache) == 2
+
+    cache.invalidate("Port", other)
+    assert len(cache) == 2
+
+    cache.invalidate("Port", port)
+    assert cache.get("port") is None
+    assert cache.get_etag("port") is None
+    assert cache.get("ports") == ["1", "2"]
+
+    cache.invalidate("Port", None)
+    assert len(cache) == 0
+
+
+def test_nested_values():
+    cache = RowCache()
+    vrf = uuid.uuid4()
+    port = uuid.uuid4()
+    _compute(cache, "port", {"name": "1"}, [("Port", port)])
+
+    # The rows of inner values, cached or not, are dependencies of the
+    # outer value
+    cache.begin()
+    cache.track("VRF", vrf)
+    assert cache.get("port") == {"name": "1"}
+    _compute(cache, "bgp", {}, [("BGP_Router", None)])
+    cache.end("vrf", {"ports": ["1"]})
+
+    cache.invalidate("Port", port)
+    assert cache.get("vrf") is None
+    assert cache.get("bgp") == {}
+
+    _compute(cache, "vrf", {"ports": ["1"]}, [("VRF", vrf)])
+    cache.invalidate("BGP_Router", None)
+    assert cache.get("vrf") == {"ports": ["1"]}
+
+
+def test_abort():
+    cache = RowCache()
+    port = uuid.uuid4()
+
+    cache.begin()
+    cache.begin()
+    cache.track("Port", port)
+    cache.abort()
+    cache.end("ports", ["1"])
+
+    # None values are not cached
+    _compute(cache, "none", None, [("Port", port)])
+    assert len(cache) == 1
+
+    cache.invalidate("Port", port)
+    assert len(cache) == 0
+
+
+def test_replace_and_max_entries():
+    cache = RowCache(max_entries=2)
+    first = uuid.uuid4()
+    second = uuid.uuid4()
+    _compute(cache, "port", "1", [("Port", first)], '"1"')
+    _compute(cache, "port", "2", [("Port", second)])
+
+    # The dependencies and ETag of the replaced value are dropped
+    assert cache.get_etag("port") is None
+    cache.invalidate("Port", first)
+    assert cache.get("port") == "2"
+
+    _compute(cache, "vrf", "red", [])
+    assert len(cache) == 2
+    _compute(cache, "system", "sw", [])
+    assert len(cache) == 1 and cache.get("system") == "sw"
+
+    cache.reset()
+    assert len(cache) == 0
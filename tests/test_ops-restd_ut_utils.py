@@ -0,0 +1,143 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+import ovs.db.idl
+
+from opsrest.utils import utils
+
+
+def test_index_to_row_committed(restschema, idl, insert_row):
+    port = insert_row(idl, "Port", {"name": "1"})
+    insert_row(idl, "Port", {"name": "2"})
+
+    table_schema = restschema.ovs_tables["Port"]
+    assert utils.index_to_row(["1"], table_schema,
+                              idl.tables["Port"]) is port
+    assert utils.index_to_row(["3"], table_schema,
+                              idl.tables["Port"]) is None
+
+
+def test_index_to_row_by_uuid(restschema, idl, insert_row):
+    router = insert_row(idl, "BGP_Router", {"router_id": "1.1.1.1"})
+
+    table_schema = restschema.ovs_tables["BGP_Router"]
+    assert utils.index_to_row([str(router.uuid)], table_schema,
+                              idl.tables["BGP_Router"]) is router
+    assert utils.index_to_row(["invalid"], table_schema,
+                              idl.tables["BGP_Router"]) is None
+
+
+def test_index_to_row_txn_insert(restschema, idl, insert_row):
+    insert_row(idl, "Port", {"name": "1"})
+    table_schema = restschema.ovs_tables["Port"]
+    dbtable = idl.tables["Port"]
+
+    txn = ovs.db.idl.Transaction(idl)
+    try:
+        port = txn.insert(dbtable)
+        port.name = "2"
+
+        # Rows of the transaction are only found if the IDL is given
+        assert utils.index_to_row(["2"], table_schema, dbtable) is None
+        assert utils.index_to_row(["2"], table_schema, dbtable,
+                                  idl) is port
+    finally:
+        txn.abort()
+
+    assert utils.index_to_row(["2"], table_schema, dbtable, idl) is None
+
+
+def test_index_to_row_txn_update_delete(restschema, idl, insert_row):
+    port = insert_row(idl, "Port", {"name": "1"})
+    other = insert_row(idl, "Port", {"name": "2"})
+    table_schema = restschema.ovs_tables["Port"]
+    dbtable = idl.tables["Port"]
+
+    txn = ovs.db.idl.Transaction(idl)
+    try:
+        port.name = "3"
+        other.delete()
+
+        assert utils.index_to_row(["1"], table_schema, dbtable,
+                                  idl) is None
+        assert utils.index_to_row(["2"], table_schema, dbtable,
+                                  idl) is None
+        assert utils.index_to_row(["3"], table_schema, dbtable,
+                                  idl) is port
+    finally:
+        txn.abort()
+
+    assert utils.index_to_row(["1"], table_schema, dbtable, idl) is port
+    assert utils.index_to_row(["2"], table_schema, dbtable, idl) is other
+
+
+def test_index_to_row_txn_reindex(restschema, idl, insert_row):
+    table_schema = restschema.ovs_tables["Port"]
+    dbtable = idl.tables["Port"]
+
+    txn = ovs.db.idl.Transaction(idl)
+    try:
+        # The rows of the transaction are indexed again once written
+        first = txn.insert(dbtable)
+        assert utils.index_to_row(["1"], table_schema, dbtable,
+                                  idl) is None
+        first.name = "1"
+        assert utils.index_to_row(["1"], table_schema, dbtable,
+                                  idl) is first
+
+        second = txn.insert(dbtable)
+        second.name = "2"
+        first.name = "3"
+        assert utils.index_to_row(["1"], table_schema, dbtable,
+                                  idl) is None
+        assert utils.index_to_row(["2"], table_schema, dbtable,
+                                  idl) is second
+        assert utils.index_to_row(["3"], table_schema, dbtable,
+                                  idl) is first
+
+        first.delete()
+        assert utils.index_to_row(["3"], table_schema, dbtable,
+                                  idl) is None
+        assert txn._txn_rows == {second.uuid: second}
+    finally:
+        txn.abort()
+
+
+def test_get_column_converter(restschema, idl, insert_row):
+    rows = [
+        ("Port", insert_row(idl, "Port", {
+            "name": "1", "tag": 10,
+            "other_config": ["map", [["a", "b"], ["c", "d"]]],
+            "statistics": ["map", [["rx", 1], ["tx", 2]]]})),
+        ("Port", insert_row(idl, "Port", {"name": "2"})),
+        ("BGP_Neighbor", insert_row(idl, "BGP_Neighbor", {
+            "ip_or_group_name": "1.1.1.1", "remote_as": 100})),
+        ("System", insert_row(idl, "System", {"hostname": "switch"}))]
+
+    # The converters give the same JSON as row_to_json
+    for table_name, row in rows:
+        table_schema = restschema.ovs_tables[table_name]
+        for columns in (table_schema.config, table_schema.stats):
+            expected = utils.row_to_json(row, columns)
+            for key, column in columns.iteritems():
+                convert = utils.get_column_converter(column)
+                assert convert(row.__getattr__(key)) == expected[key]
+
+    port_schema = restschema.ovs_tables["Port"]
+    convert_tag = utils.get_column_converter(port_schema.config["tag"])
+    assert convert_tag(rows[0][1].tag) == 10
+    assert convert_tag(rows[1][1].tag) is None
+    convert_statistics = utils.get_column_converter(
+        port_schema.stats["statistics"])
+    assert convert_statistics(rows[0][1].statistics) == {"rx": 1, "tx": 2}
@@ -0,0 +1,218 @@
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+import errno
+import os
+import signal
+import socket
+import stat
+import time
+
+import pytest
+
+from opsrest.constants import REQUEST_TYPE_CREATE, REQUEST_TYPE_UPDATE
+from opsvalidator import validator
+from opsvalidator.error import ValidationError, VERIFICATION_FAILED, \
+    TIME_BUDGET_EXCEEDED
+
+
+class PortValidator(object):
+    """
+    Fails the validation of the ports with a tag, runs check(row) first
+    """
+    def __init__(self, check=None):
+        self.check = check
+
+    def type(self):
+        return "PortValidator"
+
+    def validate_modification(self, validation_args):
+        row = validation_args.resource_row
+        if self.check is not None:
+            self.check(row)
+        if row.tag:
+            raise ValidationError(VERIFICATION_FAILED,
+                                  "Port %s has a tag" % row.name)
+
+
+@pytest.fixture
+def validators(monkeypatch):
+    """
+    Returns a function registering the port validator:
+    validators(check=None), the validator globals are restored after
+    the test.
+    """
+    monkeypatch.setattr(validator, 'g_validators', {})
+    monkeypatch.setattr(validator, 'g_stats', {})
+    monkeypatch.setattr(validator, 'g_time_budget', None)
+    monkeypatch.setattr(validator, 'g_workers', 1)
+    monkeypatch.setattr(validator, 'g_parallel_min_jobs', 500)
+
+    def _register(check=None):
+        validator.g_validators["port"] = [PortValidator(check)]
+    return _register
+
+
+def _get_jobs(restschema, idl, insert_row, count):
+    jobs = []
+    for index in range(count):
+        new = {"name": str(index)}
+        if index % 3 == 0:
+            new["tag"] = index
+        port = insert_row(idl, "Port", new)
+        jobs.append((idl, restschema, "Port", port, REQUEST_TYPE_UPDATE))
+    return jobs
+
+
+def _get_expected_errors(jobs):
+    return [VERIFICATION_FAILED if job[3].tag else None for job in jobs]
+
+
+def _get_errors(results):
+    return [None if result is None else result['code']
+            for result in results]
+
+
+def test_run_with_budget():
+    calls = []
+    assert validator._run_with_budget(calls.append, None, 1)
+    assert validator._run_with_budget(calls.append, 1.0, 2)
+    assert calls == [1, 2]
+    assert signal.getsignal(signal.SIGALRM) == signal.SIG_DFL
+
+
+def test_run_with_budget_exceeded():
+    start = time.time()
+    assert not validator._run_with_budget(time.sleep, 0.05, 2)
+    assert time.time() - start < 1
+    assert not validator.g_budget_armed
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+    assert signal.getsignal(signal.SIGALRM) == signal.SIG_DFL
+
+
+def test_exec_validator_budget_exceeded(restschema, idl, insert_row,
+                                        validators, monkeypatch):
+    validators(lambda row: time.sleep(2))
+    monkeypatch.setattr(validator, 'g_time_budget', 0.05)
+    port = insert_row(idl, "Port", {"name": "1"})
+
+    with pytest.raises(ValidationError) as e:
+        validator.exec_validators(idl, restschema, "Port", port,
+                                  REQUEST_TYPE_CREATE)
+    assert e.value.error['code'] == TIME_BUDGET_EXCEEDED
+
+    stats = validator.get_stats()["PortValidator"]
+    assert stats.calls == 1 and stats.budget_exceeded == 1
+
+
+def test_exec_validators_in_process(restschema, idl, insert_row,
+                                    validators):
+    pids = set()
+    validators(lambda row: pids.add(os.getpid()))
+    jobs = _get_jobs(restschema, idl, insert_row, 10)
+
+    results = validator.exec_validators_in_workers(jobs)
+    assert _get_errors(results) == _get_expected_errors(jobs)
+    assert pids == set([os.getpid()])
+    assert validator.get_stats()["PortValidator"].calls == 10
+
+
+def test_exec_validators_in_workers(restschema, idl, insert_row,
+                                    validators, monkeypatch):
+    # A socket of the parent, e.g. the OVSDB connection
+    (parent_socket, peer_socket) = socket.socketpair()
+
+    def check_worker(row):
+        if os.getpid() == parent_pid:
+            raise ValidationError(VERIFICATION_FAILED, "Not in a worker")
+        if stat.S_ISSOCK(os.fstat(parent_socket.fileno()).st_mode):
+            raise ValidationError(VERIFICATION_FAILED, "Socket inherited")
+
+    parent_pid = os.getpid()
+    validators(check_worker)
+    monkeypatch.setattr(validator, 'g_workers', 3)
+    monkeypatch.setattr(validator, 'g_parallel_min_jobs', 5)
+    jobs = _get_jobs(restschema, idl, insert_row, 10)
+
+    try:
+        results = validator.exec_validators_in_workers(jobs)
+        assert _get_errors(results) == _get_expected_errors(jobs)
+        assert validator.get_stats()["PortValidator"].calls == 10
+
+        # The socket is still usable by the parent
+        parent_socket.sendall("ok")
+        assert peer_socket.recv(2) == "ok"
+    finally:
+        parent_socket.close()
+        peer_socket.close()
+
+
+def test_exec_validators_fork_failed(restschema, idl, insert_row,
+                                     validators, monkeypatch):
+    def fork():
+        raise OSError("fork failed")
+
+    validators()
+    monkeypatch.setattr(validator, 'g_workers', 2)
+    monkeypatch.setattr(validator, 'g_parallel_min_jobs', 1)
+    monkeypatch.setattr(os, 'fork', fork)
+    jobs = _get_jobs(restschema, idl, insert_row, 4)
+
+    results = validator.exec_validators_in_workers(jobs)
+    assert _get_errors(results) == _get_expected_errors(jobs)
+    assert validator.get_stats()["PortValidator"].calls == 4
+
+
+def test_exec_validators_worker_failed(restschema, idl, insert_row,
+                                       validators, monkeypatch):
+    def exit_worker(row):
+        if os.getpid() != parent_pid:
+            os._exit(1)
+
+    parent_pid = os.getpid()
+    validators(exit_worker)
+    monkeypatch.setattr(validator, 'g_workers', 2)
+    monkeypatch.setattr(validator, 'g_parallel_min_jobs', 1)
+    jobs = _get_jobs(restschema, idl, insert_row, 4)
+
+    # The jobs of the failed workers are validated in this process
+    results = validator.exec_validators_in_workers(jobs)
+    assert _get_errors(results) == _get_expected_errors(jobs)
+    assert validator.get_stats()["PortValidator"].calls == 4
+
+
+def test_exec_validators_interrupted(restschema, idl, insert_row,
+                                     validators, monkeypatch):
+    # The wait for the workers is interrupted by the signals handled
+    # meanwhile, e.g. SIGCHLD by tornado.process.Subprocess
+    def interrupted(function):
+        def call(*args):
+            if function not in calls:
+                calls.add(function)
+                raise OSError(errno.EINTR, os.strerror(errno.EINTR))
+            return function(*args)
+        return call
+
+    calls = set()
+    validators()
+    monkeypatch.setattr(validator, 'g_workers', 2)
+    monkeypatch.setattr(validator, 'g_parallel_min_jobs', 1)
+    monkeypatch.setattr(os, 'read', interrupted(os.read))
+    monkeypatch.setattr(os, 'waitpid', interrupted(os.waitpid))
+    jobs = _get_jobs(restschema, idl, insert_row, 4)
+
+    results = validator.exec_validators_in_workers(jobs)
+    assert len(calls) == 2
+    assert _get_errors(results) == _get_expected_errors(jobs)
+    assert validator.get_stats()["PortValidator"].calls == 4